@@ -145,6 +145,136 @@ def test_persistence_validator():
     print("  ✓ PersistenceValidator passed")
 
 
+def test_persistence_batch():
+    from blackice.baseline import BaselineComputer
+    from blackice.deviation import DeviationTracker
+    from blackice.persistence import PersistenceValidator, PersistenceConfig, PersistenceStatus
+    from blackice.state import RegimeStateMachine
+    import random
+    
+    print("Testing batch (run-length) persistence...")
+    
+    rng = random.Random(7)
+    values = [50 + rng.gauss(0, 1) for _ in range(400)]
+    for start in (120, 250, 300):
+        for i in range(start, start + rng.randint(2, 30)):
+            values[i] += 15
+    timestamps = list(range(len(values)))
+    
+    def make():
+        baseline = BaselineComputer(window_size=20)
+        config = PersistenceConfig(min_consecutive_points=5, min_fraction_of_window=0.1, window_size=20)
+        return (
+            DeviationTracker(baseline, zscore_threshold=2.0),
+            PersistenceValidator(config),
+            RegimeStateMachine("test")
+        )
+    
+    tracker, validator, sm = make()
+    for value, ts in zip(values, timestamps):
+        dev = tracker.update(value, ts)
+        if tracker.baseline.is_ready:
+            sm.process(validator.check(dev), ts, zscore=dev.zscore)
+    expected = [t.to_dict() for t in sm.transitions]
+    
+    tracker, validator, sm = make()
+    statuses = []
+    for start in range(0, len(values), 37):
+        batch = tracker.update_batch(values[start:start + 37], timestamps[start:start + 37])
+        for index, result in validator.check_batch(batch):
+            statuses.append(result.status)
+            sm.process(result, int(batch.timestamps[index]), zscore=float(batch.zscores[index]))
+    
+    assert [t.to_dict() for t in sm.transitions] == expected
+    assert PersistenceStatus.CONFIRMED in statuses
+    assert len(statuses) < len(values) // 4
+    
+    print("  ✓ Batch persistence passed")
+
+
+def test_window_fraction_persistence():
+    from blackice.baseline import BaselineComputer
+    from blackice.deviation import DeviationTracker
+    from blackice.persistence import PersistenceValidator, PersistenceConfig, SignificanceWindow
+    from blackice.state import RegimeStateMachine, RegimeState
+    
+    print("Testing sliding-window fraction persistence...")
+    
+    window = SignificanceWindow(10)
+    for flag in [True, False, True, True] + [False] * 7:
+        window.push(flag)
+    assert window.count == 2
+    assert window.size == 10
+    
+    # Bursts of 3 high points: never 5 in a row, but well over 20% of the window.
+    values = [50.0 + (i % 3) for i in range(40)]
+    values += [50.0 + (i % 3) + (20.0 if i % 6 < 3 else 0.0) for i in range(60)]
+    timestamps = list(range(len(values)))
+    
+    def run(use_window_fraction, batched):
+        baseline = BaselineComputer(window_size=40)
+        tracker = DeviationTracker(baseline, zscore_threshold=2.0)
+        validator = PersistenceValidator(PersistenceConfig(
+            min_consecutive_points=5,
+            min_fraction_of_window=0.2,
+            window_size=40,
+            use_window_fraction=use_window_fraction
+        ))
+        sm = RegimeStateMachine("test")
+        if batched:
+            for start in range(0, len(values), 13):
+                batch = tracker.update_batch(values[start:start + 13], timestamps[start:start + 13])
+                for index, result in validator.check_batch(batch):
+                    sm.process(result, int(batch.timestamps[index]), zscore=float(batch.zscores[index]))
+        else:
+            for value, ts in zip(values, timestamps):
+                dev = tracker.update(value, ts)
+                if baseline.is_ready:
+                    result = validator.check(dev)
+                    sm.process(result, ts, zscore=dev.zscore)
+        return sm
+    
+    legacy = run(False, batched=False)
+    assert RegimeState.SHIFTED not in [t.to_state for t in legacy.transitions]
+    
+    windowed = run(True, batched=False)
+    assert RegimeState.SHIFTED in [t.to_state for t in windowed.transitions]
+    
+    batched = run(True, batched=True)
+    assert [t.to_dict() for t in batched.transitions] == [t.to_dict() for t in windowed.transitions]
+    
+    # The window only confirms the direction that actually fills it: HIGH
+    # points never count towards a LOW deviation.
+    from blackice.deviation import DeviationResult, DeviationDirection
+    from blackice.persistence import PersistenceStatus
+    
+    def point(ts, direction, consecutive):
+        significant = direction != DeviationDirection.NONE
+        return DeviationResult(
+            timestamp=ts, value=0.0, zscore=0.0, magnitude=0.0, direction=direction,
+            consecutive_count=consecutive, deviation_start_ts=ts if significant else None,
+            is_significant=significant
+        )
+    
+    validator = PersistenceValidator(PersistenceConfig(10, 0.3, 60, use_window_fraction=True))
+    for ts in range(17):
+        high = ts % 2 == 0
+        validator.check(point(ts, DeviationDirection.HIGH if high else DeviationDirection.NONE, int(high)))
+    result = validator.check(point(17, DeviationDirection.LOW, 1))
+    assert result.status == PersistenceStatus.WATCHING
+    assert result.direction == DeviationDirection.LOW
+    
+    validator = PersistenceValidator(PersistenceConfig(10, 0.3, 60, use_window_fraction=True))
+    for ts in range(20):
+        result = validator.check(point(ts, DeviationDirection.HIGH, ts + 1))
+    assert result.status == PersistenceStatus.CONFIRMED
+    result = validator.check(point(20, DeviationDirection.LOW, 1))
+    assert result.status == PersistenceStatus.WATCHING
+    assert validator.window_flags[-2:] == [1, -1]
+    
+    print("  ✓ Window fraction persistence passed")
+
+
 def test_state_machine():
     from blackice.state import RegimeStateMachine, RegimeState
     from blackice.persistence import PersistenceResult, PersistenceStatus
@@ -312,6 +442,1265 @@ def test_metrics_computation():
     print("  ✓ MetricsComputer passed")
 
 
+def test_interval_indexed_loss():
+    from blackice.learning.objective import (
+        AnomalyInterval, IntervalIndex, calculate_loss, calculate_losses
+    )
+    from blackice.state import StateEvent, StateTransition, RegimeState
+    from blackice.deviation import DeviationDirection
+    
+    print("Testing interval-indexed loss...")
+    
+    intervals = [AnomalyInterval(100, 200), AnomalyInterval(50, 120), AnomalyInterval(400, 410)]
+    index = IntervalIndex(intervals)
+    assert not index.disjoint
+    assert index.match([110, 60, 300, 405]).tolist() == [0, 1, -1, 2]
+    
+    def event(ts):
+        return StateEvent("cpu", StateTransition(
+            RegimeState.NORMAL, RegimeState.UNSTABLE, ts, DeviationDirection.HIGH, "test"
+        ))
+    
+    # 110 -> interval 0 (delay 10), 60 -> interval 1 (delay 10), 300 -> FP,
+    # interval 2 missed.
+    loss = calculate_loss([event(110), event(60), event(300)], intervals)
+    assert abs(loss - (5.0 + 10.0 + 20 * 0.1)) < 1e-9
+    
+    losses = calculate_losses([[110, 60, 300], [], [405]], index)
+    assert abs(losses[0] - loss) < 1e-9
+    assert abs(losses[1] - 30.0) < 1e-9
+    assert abs(losses[2] - (20.0 + 0.5)) < 1e-9
+    
+    print("  ✓ Interval-indexed loss passed")
+
+
+def test_optimizer_factorized_grid():
+    from blackice.learning.optimizer import GridSearchOptimizer, StreamingGridEvaluator, evaluate_config, evaluate_grid
+    from blackice.learning.objective import AnomalyInterval
+    import pandas as pd
+    import random
+    
+    print("Testing factorized grid evaluation...")
+    
+    rng = random.Random(3)
+    rows = []
+    ground_truth = []
+    for i in range(600):
+        cpu = 50 + rng.gauss(0, 2)
+        if 200 <= i < 240 or 420 <= i < 430:
+            cpu += 25
+        rows.append({'machine_id': 'm_grid', 'timestamp': i, 'cpu_util': cpu, 'mem_util': 40 + rng.gauss(0, 1)})
+    ground_truth = [AnomalyInterval(200, 240), AnomalyInterval(420, 430)]
+    df = pd.DataFrame(rows)
+    
+    optimizer = GridSearchOptimizer({
+        "window_size": [10, 30],
+        "zscore_threshold": [2.0, 3.0],
+        "min_consecutive_points": [2, 5, 8]
+    })
+    configs = optimizer._generate_configs()
+    losses = evaluate_grid(list(enumerate(configs)), df, ground_truth)
+    
+    for i, config in enumerate(configs):
+        assert abs(losses[i] - evaluate_config(config, df, ground_truth)) < 1e-9, config
+    
+    # Missing values are skipped per metric, as the pipeline does
+    gappy = df.copy()
+    gappy.loc[gappy.index % 7 == 3, 'cpu_util'] = float('nan')
+    gappy.loc[100:180, 'mem_util'] = float('nan')
+    losses = evaluate_grid(list(enumerate(configs)), gappy, ground_truth)
+    evaluator = StreamingGridEvaluator(list(enumerate(configs)), ground_truth)
+    for start in range(0, len(gappy), 130):
+        evaluator.feed(gappy.iloc[start:start + 130])
+    streamed = evaluator.losses()
+    for i, config in enumerate(configs):
+        expected = evaluate_config(config, gappy, ground_truth)
+        assert abs(losses[i] - expected) < 1e-9, (config, losses[i], expected)
+        assert abs(streamed[i] - expected) < 1e-9, (config, streamed[i], expected)
+    
+    print("  ✓ Factorized grid evaluation passed")
+
+
+def test_parallel_grid_search():
+    from blackice.learning.optimizer import GridSearchOptimizer
+    from blackice.learning.objective import AnomalyInterval
+    import pandas as pd
+    import numpy as np
+    
+    print("Testing parallel grid search...")
+    
+    rng = np.random.default_rng(11)
+    n = 1500
+    cpu = 50 + rng.normal(0, 2, n)
+    cpu[(np.arange(n) % 500) >= 460] += 30
+    df = pd.DataFrame({'machine_id': 'm_par', 'timestamp': np.arange(n) * 10, 'cpu_util': cpu, 'mem_util': 40.0})
+    truth = [AnomalyInterval((s + 460) * 10, (s + 499) * 10) for s in range(0, n, 500)]
+    
+    # ewma_alpha is ignored without use_ewma, so every loss is tied with its
+    # neighbour and the best must be the first of the pair in grid order.
+    grid = {
+        "window_size": [20, 60],
+        "zscore_threshold": [2.0, 4.0],
+        "min_consecutive_points": [3, 10],
+        "ewma_alpha": [0.1, 0.5]
+    }
+    serial = GridSearchOptimizer(grid, n_jobs=1)
+    best = serial.train(df, truth)
+    parallel = GridSearchOptimizer(grid, n_jobs=2)
+    assert parallel.train(df, truth) == best
+    assert parallel.losses == serial.losses and len(serial.losses) == 16
+    assert all(serial.losses[i] == serial.losses[i + 1] for i in range(0, 16, 2))
+    assert best is not None and best.ewma_alpha == 0.1
+    
+    print("  ✓ Parallel grid search passed")
+
+
+def test_search_strategies():
+    from blackice.learning.optimizer import evaluate_config
+    from blackice.learning.search import SuccessiveHalvingOptimizer, evaluate_with_pruning
+    from blackice.learning.objective import AnomalyInterval, IntervalIndex
+    from blackice.pipeline import PipelineConfig
+    import pandas as pd
+    import random
+    
+    print("Testing early-stopping search strategies...")
+    
+    rng = random.Random(5)
+    rows = []
+    for i in range(3000):
+        cpu = 50 + rng.gauss(0, 3)
+        if i % 500 > 460:
+            cpu += 30
+        rows.append({'machine_id': 'm_search', 'timestamp': i, 'cpu_util': cpu, 'mem_util': 40.0})
+    ground_truth = [AnomalyInterval(s + 461, s + 499) for s in range(0, 3000, 500)]
+    df = pd.DataFrame(rows)
+    index = IntervalIndex(ground_truth)
+    
+    noisy = PipelineConfig(window_size=10, zscore_threshold=1.0, min_consecutive_points=2, track_memory=False)
+    full = evaluate_with_pruning(noisy, df, index, chunk_rows=500)
+    assert full is not None
+    assert abs(full - evaluate_config(noisy, df, ground_truth)) < 1e-9
+    assert evaluate_with_pruning(noisy, df, index, bound=10.0, chunk_rows=500) is None
+    
+    optimizer = SuccessiveHalvingOptimizer({
+        "window_size": [10, 50],
+        "zscore_threshold": [1.0, 3.0],
+        "min_consecutive_points": [2, 5],
+        "min_fraction_of_window": [0.0, 0.3]
+    }, eta=2, initial_fraction=0.25, min_rows=100, chunk_rows=500)
+    best = optimizer.train(df, ground_truth)
+    assert best is not None
+    assert best.zscore_threshold == 3.0
+    
+    print("  ✓ Search strategies passed")
+
+
+def test_fleet_training():
+    from blackice.learning.fleet import split_by_machine, cluster_groups, train_fleet
+    from blackice.learning.optimizer import GridSearchOptimizer, evaluate_config
+    from blackice.learning.params import ParameterTable
+    from blackice.learning.objective import AnomalyInterval
+    from blackice.pipeline import PipelineConfig
+    import pandas as pd
+    import random
+    import tempfile
+    import os
+    
+    print("Testing per-machine fleet training...")
+    
+    rng = random.Random(11)
+    rows = []
+    for i in range(1500):
+        # Interleaved machines: a quiet one with long shifts, a noisy one
+        rows.append({'machine_id': 'm_quiet', 'timestamp': i, 'cpu_util': 30 + rng.gauss(0, 1) + (40 if i % 500 > 440 else 0), 'mem_util': 20.0})
+        rows.append({'machine_id': 'm_noisy', 'timestamp': i, 'cpu_util': 50 + rng.gauss(0, 10), 'mem_util': 40.0})
+    df = pd.DataFrame(rows).sample(frac=1.0, random_state=3)
+    
+    machines = split_by_machine(df)
+    assert sorted(machines) == ['m_noisy', 'm_quiet']
+    assert machines['m_quiet']['timestamp'].is_monotonic_increasing
+    
+    series = {
+        'm_quiet': (machines['m_quiet'], [AnomalyInterval(s + 441, s + 499) for s in range(0, 1500, 500)]),
+        'm_noisy': (machines['m_noisy'], []),
+    }
+    grid = {"window_size": [20, 50], "zscore_threshold": [2.0, 5.0], "min_consecutive_points": [3, 10]}
+    table = train_fleet(series, GridSearchOptimizer(grid), n_jobs=1)
+    assert len(table) == 2
+    
+    # Each machine gets the config that is best for its own stream
+    for machine_id, (machine_df, truth) in series.items():
+        config = table.config_for(machine_id)
+        best = min(
+            evaluate_config(PipelineConfig(window_size=w, zscore_threshold=z, min_consecutive_points=c), machine_df, truth)
+            for w in grid["window_size"] for z in grid["zscore_threshold"] for c in grid["min_consecutive_points"]
+        )
+        assert abs(evaluate_config(config, machine_df, truth) - best) < 1e-9
+    
+    # Cluster grouping shares one config; round-trip through CSV
+    meta = pd.DataFrame({'machine_id': ['m_quiet', 'm_noisy'], 'timestamp': [0, 0], 'cluster_code': [7, 7]})
+    groups = cluster_groups(list(series), meta)
+    assert groups == {'cluster_7': ['m_quiet', 'm_noisy']}
+    shared = train_fleet(series, GridSearchOptimizer(grid), groups=groups)
+    assert shared.lookup('m_quiet') == shared.lookup('m_noisy')
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'params.csv')
+        table.save(path)
+        loaded = ParameterTable.load(path)
+    assert loaded.lookup('m_quiet') == table.lookup('m_quiet')
+    assert loaded.lookup('m_unknown') is None
+    merged = loaded.apply_to('m_quiet', {'deviation': {'zscore_threshold': 9.0}, 'data': {'chunksize': 10}})
+    assert PipelineConfig.from_dict(merged).zscore_threshold == table.lookup('m_quiet')['zscore_threshold']
+    assert merged['data'] == {'chunksize': 10}
+    
+    print("  ✓ Fleet training passed")
+
+
+def test_label_sources():
+    from blackice.learning.labels import (
+        LabelSource, ThresholdLabels, IntervalFileLabels, build_labels, label_cache_path
+    )
+    import pandas as pd
+    import numpy as np
+    import tempfile
+    import os
+    
+    print("Testing vectorized label sources...")
+    
+    try:
+        LabelSource()
+        assert False, "LabelSource is abstract"
+    except TypeError:
+        pass
+    
+    def reference(timestamps, values, threshold):
+        # Row-by-row scan the vectorized version must reproduce
+        labels, start = [], None
+        for ts, value in zip(timestamps, values):
+            if value > threshold and start is None:
+                start = ts
+            elif value <= threshold and start is not None:
+                labels.append((start, ts))
+                start = None
+        if start is not None:
+            labels.append((start, timestamps[-1]))
+        return labels
+    
+    rng = np.random.default_rng(2)
+    for n in (1, 2, 50, 500):
+        timestamps = np.arange(n) * 10
+        values = rng.choice([90.0, 95.0, 99.0], size=n)
+        # Split across chunks so runs carried between chunks are covered too
+        frame = pd.DataFrame({'machine_id': 'm', 'timestamp': timestamps, 'cpu_util': values})
+        chunks = [frame.iloc[i:i + 7] for i in range(0, n, 7)]
+        got = [(iv.start_time, iv.end_time) for iv in ThresholdLabels(threshold=95.0).label_stream(chunks)['m']]
+        assert got == reference(timestamps.tolist(), values.tolist(), 95.0)
+    
+    df = pd.DataFrame({
+        'machine_id': ['m_b', 'm_a', 'm_a', 'm_b', 'm_a', 'm_b'],
+        'timestamp': [2, 3, 1, 1, 2, 3],
+        'cpu_util': [99.0, 10.0, 99.0, 10.0, 99.0, 99.0],
+    })
+    labels = ThresholdLabels(threshold=95.0).label(df)
+    assert [(iv.start_time, iv.end_time) for iv in labels['m_a']] == [(1, 3)]
+    assert [(iv.start_time, iv.end_time) for iv in labels['m_b']] == [(2, 3)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        intervals_path = os.path.join(tmp, 'intervals.csv')
+        pd.DataFrame({'machine_id': ['m_a'], 'start_time': [5], 'end_time': [9]}).to_csv(intervals_path, index=False)
+        from_file = IntervalFileLabels(intervals_path).label(df)
+        assert from_file['m_b'] == [] and from_file['m_a'][0].end_time == 9
+        
+        data_path = os.path.join(tmp, 'usage.csv')
+        df.to_csv(data_path, index=False)
+        source = ThresholdLabels(threshold=95.0)
+        first = build_labels(source, df, data_path=data_path)
+        assert label_cache_path(data_path, source).exists()
+        # A second call is served from the cache, even without the data
+        cached = build_labels(source, df.iloc[0:0], data_path=data_path)
+        assert {m: [(iv.start_time, iv.end_time) for iv in ivs] for m, ivs in cached.items()} == \
+            {m: [(iv.start_time, iv.end_time) for iv in ivs] for m, ivs in first.items()}
+        assert label_cache_path(data_path, ThresholdLabels(threshold=50.0)) != label_cache_path(data_path, source)
+    
+    print("  ✓ Label sources passed")
+
+
+def test_streaming_training():
+    from blackice.learning.optimizer import GridSearchOptimizer, StreamingGridEvaluator, evaluate_grid
+    from blackice.learning.labels import ThresholdLabels
+    from blackice.pipeline import PipelineConfig
+    import pandas as pd
+    import numpy as np
+    import itertools
+    
+    print("Testing out-of-core (chunked) training...")
+    
+    rng = np.random.default_rng(9)
+    n = 4000
+    cpu = 50 + rng.normal(0, 3, n)
+    cpu[np.arange(n) % 700 > 640] += 48
+    df = pd.DataFrame({
+        'machine_id': 'm_stream',
+        'timestamp': np.arange(n) * 10,
+        'cpu_util': cpu,
+        'mem_util': 40 + rng.normal(0, 2, n),
+    })
+    cuts = [0, 1, 37, 900, 901, 2500, n]
+    chunks = [df.iloc[a:b] for a, b in zip(cuts[:-1], cuts[1:])]
+    
+    # Streaming labels match labelling the whole frame
+    whole = ThresholdLabels(threshold=95.0).label(df)['m_stream']
+    streamed = ThresholdLabels(threshold=95.0).label_stream(iter(chunks))['m_stream']
+    assert len(whole) > 0
+    assert [(iv.start_time, iv.end_time) for iv in streamed] == [(iv.start_time, iv.end_time) for iv in whole]
+    
+    configs = [
+        PipelineConfig(window_size=w, zscore_threshold=z, min_consecutive_points=c, use_window_fraction=f)
+        for w, z, c, f in itertools.product([20, 60], [2.0, 3.0], [3, 8], [False, True])
+    ]
+    indexed = list(enumerate(configs))
+    expected = evaluate_grid(indexed, df, whole)
+    
+    evaluator = StreamingGridEvaluator(indexed, whole)
+    for chunk in chunks:
+        evaluator.feed(chunk)
+    assert evaluator.rows == n
+    for i, loss in evaluator.losses().items():
+        assert abs(loss - expected[i]) < 1e-6, (configs[i], loss, expected[i])
+    
+    grid = {"window_size": [20, 60], "zscore_threshold": [2.0, 3.0], "min_consecutive_points": [3, 8]}
+    in_memory = GridSearchOptimizer(grid).train(df, whole)
+    out_of_core = GridSearchOptimizer(grid).train(iter(chunks), whole)
+    assert in_memory == out_of_core
+    
+    print("  ✓ Streaming training passed")
+
+
+def test_evaluation_cache():
+    from blackice.learning.cache import EvaluationCache, dataset_fingerprint, ground_truth_fingerprint
+    from blackice.learning.optimizer import GridSearchOptimizer, evaluate_grid
+    from blackice.learning.objective import AnomalyInterval
+    import pandas as pd
+    import numpy as np
+    import tempfile
+    import pickle
+    import os
+    
+    print("Testing on-disk evaluation cache...")
+    
+    rng = np.random.default_rng(4)
+    n = 2000
+    cpu = 50 + rng.normal(0, 3, n)
+    cpu[np.arange(n) % 500 > 450] += 40
+    df = pd.DataFrame({'machine_id': 'm_cache', 'timestamp': np.arange(n), 'cpu_util': cpu, 'mem_util': 40.0})
+    truth = [AnomalyInterval(s + 451, s + 499) for s in range(0, n, 500)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EvaluationCache(os.path.join(tmp, 'evals.sqlite'))
+        grid = {"window_size": [20, 50], "zscore_threshold": [2.0, 3.0], "min_consecutive_points": [3, 8]}
+        first = GridSearchOptimizer(grid, cache=cache).train(df, truth)
+        assert len(cache) == 8
+        
+        # Widening the grid only scores the new points
+        grid["zscore_threshold"].append(4.0)
+        optimizer = GridSearchOptimizer(grid, cache=cache)
+        configs = optimizer._generate_configs()
+        dataset, gt_key = dataset_fingerprint(df), ground_truth_fingerprint(truth)
+        assert len(cache.lookup(dataset, gt_key, configs)) == 8
+        widened = optimizer.train(df, truth)
+        assert len(cache) == 12
+        assert widened == GridSearchOptimizer(grid).train(df, truth)
+        
+        cached = cache.lookup(dataset, gt_key, configs)
+        fresh = evaluate_grid(list(enumerate(configs)), df, truth)
+        assert all(abs(cached[i] - fresh[i]) < 1e-9 for i in fresh)
+        summary = cache.summary(dataset, gt_key, first)
+        assert summary is not None and summary['detected'] + summary['missed'] == len(truth)
+        
+        # Different data or labels never hit
+        assert cache.lookup(dataset_fingerprint(df.iloc[:-1]), gt_key, configs) == {}
+        assert cache.lookup(dataset, ground_truth_fingerprint(truth[:-1]), configs) == {}
+        
+        # Picklable for worker processes
+        assert len(pickle.loads(pickle.dumps(cache))) == 12
+        cache.close()
+        
+        # A location that cannot hold the file just means no caching
+        blocker = os.path.join(tmp, 'not_a_dir')
+        open(blocker, 'w').close()
+        unusable = EvaluationCache(os.path.join(blocker, 'evals.sqlite'))
+        assert GridSearchOptimizer(grid, cache=unusable).train(df, truth) == widened
+        assert len(unusable) == 0 and unusable.lookup(dataset, gt_key, configs) == {}
+    
+    print("  ✓ Evaluation cache passed")
+
+
+def test_rolling_origin_cv():
+    from blackice.learning.validation import CrossValidatedOptimizer, cross_validate_grid, rolling_origin_splits
+    from blackice.learning.optimizer import evaluate_grid
+    from blackice.learning.objective import AnomalyInterval
+    from blackice.learning.cache import EvaluationCache, dataset_fingerprint, ground_truth_fingerprint
+    from blackice.pipeline import PipelineConfig
+    import pandas as pd
+    import numpy as np
+    import itertools
+    import tempfile
+    import os
+    
+    print("Testing rolling-origin cross-validation...")
+    
+    assert rolling_origin_splits(100, n_folds=3, initial_fraction=0.4) == [0, 40, 60, 80, 100]
+    
+    rng = np.random.default_rng(6)
+    n = 3000
+    cpu = 50 + rng.normal(0, 3, n)
+    cpu[np.arange(n) % 600 > 540] += 40
+    df = pd.DataFrame({'machine_id': 'm_cv', 'timestamp': np.arange(n) * 5, 'cpu_util': cpu, 'mem_util': 40.0})
+    truth = [AnomalyInterval((s + 541) * 5, (s + 599) * 5) for s in range(0, n, 600)]
+    configs = [
+        PipelineConfig(window_size=w, zscore_threshold=z, min_consecutive_points=c)
+        for w, z, c in itertools.product([20, 60], [2.0, 4.0], [3, 10])
+    ]
+    indexed = list(enumerate(configs))
+    
+    # With no warm-up the folds partition the run: fold losses add up to the full loss
+    folds = cross_validate_grid(indexed, df, truth, rolling_origin_splits(n, n_folds=5, initial_fraction=0.0))
+    full = evaluate_grid(indexed, df, truth)
+    for i, fold in folds.items():
+        assert len(fold) == 5
+        assert abs(sum(fold) - full[i]) < 1e-6, (sum(fold), full[i])
+    
+    grid = {"window_size": [20, 60], "zscore_threshold": [2.0, 4.0], "min_consecutive_points": [3, 10]}
+    serial = CrossValidatedOptimizer(grid, n_folds=3)
+    best = serial.train(df, truth)
+    parallel = CrossValidatedOptimizer(grid, n_folds=3, n_jobs=2)
+    assert parallel.train(df, truth) == best
+    assert serial.fold_losses == parallel.fold_losses
+    assert all(len(f) == 3 for f in serial.fold_losses.values())
+    
+    # Fold losses are cached per split and never mixed with full-run losses
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EvaluationCache(os.path.join(tmp, 'evals.sqlite'))
+        assert CrossValidatedOptimizer(grid, n_folds=3, cache=cache).train(df, truth) == best
+        reused = CrossValidatedOptimizer(grid, n_folds=3, cache=cache)
+        assert reused.train(df, truth) == best and reused.fold_losses == serial.fold_losses
+        assert cache.lookup(dataset_fingerprint(df), ground_truth_fingerprint(truth), configs) == {}
+        CrossValidatedOptimizer(grid, n_folds=4, cache=cache).train(df, truth)
+        assert len(cache) == 16
+        cache.close()
+    
+    print("  ✓ Rolling-origin CV passed")
+
+
+def test_threshold_calibration():
+    from blackice import RegimeDetector
+    from blackice.calibration import ThresholdCalibrator
+    from blackice.state import RegimeState
+    import random
+    
+    print("Testing online threshold calibration...")
+    
+    # Crossing counts match a direct count at every candidate threshold
+    rng = random.Random(8)
+    calibrator = ThresholdCalibrator(target_rate_per_hour=1.0, interval=10**9, bin_width=0.5, max_threshold=6.0)
+    zscores = [rng.gauss(0, 1.5) for _ in range(3000)]
+    for i, z in enumerate(zscores):
+        calibrator.observe(z, timestamp=i * 3.6)
+    rates = calibrator.crossing_rates()
+    hours = (len(zscores) - 1) * 3.6 / 3600
+    for k in (4, 6, 8):
+        edge = k * 0.5
+        crossings = sum(
+            1 for a, b in zip(zscores, zscores[1:])
+            if int(abs(a) / 0.5) < k <= min(int(abs(b) / 0.5), 12)
+        )
+        assert abs(rates[k] - crossings / hours) < 1e-9, edge
+    
+    # A stricter target yields a higher threshold, and the achieved rate of
+    # UNSTABLE entries respects it
+    thresholds = []
+    for target in (20.0, 1.0):
+        rng = random.Random(3)
+        detector = RegimeDetector(window_size=60, z_threshold=3.0, persistence=5,
+                                  target_alert_rate=target, calibration_interval=2000)
+        entries, calibrated_points, previous = 0, 0, RegimeState.NORMAL
+        for i in range(60000):
+            event = detector.update(50 + rng.gauss(0, 5), timestamp=i)
+            if detector.calibrator.is_calibrated:
+                calibrated_points += 1
+                if previous == RegimeState.NORMAL and event.state != RegimeState.NORMAL:
+                    entries += 1
+            previous = event.state
+        assert detector.calibrator.calibrations >= 20
+        assert entries / (calibrated_points / 3600) <= target * 1.5
+        thresholds.append(detector.z_threshold)
+    assert thresholds[1] > thresholds[0]
+    
+    # Without a target the threshold is left alone
+    detector = RegimeDetector(z_threshold=3.0)
+    for i in range(500):
+        detector.update(50 + (i % 7), timestamp=i)
+    assert detector.calibrator is None and detector.z_threshold == 3.0
+    
+    print("  ✓ Threshold calibration passed")
+
+
+def test_bench_suite():
+    from blackice.bench import run_suite, compare_to_baseline, build_report, synthetic_chunk
+    from blackice.cli import main as cli_main
+    import tempfile
+    import json
+    import os
+    import contextlib
+    import io
+    
+    print("Testing benchmark suite...")
+    
+    # Synthetic chunks are reproducible and independent of how they are cut
+    whole = synthetic_chunk(0, 300, seed=1)
+    assert len(whole) == 300 and whole["timestamp"].tolist() == list(range(300))
+    assert synthetic_chunk(0, 300, seed=1)["cpu_util"].equals(whole["cpu_util"])
+    
+    results = run_suite([2000], ["baseline", "detector", "pipeline"], isolate=False)
+    assert [r.name for r in results] == ["baseline", "detector", "pipeline"]
+    for r in results:
+        assert r.rows == 2000 and r.rows_per_second > 0
+        assert 0 < r.p50_us <= r.p99_us
+    
+    # Sizes above a benchmark's ceiling are skipped
+    assert run_suite([10**9], ["optimizer"], isolate=False) == []
+    
+    # A case is flagged once it is slower than the baseline beyond tolerance
+    report = build_report(results, seed=0)
+    assert compare_to_baseline(results, report) == []
+    for entry in report["results"]:
+        entry["rows_per_second"] *= 2
+    regressions = compare_to_baseline(results, report, tolerance=0.1)
+    assert {r["name"] for r in regressions} == {"baseline", "detector", "pipeline"}
+    assert all("throughput" in r["reasons"] for r in regressions)
+    
+    # `blackice bench` routes to the suite and exits non-zero on regression
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_path = os.path.join(tmp, "baseline.json")
+        argv = ["bench", "--sizes", "1000", "--only", "rolling_buffer", "--no-isolate",
+                "--baseline", baseline_path]
+        for expected in (0, 1):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cli_main(argv)
+            except SystemExit as e:
+                assert e.code == expected
+            with open(baseline_path) as f:
+                stored = json.load(f)
+            assert stored["results"][0]["name"] == "rolling_buffer"
+            stored["results"][0]["rows_per_second"] *= 100
+            with open(baseline_path, "w") as f:
+                json.dump(stored, f)
+    
+    print("  ✓ Benchmark suite passed")
+
+
+def test_synthetic_traces():
+    from blackice import synth
+    from blackice.pipeline import stream_machine_data
+    from blackice.learning.labels import IntervalFileLabels
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    import os
+    
+    print("Testing synthetic trace generator...")
+    
+    # Vectorized CSV rows match naive formatting, including short numbers
+    ts = np.array([0, 7, 10, 99, 100, 123456])
+    cpu = np.array([0, 5, 10, 55, 99, 100])
+    mem = cpu[::-1].copy()
+    expected = "".join(f"m_3,{t},{c},{m},,,,,\n" for t, c, m in zip(ts, cpu, mem)).encode()
+    assert synth.format_csv_rows("m_3", ts, cpu, mem) == expected
+    
+    config = synth.SynthConfig(n_machines=3, n_points=20000, seed=5, gap_rate=5.0, shift_rate=3.0)
+    traces = list(synth.generate(config))
+    truth = synth.ground_truth(config)
+    assert [t.machine_id for t in traces] == ["m_1", "m_2", "m_3"]
+    assert all(truth[t.machine_id] == t.intervals for t in traces)
+    assert sum(len(v) for v in truth.values()) > 0
+    
+    trace = traces[1]
+    steps = np.diff(trace.timestamps)
+    assert steps.min() == config.interval and steps.max() > config.interval  # gaps
+    assert len(trace) == synth.plan_machine(1, config).row_count()
+    assert 0 <= trace.cpu_util.min() and trace.cpu_util.max() <= 100
+    # Every ground-truth interval covers rendered rows
+    for interval in trace.intervals:
+        inside = (trace.timestamps >= interval.start_time) & (trace.timestamps <= interval.end_time)
+        assert inside.any()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "usage.csv")
+        written, labels = synth.write_csv(config, csv_path)
+        assert written == os.path.getsize(csv_path) and labels == truth
+        
+        loaded = pd.concat(list(stream_machine_data(csv_path, "m_2", chunksize=7000)))
+        assert loaded["timestamp"].tolist() == trace.timestamps.tolist()
+        assert loaded["cpu_util"].tolist() == trace.cpu_util.tolist()
+        
+        labels_path = os.path.join(tmp, "labels.csv")
+        synth.write_labels(labels, labels_path)
+        assert IntervalFileLabels(labels_path).label(loaded)["m_2"] == truth["m_2"]
+        
+        columnar_path = os.path.join(tmp, "usage")
+        _, columnar_labels = synth.write_columnar(config, columnar_path)
+        assert columnar_labels == truth
+        one = synth.read_columnar(columnar_path, "m_2")
+        assert one["timestamp"].tolist() == trace.timestamps.tolist()
+        assert one["mem_util"].tolist() == trace.mem_util.tolist()
+        assert len(synth.read_columnar(columnar_path)) == sum(len(t) for t in traces)
+    
+    print("  ✓ Synthetic traces passed")
+
+
+def test_lazy_imports():
+    from blackice.bench import STARTUP_PROBES, startup_probe
+    from blackice.pipeline import BlackicePipeline, PipelineConfig
+    import numpy as np
+    import pandas as pd
+    
+    print("Testing lazy imports...")
+    
+    # None of the start-up paths pull in numpy, pandas or yaml
+    for name, (code, _) in STARTUP_PROBES.items():
+        _, heavy = startup_probe(code, repeats=1)
+        assert heavy == [], (name, heavy)
+    
+    # The pipeline runs on plain column lists without ever importing pandas
+    rng = np.random.default_rng(4)
+    columns = {
+        "machine_id": ["m_dict"] * 400,
+        "timestamp": list(range(400)),
+        "cpu_util": (50 + rng.normal(0, 2, 400) + np.where(np.arange(400) > 250, 30, 0)).tolist(),
+        "mem_util": (40 + rng.normal(0, 2, 400)).tolist()
+    }
+    config = PipelineConfig(window_size=30, zscore_threshold=3.0, min_consecutive_points=5)
+    from_lists = BlackicePipeline(config, profile_memory=False)
+    events = from_lists.process_chunk(columns)
+    from_frame = BlackicePipeline(config, profile_memory=False)
+    assert [e.to_dict() for e in events] == [e.to_dict() for e in from_frame.process_chunk(pd.DataFrame(columns))]
+    assert events and from_lists.machine_id == "m_dict"
+    
+    code = (
+        "from blackice.pipeline import BlackicePipeline, PipelineConfig\n"
+        "BlackicePipeline(PipelineConfig(), profile_memory=False).process_chunk("
+        "{'timestamp': list(range(100)), 'cpu_util': [float(i % 7) for i in range(100)]})"
+    )
+    _, heavy = startup_probe(code, repeats=1)
+    assert heavy == ["numpy"], heavy
+    
+    print("  ✓ Lazy imports passed")
+
+
+def test_array_inputs():
+    from blackice.pipeline import BlackicePipeline, PipelineConfig
+    import numpy as np
+    import pandas as pd
+    
+    print("Testing array and record batch inputs...")
+    
+    rng = np.random.default_rng(11)
+    n = 600
+    timestamps = np.arange(n, dtype=np.int64) * 10
+    cpu = 50 + rng.normal(0, 2, n) + np.where(np.arange(n) > 350, 25, 0)
+    mem = 40 + rng.normal(0, 2, n) + np.where(np.arange(n) > 420, -20, 0)
+    frame = pd.DataFrame({"machine_id": "m_arr", "timestamp": timestamps, "cpu_util": cpu, "mem_util": mem})
+    config = PipelineConfig(window_size=40, zscore_threshold=3.0, min_consecutive_points=5)
+    
+    def run(feed):
+        pipeline = BlackicePipeline(config, profile_memory=False)
+        events = []
+        for lo in range(0, n, 250):
+            events += feed(pipeline, lo, lo + 250)
+        return pipeline, [e.to_dict() for e in events]
+    
+    _, expected = run(lambda p, lo, hi: p.process_chunk(frame.iloc[lo:hi]))
+    assert expected
+    
+    pipeline, from_arrays = run(lambda p, lo, hi: p.process_arrays(
+        timestamps[lo:hi], {"cpu": cpu[lo:hi], "memory": mem[lo:hi]}, machine_id="m_arr"
+    ))
+    assert from_arrays == expected and pipeline.machine_id == "m_arr"
+    
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    for bad in ({"disk": cpu}, {"cpu": cpu[:-1]}):
+        try:
+            pipeline.process_arrays(timestamps, bad)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("  ⊘ Record batches skipped (pyarrow not installed)")
+    else:
+        batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+        _, from_batches = run(lambda p, lo, hi: p.process_record_batch(batch.slice(lo, hi - lo)))
+        assert from_batches == expected
+    
+    print("  ✓ Array inputs passed")
+
+
+def test_metric_columns():
+    print("Testing metric columns...")
+    
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from blackice.pipeline import BlackicePipeline, PipelineConfig, MetricSpec, stream_machine_data
+    
+    config = PipelineConfig.from_dict({
+        "deviation": {"zscore_threshold": 2.0},
+        "metrics": {
+            "cpu": {"zscore_threshold": 4.0},
+            "memory": False,
+            "net_in": {"column": "c7", "window_size": 30, "min_consecutive_points": 5},
+        },
+    })
+    assert config.tracked_metrics == ["cpu", "net_in"]
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    assert pipeline.get_tracker("cpu").deviation.zscore_threshold == 4.0
+    assert pipeline.get_tracker("net_in").baseline.window_size == 30
+    assert pipeline.get_tracker("net_in").deviation.zscore_threshold == 2.0
+    assert pipeline.input_columns == ["machine_id", "timestamp", "cpu_util", "c7"]
+    
+    for bad in ({"disk": {}}, {"net_in": {"column": "c7", "zscore": 3}}):
+        try:
+            PipelineConfig.from_dict({"metrics": bad})
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    
+    rng = np.random.default_rng(5)
+    n = 3000
+    net = rng.normal(100, 5, n).round()
+    net[1500:] += 60
+    net[rng.choice(n, 40, replace=False)] = np.nan
+    frame = pd.DataFrame({
+        "machine_id": "m_7", "timestamp": np.arange(n) * 10,
+        "cpu_util": rng.normal(40, 3, n).round(), "mem_util": 50,
+        "c5": 0, "c6": 0, "c7": net, "c8": 0, "c9": 0,
+    })
+    
+    # Missing values are skipped for the metric they belong to only.
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    events = pipeline.process_chunk(frame)
+    shifts = [e for e in events if e.metric_name == "net_in"]
+    assert shifts
+    
+    alone = BlackicePipeline(PipelineConfig(track_cpu=False, track_memory=False, custom_metrics=[
+        MetricSpec("net_in", "c7", window_size=30, min_consecutive_points=5)
+    ]), profile_memory=False)
+    kept = frame[frame["c7"].notna()]
+    expected = alone.process_arrays(kept["timestamp"].to_numpy(), {"net_in": kept["c7"].to_numpy()}, machine_id="m_7")
+    assert [e.to_dict() for e in shifts] == [e.to_dict() for e in expected]
+    
+    # One read pass loads every configured column.
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = f"{tmp}/usage.csv"
+        frame.to_csv(csv_path, header=False, index=False)
+        pipeline = BlackicePipeline(config, profile_memory=False)
+        streamed = []
+        for chunk in stream_machine_data(csv_path, "m_7", chunksize=700, usecols=pipeline.input_columns):
+            assert list(chunk.columns) == pipeline.input_columns
+            streamed += pipeline.process_chunk(chunk)
+        assert [e.to_dict() for e in streamed] == [e.to_dict() for e in events]
+        assert "net_in" in pipeline.get_all_metrics()
+    
+    print("  ✓ Metric columns passed")
+
+
+def test_event_log():
+    print("Testing event log...")
+    
+    import numpy as np
+    from blackice.eventlog import EventLog
+    from blackice.pipeline import BlackicePipeline, PipelineConfig
+    from blackice.state import RegimeState
+    from blackice.synth import SynthConfig, generate
+    
+    # One log for the fleet, filled from one pipeline per machine
+    log = EventLog()
+    emitted = []
+    for trace in generate(SynthConfig(n_machines=2, n_points=20000, seed=8)):
+        pipeline = BlackicePipeline(PipelineConfig(window_size=30, min_consecutive_points=4), profile_memory=False)
+        events = pipeline.process_arrays(
+            trace.timestamps, {"cpu": trace.cpu_util, "memory": trace.mem_util}, machine_id=trace.machine_id
+        )
+        assert len(pipeline.event_log) == len(events)
+        log.extend(events)
+        emitted += events
+    assert len(log) == len(emitted) > 100
+    assert log.machines == ["m_1", "m_2"] and sorted(log.metrics) == ["cpu", "memory"]
+    
+    # Events read back with lazily rendered reasons; z-scores are float32
+    for stored, original in zip(log, emitted):
+        a, b = stored.to_dict(), original.to_dict()
+        assert a.pop("zscore") == float(np.float32(b.pop("zscore")))
+        assert a == b
+    assert log[-1].transition.reason == emitted[-1].transition.reason
+    
+    shifted = log.select(metric="cpu", machine_id="m_2", to_state=RegimeState.SHIFTED)
+    expected = [i for i, e in enumerate(emitted)
+                if e.metric_name == "cpu" and e.machine_id == "m_2" and e.transition.to_state == RegimeState.SHIFTED]
+    assert shifted.tolist() == expected
+    
+    # 33 bytes per event against ~430 for the StateEvent objects
+    assert log.nbytes < 40 * len(log)
+    
+    columns = log.columns()
+    assert columns["timestamp"].dtype == np.int64 and len(columns["to_state"]) == len(log)
+    
+    # Directions are stored with the same signed codes as the batch paths
+    from blackice.deviation import DIRECTION_CODES
+    assert columns["direction"].tolist() == [DIRECTION_CODES[e.transition.direction] for e in emitted]
+    assert set(columns["direction"].tolist()) == {-1, 0, 1}
+    
+    try:
+        import pyarrow as pa  # noqa: F401
+    except ImportError:
+        print("  ⊘ Arrow export skipped (pyarrow not installed)")
+    else:
+        batch = log.to_arrow()
+        assert batch.num_rows == len(log)
+        assert batch.column(0).buffers()[1].address == columns["timestamp"].ctypes.data
+        assert batch.column(4).dictionary.to_pylist() == ["NORMAL", "UNSTABLE", "SHIFTED"]
+        assert batch.column(5).to_pylist() == [e.transition.direction.value for e in emitted]
+    
+    empty = EventLog()
+    assert len(empty) == 0 and len(empty.columns()["zscore"]) == 0
+    
+    print("  ✓ Event log passed")
+
+
+def test_transition_queries():
+    print("Testing transition queries...")
+    
+    import numpy as np
+    from blackice.pipeline import BlackicePipeline, PipelineConfig
+    from blackice.state import RegimeState
+    from blackice.synth import SynthConfig, generate
+    
+    trace = next(generate(SynthConfig(n_machines=1, n_points=20000, seed=11)))
+    config = PipelineConfig(window_size=30, min_consecutive_points=3, min_fraction_of_window=0.1)
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    emitted = []
+    for lo in range(0, len(trace), 3000):
+        emitted += pipeline.process_arrays(
+            trace.timestamps[lo:lo + 3000],
+            {"cpu": trace.cpu_util[lo:lo + 3000], "memory": trace.mem_util[lo:lo + 3000]}
+        )
+    
+    transitions = pipeline.get_transitions("cpu")
+    assert any(t.to_state == RegimeState.SHIFTED for t in transitions)
+    # The history is kept column-wise and rebuilt on request, reasons included
+    assert [t.to_dict() for t in transitions] == [
+        e.transition.to_dict() for e in emitted if e.metric_name == "cpu"
+    ]
+    first, last = int(trace.timestamps[0]), int(trace.timestamps[-1])
+    
+    def scan_state(ts):
+        state = RegimeState.NORMAL
+        for t in transitions:
+            if t.timestamp <= ts:
+                state = t.to_state
+        return state
+    
+    def scan_dwell(start, end):
+        # Walk the timeline once, clipping every state span to [start, end)
+        dwell = {state.value: 0 for state in RegimeState}
+        edges = [(first, RegimeState.NORMAL)] + [(t.timestamp, t.to_state) for t in transitions] + [(last, None)]
+        for (t0, state), (t1, _) in zip(edges, edges[1:]):
+            dwell[state.value] += max(0, min(t1, end) - max(t0, start))
+        return dwell
+    
+    rng = np.random.default_rng(0)
+    probes = [int(t) for t in rng.integers(first - 100, last + 100, 200)]
+    probes += [t.timestamp for t in transitions[:20]]
+    for ts in probes:
+        assert pipeline.state_at("cpu", ts) == scan_state(ts), ts
+    for a, b in zip(probes[::2], probes[1::2]):
+        start, end = min(a, b), max(a, b)
+        assert pipeline.transitions_between("cpu", start, end) == [
+            t for t in transitions if start <= t.timestamp <= end
+        ]
+        assert pipeline.dwell_times("cpu", start, end) == scan_dwell(max(start, first), min(end, last))
+    
+    dwell = pipeline.get_all_metrics()["cpu"]["dwell_time"]
+    assert sum(dwell.values()) == last - first and dwell == scan_dwell(first, last)
+    assert pipeline.state_at("disk", first) is None and pipeline.dwell_times("disk") == {}
+    
+    print("  ✓ Transition queries passed")
+
+
+def test_snapshot_replay():
+    print("Testing snapshots and replay...")
+    
+    import os
+    import tempfile
+    import numpy as np
+    from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
+    from blackice.replay import default_snapshot_path, replay
+    from blackice.snapshots import SnapshotIndex, SnapshotWriter, index_path
+    from blackice.synth import SynthConfig, generate, write_csv
+    
+    config = PipelineConfig(window_size=30, min_consecutive_points=3, min_fraction_of_window=0.1,
+                            use_window_fraction=True)
+    trace = next(generate(SynthConfig(n_machines=1, n_points=20000, seed=11)))
+    
+    def feed(pipeline, lo, hi):
+        return [e.to_dict() for e in pipeline.process_arrays(
+            trace.timestamps[lo:hi], {"cpu": trace.cpu_util[lo:hi], "memory": trace.mem_util[lo:hi]},
+            machine_id="m_1"
+        )]
+    
+    full = feed(BlackicePipeline(config, profile_memory=False), 0, len(trace))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Snapshotting does not change the output, and every snapshot
+        # resumes the stream exactly
+        pipeline = BlackicePipeline(config, profile_memory=False)
+        with SnapshotWriter(f"{tmp}/snaps.jsonl", every_points=2500, every_seconds=40000) as writer:
+            pipeline.attach_snapshots(writer)
+            chunked = []
+            for lo in range(0, len(trace), 3333):
+                chunked += feed(pipeline, lo, lo + 3333)
+        assert chunked == full
+        
+        index = SnapshotIndex(f"{tmp}/snaps.jsonl")
+        assert len(index) == writer.written >= 7 and index.rows[:2] == [2500, 5000]
+        # The index file spares parsing every snapshot; without it (or when
+        # it no longer matches the sidecar) the sidecar is scanned instead
+        os.rename(index_path(f"{tmp}/snaps.jsonl"), f"{tmp}/saved.idx")
+        scanned = SnapshotIndex(f"{tmp}/snaps.jsonl")
+        assert (scanned.timestamps, scanned.rows, scanned._offsets) == (index.timestamps, index.rows, index._offsets)
+        with open(f"{tmp}/saved.idx") as f:
+            first = f.readline()
+        with open(index_path(f"{tmp}/snaps.jsonl"), "w") as f:
+            f.write(first)
+        assert len(SnapshotIndex(f"{tmp}/snaps.jsonl")) == len(index)
+        os.replace(f"{tmp}/saved.idx", index_path(f"{tmp}/snaps.jsonl"))
+        for position in (0, len(index) // 2, len(index) - 1):
+            snapshot = index.load(position)
+            resumed = BlackicePipeline.from_snapshot(snapshot)
+            assert feed(resumed, snapshot["rows"], len(trace)) == [
+                e for e in full if e["timestamp"] > snapshot["timestamp"]
+            ]
+        assert index.nearest_before(int(trace.timestamps[0])) is None
+        
+        # Replay a slice of a CSV run from its nearest snapshot
+        csv_path = f"{tmp}/usage.csv"
+        write_csv(SynthConfig(n_machines=2, n_points=20000, seed=11), csv_path)
+        pipeline = BlackicePipeline(config, profile_memory=False)
+        with SnapshotWriter(default_snapshot_path(csv_path, "m_2"), every_points=3000) as writer:
+            pipeline.attach_snapshots(writer)
+            for chunk in stream_machine_data(csv_path, "m_2", chunksize=5000):
+                pipeline.process_chunk(chunk)
+        series = pipeline.get_time_series_data("cpu")
+        
+        start, end = series["timestamps"][12345], series["timestamps"][12600]
+        points, events, snapshot = replay(csv_path, "m_2", start, end, chunksize=5000)
+        assert snapshot is not None and snapshot["rows"] == 12000
+        # (the pipeline's event log keeps z-scores as float32)
+        expected = [e.to_dict() for e in pipeline.events if start <= e.transition.timestamp <= end]
+        assert expected and [
+            dict(e.to_dict(), zscore=float(np.float32(e.transition.zscore))) for e in events
+        ] == expected
+        
+        cpu = [p for p in points if p["metric"] == "cpu"]
+        assert [p["timestamp"] for p in cpu] == series["timestamps"][12345:12601]
+        assert [p["mean"] for p in cpu] == series["means"][12345:12601]
+        assert [p["zscore"] for p in cpu] == series["zscores"][12345:12601]
+        for p in cpu:
+            assert p["state"] == pipeline.state_at("cpu", p["timestamp"]).value
+            assert (p["run"] > 0) == (abs(p["zscore"]) >= config.zscore_threshold)
+    
+    print("  ✓ Snapshots and replay passed")
+
+
+def test_warm_start():
+    print("Testing baseline warm start...")
+    
+    import tempfile
+    from blackice import RegimeDetector
+    from blackice.baseline import BaselineComputer
+    from blackice.pipeline import BlackicePipeline, PipelineConfig
+    from blackice.synth import SynthConfig, generate
+    from blackice.warmstart import BaselineSeed, WarmStartTable
+    
+    # A (count, mean, M2) summary gives a ready baseline with those moments,
+    # scaled to one window for longer histories
+    baseline = BaselineComputer(window_size=60)
+    baseline.seed_stats(count=1000, mean=42.0, m2=1000 * 9.0)
+    assert baseline.is_ready and baseline.mean == 42.0
+    assert abs(baseline.variance - 9.0) < 1e-12 and abs(baseline.std - 3.0) < 1e-12
+    baseline.seed_stats(count=7, mean=5.0, m2=7 * 4.0)
+    assert baseline.count == 7 and not baseline.is_ready and abs(baseline.variance - 4.0) < 1e-12
+    
+    detector = RegimeDetector(window_size=30)
+    assert not detector.is_calibrated
+    detector.warm_start(values=[float(i % 5) for i in range(100)])
+    assert detector.is_calibrated and detector.baseline.window_values()[-1] == 4.0
+    assert detector.update(50.0, timestamp=0).zscore > 10
+    
+    # A restarted pipeline seeded from the saved table picks up where the
+    # previous process stopped instead of going blind for a window
+    config = PipelineConfig(window_size=60, min_consecutive_points=3, min_fraction_of_window=0.05)
+    traces = list(generate(SynthConfig(n_machines=3, n_points=6000, seed=2)))
+    cut = 4000
+    
+    def run(trace, lo, hi, table=None):
+        pipeline = BlackicePipeline(config, profile_memory=False)
+        if table is not None:
+            assert pipeline.warm_start(table, trace.machine_id) == 2
+        events = pipeline.process_arrays(
+            trace.timestamps[lo:hi], {"cpu": trace.cpu_util[lo:hi], "memory": trace.mem_util[lo:hi]},
+            machine_id=trace.machine_id
+        )
+        return pipeline, [(e.metric_name, e.transition.timestamp, e.transition.to_state) for e in events]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        table = WarmStartTable()
+        for trace in traces:
+            before, _ = run(trace, 0, cut)
+            assert table.capture(before) == 2
+        table.save(f"{tmp}/baselines.csv")
+        
+        loaded = WarmStartTable.load(f"{tmp}/baselines.csv")
+        assert len(loaded) == 6 and ("m_2", "cpu") in loaded
+        assert loaded.get("m_2", "cpu").window == table.get("m_2", "cpu").window
+        
+        for trace in traces:
+            uninterrupted, _ = run(trace, 0, len(trace))
+            resumed, _ = run(trace, cut, len(trace), loaded)
+            _, cold_events = run(trace, cut, len(trace))
+            # Scores match the uninterrupted run from the first point (up to
+            # float rounding: the window is re-summed from scratch)
+            for metric in ("cpu", "memory"):
+                expected = uninterrupted.get_time_series_data(metric)["zscores"][cut:]
+                got = resumed.get_time_series_data(metric)["zscores"]
+                assert max(abs(a - b) for a, b in zip(expected, got)) < 1e-6
+            assert resumed.get_tracker("cpu").baseline.total_count == 60 + len(trace) - cut
+            # while a cold start scores nothing during its first window
+            first_scored = int(trace.timestamps[cut + 59])
+            assert cold_events and all(ts >= first_scored for _, ts, _ in cold_events)
+        
+        # Summary-only seeds (no window column) also start scoring at once
+        stats_only = WarmStartTable()
+        for key in loaded:
+            seed = loaded.get(*key)
+            stats_only.set(*key, BaselineSeed(seed.count, seed.mean, seed.m2))
+        stats_only.save(f"{tmp}/stats.csv")
+        pipeline, events = run(traces[0], cut, len(traces[0]), WarmStartTable.load(f"{tmp}/stats.csv"))
+        assert pipeline.get_tracker("memory").baseline.is_ready
+        assert events and events[0][1] < int(traces[0].timestamps[cut + 60])
+    
+    print("  ✓ Warm start passed")
+
+
+def test_backfill():
+    print("Testing sharded backfill...")
+    
+    import numpy as np
+    from blackice.backfill import backfill
+    from blackice.baseline import BaselineComputer, rolling_moments
+    from blackice.pipeline import BlackicePipeline, PipelineConfig
+    from blackice.synth import SynthConfig, generate
+    
+    # The serial moments are computed up front, and a baseline seeded with
+    # them mid-stream continues bit for bit like the serial one
+    values = np.concatenate([np.random.default_rng(5).normal(50, 4, 1000), np.full(100, 7.0)])
+    means, m2s = rolling_moments(values, 60)
+    serial = BaselineComputer(window_size=60)
+    for i, value in enumerate(values[:700]):
+        serial.update(value)
+        assert (serial.mean, serial.summary()[2]) == (means[i], m2s[i])
+    seeded = BaselineComputer(window_size=60)
+    seeded.seed_values(values[640:700], total_count=700, moments=(means[699], m2s[699]))
+    for value in values[700:]:
+        serial.update(value)
+        seeded.update(value)
+        assert (serial.mean, serial.std) == (seeded.mean, seeded.std)
+    assert (serial.mean, serial.summary()[2]) == (means[-1], m2s[-1])
+    
+    trace = next(iter(generate(SynthConfig(n_machines=1, n_points=20000, seed=4))))
+    memory = trace.mem_util.astype(float)
+    memory[::97] = np.nan
+    metrics = {"cpu": trace.cpu_util, "memory": memory}
+    
+    corrected = []
+    for config in (
+        PipelineConfig(window_size=60, min_consecutive_points=3, use_window_fraction=True, min_fraction_of_window=0.05),
+        PipelineConfig(window_size=30, min_consecutive_points=5)
+    ):
+        # Same events as the regular pipeline a plain `blackice` run uses
+        expected = BlackicePipeline(config, profile_memory=False).process_arrays(
+            trace.timestamps, metrics, machine_id=trace.machine_id
+        )
+        assert expected
+        for n_jobs, shards in ((1, 7), (2, 3)):
+            result = backfill(trace.timestamps, metrics, config, machine_id=trace.machine_id, n_jobs=n_jobs, shards=shards)
+            assert result.shards == shards
+            assert [e.to_dict() for e in result.events] == [e.to_dict() for e in expected]
+            # Only the stretches straddling a boundary are re-run
+            assert result.corrected_rows < len(trace.timestamps) // 2
+            corrected.append(result.corrected_rows)
+    assert any(corrected)
+    
+    print("  ✓ Sharded backfill passed")
+
+
+def test_prefetch():
+    print("Testing prefetching reader...")
+    
+    import tempfile
+    import threading
+    from blackice.pipeline import stream_machine_data
+    from blackice.synth import SynthConfig, write_csv
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = f"{tmp}/usage.csv"
+        write_csv(SynthConfig(n_machines=3, n_points=4000, seed=8), csv_path)
+        
+        # Same chunks, in the same order, at any read-ahead depth
+        plain = list(stream_machine_data(csv_path, "m_1", chunksize=1500))
+        for depth in (1, 3):
+            ahead = list(stream_machine_data(csv_path, "m_1", chunksize=1500, prefetch=depth))
+            assert len(ahead) == len(plain) > 2
+            assert all(a.equals(b) for a, b in zip(ahead, plain))
+        
+        # Stopping early shuts the reader thread down
+        reader = stream_machine_data(csv_path, "m_1", chunksize=1500, prefetch=1)
+        next(reader)
+        reader.close()
+        assert not any(t.name == "blackice-prefetch" for t in threading.enumerate())
+        
+        # Reader errors surface in the consumer
+        try:
+            list(stream_machine_data(f"{tmp}/missing.csv", "m_1", prefetch=1))
+            assert False, "expected FileNotFoundError"
+        except FileNotFoundError:
+            pass
+    
+    print("  ✓ Prefetching reader passed")
+
+
+def test_chunk_sizer():
+    print("Testing adaptive chunk sizing...")
+    
+    import tempfile
+    import pandas as pd
+    from blackice.chunking import ChunkSizer
+    from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
+    from blackice.synth import SynthConfig, write_csv
+    
+    # Doubles while throughput improves, then settles on the best size
+    sizer = ChunkSizer(memory_budget_mb=1024, initial_rows=1000)
+    for rate in (1e5, 2e5, 3e5, 3.05e5, 1e6):
+        size = sizer.next_size()
+        sizer.observe(size, 100.0, size / rate)
+    assert sizer.sizes == [1000, 2000, 4000, 8000, 4000]
+    assert sizer.settled and sizer.next_size() == 4000
+    
+    # The memory ceiling (bytes/row x parse overhead x chunks in flight) caps it
+    tight = ChunkSizer(memory_budget_mb=1, initial_rows=50_000, min_rows=100, in_flight=2)
+    size = tight.next_size()
+    tight.observe(size, 64.0, 0.1)
+    assert tight.ceiling == 1024 * 1024 // (64 * 2 * 2) and tight.next_size() == tight.ceiling
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = f"{tmp}/usage.csv"
+        write_csv(SynthConfig(n_machines=4, n_points=5000, seed=6), csv_path)
+        
+        # Same rows as a fixed chunksize, whatever sizes are chosen
+        fixed = pd.concat(list(stream_machine_data(csv_path, "m_2", chunksize=3000)))
+        sizer = ChunkSizer(memory_budget_mb=4, initial_rows=1000, min_rows=500)
+        config = PipelineConfig(window_size=30, min_consecutive_points=3)
+        pipeline = BlackicePipeline(config, profile_memory=False)
+        pipeline.attach_chunk_sizer(sizer)
+        chunks = list(stream_machine_data(csv_path, "m_2", sizer=sizer, prefetch=1))
+        assert pd.concat(chunks).reset_index(drop=True).equals(fixed.reset_index(drop=True))
+        assert len(sizer.sizes) > 3 and sizer.bytes_per_row > 0
+        
+        for chunk in chunks:
+            pipeline.process_chunk(chunk)
+        systems = pipeline.get_all_metrics()["systems"]
+        assert systems["chunk_sizes"] == sizer.sizes and systems["memory_budget_mb"] == 4
+    
+    print("  ✓ Adaptive chunk sizing passed")
+
+
+def test_fanout():
+    print("Testing shared-memory fan-out...")
+    
+    import tempfile
+    from dataclasses import replace
+    import pandas as pd
+    from blackice.fanout import run_fleet
+    from blackice.learning.params import ParameterTable
+    from blackice.pipeline import MACHINE_USAGE_COLUMNS, BlackicePipeline, PipelineConfig, stream_machine_data
+    from blackice.synth import SynthConfig, generate
+    from blackice.warmstart import WarmStartTable
+    
+    # Machines interleaved row by row, as in the real trace
+    frames = [
+        pd.DataFrame({"machine_id": t.machine_id, "timestamp": t.timestamps,
+                      "cpu_util": t.cpu_util, "mem_util": t.mem_util})
+        for t in generate(SynthConfig(n_machines=5, n_points=4000, seed=9))
+    ]
+    df = pd.concat(frames).sort_values(["timestamp", "machine_id"], kind="stable")
+    df = df.reindex(columns=MACHINE_USAGE_COLUMNS)
+    config = PipelineConfig(window_size=30, min_consecutive_points=3)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = f"{tmp}/usage.csv"
+        df.to_csv(csv_path, header=False, index=False)
+        
+        # Tiny rings force slot wrap-around, runs split across slots and
+        # the reader blocking on full rings
+        run = run_fleet(csv_path, config, n_workers=2, chunksize=1500, slots=2, slot_rows=700, max_runs=3)
+        assert run.rows == len(df) and sorted(run.machines) == [f"m_{i}" for i in range(1, 6)]
+        
+        warm = WarmStartTable()
+        plain = {machine_id: [e.to_dict() for e in result.events] for machine_id, result in run.machines.items()}
+        for machine_id, result in run.machines.items():
+            serial = BlackicePipeline(config, profile_memory=False)
+            for chunk in stream_machine_data(csv_path, machine_id, chunksize=1500):
+                serial.process_chunk(chunk)
+            assert len(result.events) > 0
+            assert [e.to_dict() for e in result.events] == [e.to_dict() for e in serial.events]
+            assert result.metrics["systems"]["rows_processed"] == serial.rows_processed
+            if machine_id != "m_5":
+                warm.capture(serial)
+        
+        # Learned parameters and warm starts are resolved per machine in
+        # the worker; machines missing from a table use the defaults
+        params = ParameterTable()
+        params.set("m_2", replace(config, window_size=50, zscore_threshold=2.5))
+        params.set("m_3", replace(config, min_consecutive_points=6))
+        params.save(f"{tmp}/params.csv")
+        warm.save(f"{tmp}/warm.csv")
+        run = run_fleet(csv_path, config, n_workers=2, chunksize=1500,
+                        params_path=f"{tmp}/params.csv", warm_start_path=f"{tmp}/warm.csv")
+        for machine_id, result in run.machines.items():
+            serial = BlackicePipeline(params.config_for(machine_id, config), profile_memory=False)
+            assert serial.warm_start(warm, machine_id) == (0 if machine_id == "m_5" else 2)
+            for chunk in stream_machine_data(csv_path, machine_id, chunksize=1500):
+                serial.process_chunk(chunk)
+            assert [e.to_dict() for e in result.events] == [e.to_dict() for e in serial.events]
+        assert [e.to_dict() for e in run.machines["m_2"].events] != plain["m_2"]
+    
+    print("  ✓ Shared-memory fan-out passed")
+
+
 def test_integration_real_data():
     from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
     from pathlib import Path
@@ -358,10 +1747,35 @@ def main():
         test_baseline_computer,
         test_deviation_tracker,
         test_persistence_validator,
+        test_persistence_batch,
+        test_window_fraction_persistence,
         test_state_machine,
         test_pipeline_config,
         test_pipeline_synthetic,
         test_metrics_computation,
+        test_interval_indexed_loss,
+        test_optimizer_factorized_grid,
+        test_parallel_grid_search,
+        test_search_strategies,
+        test_fleet_training,
+        test_label_sources,
+        test_streaming_training,
+        test_evaluation_cache,
+        test_rolling_origin_cv,
+        test_threshold_calibration,
+        test_bench_suite,
+        test_synthetic_traces,
+        test_lazy_imports,
+        test_array_inputs,
+        test_metric_columns,
+        test_event_log,
+        test_transition_queries,
+        test_snapshot_replay,
+        test_warm_start,
+        test_backfill,
+        test_prefetch,
+        test_chunk_sizer,
+        test_fanout,
         test_integration_real_data,
     ]
     
@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from blackice.baseline import rolling_moments
+from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
+from blackice.state import RegimeState, StateEvent
+
+# A shard is compared with the corrected serial state at most this many
+# times before the rest of it is simply re-run.
+MAX_CHECKPOINTS = 64
+
+
+@dataclass
+class ShardTask:
+    """Inputs of one shard: its rows plus the history needed to warm it up."""
+    config: Dict[str, Any]
+    machine_id: str
+    start: int
+    timestamps: np.ndarray
+    metrics: Dict[str, np.ndarray]
+    # Per metric: (last window of finite values before `start`, finite values
+    # before `start`, serial baseline (mean, M2) at `start` or None if none).
+    seeds: Dict[str, Tuple[List[float], int, Optional[Tuple[float, float]]]]
+    checkpoint_rows: int
+
+
+@dataclass
+class ShardResult:
+    """One shard's output, computed independently of the shards before it."""
+    start: int
+    stop: int
+    # Absolute rows at which the detector state was recorded; the first is `start`.
+    checkpoints: List[int] = field(default_factory=list)
+    signatures: List[Any] = field(default_factory=list)
+    # Events between consecutive checkpoints (the last piece runs to `stop`).
+    pieces: List[List[StateEvent]] = field(default_factory=list)
+    final: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BackfillResult:
+    events: List[StateEvent]
+    rows: int
+    shards: int
+    # Rows re-run serially by the correction pass.
+    corrected_rows: int
+    elapsed_s: float
+
+
+def _signature(pipeline: BlackicePipeline) -> Any:
+    """
+    The part of the detector state that decides all future output.
+    
+    Ring-buffer positions, EWMA, the last significant z-score and the
+    state machine's direction outside SHIFTED never change an event, so
+    they are left out; otherwise a shard could never agree with the
+    serial run it is being stitched onto.
+    """
+    parts = []
+    for metric in pipeline.columns:
+        tracker = pipeline.get_tracker(metric)
+        assert tracker is not None
+        _, mean, m2 = tracker.baseline.summary()
+        persistence = tracker.persistence.snapshot()
+        persistence.pop("window")
+        state = tracker.state_machine.snapshot()
+        if state["state"] != RegimeState.SHIFTED.value:
+            state.pop("direction")
+        parts.append((
+            metric,
+            tracker.baseline.window_values(), mean, m2, tracker.baseline.total_count,
+            tracker.deviation.consecutive_deviations,
+            tracker.deviation.deviation_start_ts,
+            tracker.deviation.current_direction.value,
+            sorted(persistence.items()), tracker.persistence.window_flags,
+            sorted(state.items())
+        ))
+    return parts
+
+
+def _run_shard(task: ShardTask) -> ShardResult:
+    """Runs one shard from the serial baseline state at its first row."""
+    pipeline = BlackicePipeline(PipelineConfig.from_fields(task.config), profile_memory=False)
+    for metric, (window, seen, moments) in task.seeds.items():
+        tracker = pipeline.get_tracker(metric)
+        assert tracker is not None
+        tracker.baseline.seed_values(window, total_count=seen, moments=moments)
+    
+    n = len(task.timestamps)
+    result = ShardResult(start=task.start, stop=task.start + n)
+    bounds = list(range(0, n, task.checkpoint_rows))[:MAX_CHECKPOINTS] + [n]
+    for lo, hi in zip(bounds, bounds[1:]):
+        result.checkpoints.append(task.start + lo)
+        result.signatures.append(_signature(pipeline))
+        metrics = {name: values[lo:hi] for name, values in task.metrics.items()}
+        result.pieces.append(pipeline.process_arrays(task.timestamps[lo:hi], metrics, machine_id=task.machine_id))
+    result.final = pipeline.snapshot()
+    return result
+
+
+def _shard_bounds(n: int, shards: int, min_rows: int) -> List[int]:
+    shards = max(1, min(shards, n // max(min_rows, 1)))
+    return [n * i // shards for i in range(shards + 1)]
+
+
+def backfill(
+    timestamps: Any,
+    metrics: Dict[str, Any],
+    config: PipelineConfig,
+    machine_id: str = "",
+    n_jobs: int = -1,
+    shards: Optional[int] = None,
+    checkpoint_rows: Optional[int] = None
+) -> BackfillResult:
+    """
+    Runs one long series in parallel time shards, with serial output.
+    
+    Each shard starts from baselines seeded with the window of values
+    before it and the serial run's (mean, M2) there, computed up front
+    with rolling_moments, so every shard's baselines match the serial
+    ones bit for bit. Deviation runs, persistence and state-machine state
+    can still straddle a boundary, so shards are stitched in order: the
+    previous shard's final state is restored and the new shard is re-run
+    serially until its state agrees with the shard's own at a checkpoint;
+    from there on the shard's events are taken as they are.
+    
+    Args:
+        timestamps: Sorted timestamps of every row.
+        metrics: Metric name -> values per row (NaN = missing), as for
+            BlackicePipeline.process_arrays.
+        config: Detector configuration.
+        machine_id: Recorded on every event.
+        n_jobs: Worker processes (-1 for all cores).
+        shards: Number of shards (default: one per worker).
+        checkpoint_rows: Rows between state comparisons within a shard
+            (default: four of the largest window).
+    
+    Returns:
+        BackfillResult whose events equal a serial process_arrays run of
+        BlackicePipeline(config).
+    """
+    start_time = time.time()
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    columns = {name: np.asarray(values, dtype=np.float64) for name, values in metrics.items()}
+    n = len(timestamps)
+    workers = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    
+    probe = BlackicePipeline(config, profile_memory=False)
+    windows = {}
+    for name in columns:
+        tracker = probe.get_tracker(name)
+        if tracker is None:
+            raise ValueError(f"Unknown metric: {name} (tracking {list(probe.columns)})")
+        windows[name] = tracker.baseline.window_size
+    largest = max(windows.values(), default=config.window_size)
+    every = checkpoint_rows or 4 * largest
+    bounds = _shard_bounds(n, shards or workers, 2 * every)
+    
+    present = {name: np.flatnonzero(np.isfinite(values)) for name, values in columns.items()}
+    moments = {name: rolling_moments(columns[name][rows], windows[name]) for name, rows in present.items()}
+    tasks = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        seeds = {}
+        for name, values in columns.items():
+            seen = int(np.searchsorted(present[name], lo))
+            window = present[name][max(seen - windows[name], 0):seen]
+            means, m2s = moments[name]
+            at = (float(means[seen - 1]), float(m2s[seen - 1])) if seen else None
+            seeds[name] = (values[window].tolist(), seen, at)
+        tasks.append(ShardTask(
+            config=config.to_dict(),
+            machine_id=machine_id,
+            start=lo,
+            timestamps=timestamps[lo:hi],
+            metrics={name: values[lo:hi] for name, values in columns.items()},
+            seeds=seeds,
+            checkpoint_rows=every
+        ))
+    
+    if workers == 1 or len(tasks) == 1:
+        results = [_run_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_run_shard, tasks))
+    
+    events: List[StateEvent] = []
+    corrected = 0
+    exact: Optional[Dict[str, Any]] = None
+    for result in results:
+        if exact is None:
+            # The first shard starts from scratch, exactly like a serial run.
+            for piece in result.pieces:
+                events.extend(piece)
+            exact = result.final
+            continue
+        
+        # Correction pass: continue the serial state into this shard until
+        # it agrees with the shard's own state at a checkpoint.
+        pipeline = BlackicePipeline.from_snapshot(exact)
+        stops = result.checkpoints[1:] + [result.stop]
+        matched = False
+        for i, (row, stop) in enumerate(zip(result.checkpoints, stops)):
+            if _signature(pipeline) == result.signatures[i]:
+                for piece in result.pieces[i:]:
+                    events.extend(piece)
+                exact = result.final
+                matched = True
+                break
+            piece_metrics = {name: values[row:stop] for name, values in columns.items()}
+            events.extend(pipeline.process_arrays(timestamps[row:stop], piece_metrics, machine_id=machine_id))
+            corrected += stop - row
+        if not matched:
+            exact = pipeline.snapshot()
+    
+    return BackfillResult(
+        events=events,
+        rows=n,
+        shards=len(tasks),
+        corrected_rows=corrected,
+        elapsed_s=time.time() - start_time
+    )
+
+
+def load_machine(data_path: str, machine_id: str, columns: List[str], chunksize: int = 500000) -> Any:
+    """One machine's rows, in the order a serial `blackice` run sees them."""
+    import pandas as pd
+    
+    if os.path.isdir(data_path):
+        from blackice.synth import read_columnar
+        
+        return read_columnar(data_path, machine_id)
+    chunks = list(stream_machine_data(data_path, machine_id, chunksize=chunksize, usecols=columns))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from blackice.cli import load_config
+    
+    parser = argparse.ArgumentParser(
+        prog="blackice backfill",
+        description="Process one machine's full history in parallel time shards (same events as a plain blackice run)"
+    )
+    parser.add_argument("data", help="machine_usage.csv (or columnar directory)")
+    parser.add_argument("--machine", "-m", required=True, help="Machine ID")
+    parser.add_argument("--config", "-c", default="configs/default.yaml", help="Path to configuration YAML file")
+    parser.add_argument("--jobs", "-j", type=int, default=-1, help="Worker processes (-1 = all cores)")
+    parser.add_argument("--shards", type=int, help="Number of time shards (default: one per worker)")
+    parser.add_argument("--chunksize", type=int, default=500000, help="CSV rows per read chunk")
+    parser.add_argument("--verify", action="store_true", help="Also run the regular serial pipeline and compare the events")
+    parser.add_argument("--output", "-o", help="Write the events as JSON here")
+    
+    args = parser.parse_args(argv)
+    config = PipelineConfig.from_dict(load_config(args.config)) if Path(args.config).exists() else PipelineConfig()
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    
+    frame = load_machine(args.data, args.machine, pipeline.input_columns, args.chunksize)
+    timestamps = np.asarray(frame["timestamp"], dtype=np.int64)
+    metrics = {name: frame[column].to_numpy() for name, column in pipeline.columns.items() if column in frame}
+    
+    print("BLACKICE Backfill")
+    print(f"Machine: {args.machine}  Rows: {len(timestamps):,}")
+    result = backfill(timestamps, metrics, config, machine_id=args.machine, n_jobs=args.jobs, shards=args.shards)
+    rate = result.rows / result.elapsed_s if result.elapsed_s > 0 else 0.0
+    print(f"  Shards: {result.shards}  Re-run at boundaries: {result.corrected_rows:,} rows")
+    print(f"  Transitions: {len(result.events):,}  Time: {result.elapsed_s:.2f}s ({rate:,.0f} rows/s)")
+    
+    status = 0
+    if args.verify:
+        start = time.time()
+        serial = pipeline.process_arrays(timestamps, metrics, machine_id=args.machine)
+        same = [e.to_dict() for e in serial] == [e.to_dict() for e in result.events]
+        print(f"  Serial: {time.time() - start:.2f}s  {'identical' if same else 'MISMATCH'}")
+        status = 0 if same else 1
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([e.to_dict() for e in result.events], f, indent=2)
+        print(f"  Written to {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,11 @@
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 import math
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 @dataclass(frozen=True)
 class BaselineStats:
@@ -48,15 +51,33 @@ class RollingBuffer:
     def capacity(self) -> int:
         return self._capacity
     
+    def values(self) -> List[float]:
+        # Oldest first.
+        if self._size < self._capacity:
+            window = self._buffer[:self._size]
+        else:
+            window = self._buffer[self._head:] + self._buffer[:self._head]
+        return [value for value in window if value is not None]
+    
     def clear(self) -> None:
         self._buffer = [None] * self._capacity
         self._head = 0
         self._size = 0
+    
+    def snapshot(self) -> dict:
+        return {"buffer": list(self._buffer), "head": self._head, "size": self._size}
+    
+    def restore(self, state: dict) -> None:
+        if len(state["buffer"]) != self._capacity:
+            raise ValueError(f"snapshot holds {len(state['buffer'])} slots, buffer has {self._capacity}")
+        self._buffer = list(state["buffer"])
+        self._head = state["head"]
+        self._size = state["size"]
 
 
 class BaselineComputer:
     __slots__ = (
-        'window_size', 'use_ewma', 'ewma_alpha', 'min_std',
+        'window_size', 'use_ewma', 'ewma_alpha', 'min_std', 'reanchor',
         '_buffer', '_mean', '_m2', '_ewma', '_total_count'
     )
     
@@ -65,7 +86,8 @@ class BaselineComputer:
         window_size: int,
         use_ewma: bool = False,
         ewma_alpha: float = 0.3,
-        min_std: float = 1e-8
+        min_std: float = 1e-8,
+        reanchor: bool = False
     ) -> None:
         if window_size < 2:
             raise ValueError("window_size must be at least 2")
@@ -78,6 +100,8 @@ class BaselineComputer:
         self.use_ewma = use_ewma
         self.ewma_alpha = ewma_alpha
         self.min_std = min_std
+        # Recompute the moments exactly once per window (see _reanchor).
+        self.reanchor = reanchor
         
         self._buffer = RollingBuffer(window_size)
         self._mean: float = 0.0
@@ -108,6 +132,9 @@ class BaselineComputer:
             )
             self._m2 = max(0.0, self._m2)
         
+        if self.reanchor and self._total_count % self.window_size == 0 and self._buffer.is_full:
+            self._reanchor()
+        
         if self.use_ewma:
             if self._ewma is None:
                 self._ewma = value
@@ -116,6 +143,39 @@ class BaselineComputer:
         
         return True
     
+    def _reanchor(self) -> None:
+        # Rolling updates accumulate rounding error, so once per window the
+        # moments are recomputed from the window with correctly rounded
+        # sums. The result depends only on the window's contents, so a
+        # baseline seeded with the preceding window matches one that saw the
+        # whole stream bit for bit. Off by default: the pass costs a
+        # noticeable share of update().
+        window = self._buffer.values()
+        mean = math.fsum(window) / len(window)
+        self._mean = mean
+        self._m2 = math.fsum((value - mean) * (value - mean) for value in window)
+    
+    def update_series(self, values: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", int]:
+        # Feeds every value and returns the (mean, std) each one was scored
+        # against, plus the index at which the baseline became ready.
+        import numpy as np
+        
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        means = np.empty(n, dtype=np.float64)
+        stds = np.empty(n, dtype=np.float64)
+        ready_from = 0 if self.is_ready else n
+        
+        update = self.update
+        for i, value in enumerate(values.tolist()):
+            means[i] = self.mean
+            stds[i] = self.std
+            update(value)
+            if ready_from == n and self.is_ready:
+                ready_from = i
+        
+        return means, stds, ready_from
+    
     @property
     def is_warm(self) -> bool:
         return self._buffer.is_full
@@ -161,6 +221,78 @@ class BaselineComputer:
             ewma=self._ewma
         )
     
+    def seed_values(
+        self,
+        values: Iterable[float],
+        total_count: Optional[int] = None,
+        moments: Optional[Tuple[float, float]] = None
+    ) -> None:
+        # Warm start from stored history: the last window_size values are
+        # replayed, giving exactly the state of a baseline that saw them.
+        # total_count, when given, is how many values the original stream
+        # had seen, which keeps re-anchoring on the same schedule; moments,
+        # the original baseline's (mean, M2) at that point (see
+        # rolling_moments), replace the replayed ones so the seeded
+        # baseline continues exactly like the original.
+        self.reset()
+        for value in list(values)[-self.window_size:]:
+            self.update(value)
+        if total_count is not None:
+            self._total_count = total_count
+        if moments is not None:
+            self._mean, self._m2 = moments
+    
+    def seed_stats(self, count: int, mean: float, m2: float) -> None:
+        # Warm start from a (count, mean, M2) summary. The window is filled
+        # with mean +/- d pairs carrying the same mean and variance, so the
+        # baseline is ready at once and the seeded moments roll out of the
+        # window like real values would. Longer histories are scaled down
+        # to one window at the same variance.
+        self.reset()
+        n = min(count, self.window_size)
+        if n <= 0:
+            return
+        variance = max(m2, 0.0) / count
+        target_m2 = variance * n
+        pairs = n // 2
+        d = math.sqrt(target_m2 / (2 * pairs)) if pairs else 0.0
+        for _ in range(pairs):
+            self.update(mean + d)
+            self.update(mean - d)
+        if n % 2:
+            self.update(mean)
+        self._mean = mean
+        self._m2 = target_m2
+        if self.use_ewma:
+            self._ewma = mean
+    
+    def window_values(self) -> List[float]:
+        return self._buffer.values()
+    
+    def summary(self) -> Tuple[int, float, float]:
+        # (count, mean, M2) over the current window.
+        return self.count, self.mean, self._m2
+    
+    def snapshot(self) -> dict:
+        # Everything update() depends on, as plain JSON-able values, so a
+        # restored baseline continues bit-for-bit.
+        return {
+            "buffer": self._buffer.snapshot(),
+            "mean": self._mean,
+            "m2": self._m2,
+            "ewma": self._ewma,
+            "total_count": self._total_count,
+            "reanchor": self.reanchor
+        }
+    
+    def restore(self, state: dict) -> None:
+        self._buffer.restore(state["buffer"])
+        self._mean = state["mean"]
+        self._m2 = state["m2"]
+        self._ewma = state["ewma"]
+        self._total_count = state["total_count"]
+        self.reanchor = state.get("reanchor", False)
+    
     def reset(self) -> None:
         self._buffer.clear()
         self._mean = 0.0
@@ -174,3 +306,47 @@ class BaselineComputer:
             f"BaselineComputer({warm_status}, "
             f"mean={self.mean:.4f}, std={self.std:.4f})"
         )
+
+
+def rolling_moments(values: "np.ndarray", window_size: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    # (mean, M2) of a BaselineComputer without re-anchoring after each of
+    # `values` (finite only), bit for bit, without stepping through them:
+    # once the window is full both moments are running sums, and
+    # np.add.accumulate adds in the same order update() does.
+    import numpy as np
+    
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    means = np.empty(n, dtype=np.float64)
+    m2s = np.empty(n, dtype=np.float64)
+    
+    mean = 0.0
+    m2 = 0.0
+    for i, value in enumerate(values[:window_size].tolist()):
+        delta = value - mean
+        mean += delta / (i + 1)
+        m2 += delta * (value - mean)
+        means[i] = mean
+        m2s[i] = m2
+    if n <= window_size:
+        return means, m2s
+    
+    w = window_size
+    change = values[w:] - values[:-w]
+    means[w - 1:] = np.add.accumulate(np.concatenate(([means[w - 1]], change / w)))
+    terms = change * ((values[w:] - means[w:]) + (values[:-w] - means[w - 1:-1]))
+    
+    # update() clamps M2 at zero; restart the sum after every point where
+    # it would have gone negative (or to -0.0).
+    start = w - 1
+    while True:
+        running = np.add.accumulate(np.concatenate(([m2s[start]], terms[start - w + 1:])))
+        negative = np.flatnonzero(np.signbit(running[1:]))
+        if len(negative) == 0:
+            m2s[start:] = running
+            break
+        stop = start + int(negative[0]) + 1
+        m2s[start:stop] = running[:stop - start]
+        m2s[stop] = 0.0
+        start = stop
+    return means, m2s
@@ -0,0 +1,566 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+from blackice.baseline import BaselineComputer, RollingBuffer
+from blackice.deviation import DeviationTracker
+from blackice.detector import RegimeDetector
+from blackice.learning.objective import AnomalyInterval
+from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
+from blackice.synth import format_csv_rows
+
+# Bump when the matrix or the measurement changes so old baselines are not compared.
+BENCH_VERSION = 2
+
+BENCH_MACHINE = "m_bench"
+DEFAULT_SIZES = [10**5, 10**6]
+FULL_SIZES = [10**5, 10**6, 10**7, 10**8]
+DEFAULT_TOLERANCE = 0.10
+
+# Rows generated (and handed to batch stages) at a time.
+CHUNK_ROWS = 100_000
+# Per-call latencies are sampled over this many extra calls after the
+# throughput pass, so timing overhead never skews rows/sec.
+LATENCY_SAMPLE = 100_000
+
+# Start-up probes: code run in a fresh interpreter, its budget (median
+# milliseconds on top of a bare interpreter) and the heavy modules it must
+# not load. The CLI probe covers `blackice --help`.
+HEAVY_MODULES = ("numpy", "pandas", "yaml")
+STARTUP_REPEATS = 15
+STARTUP_PROBES: Dict[str, Tuple[str, float]] = {
+    "import": ("import blackice", 75.0),
+    "detector": ("from blackice import RegimeDetector; RegimeDetector().update(1.0, 0)", 75.0),
+    "pipeline": (
+        "from blackice.pipeline import BlackicePipeline, PipelineConfig; "
+        "BlackicePipeline(PipelineConfig(), profile_memory=False)",
+        100.0
+    ),
+    "cli_help": (
+        "import contextlib, io, sys; sys.argv = ['blackice', '--help']; from blackice.cli import main\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit): main()",
+        100.0
+    ),
+}
+
+# Synthetic series: a level shift of SHIFT_HEIGHT for SHIFT_LENGTH rows in
+# every SHIFT_PERIOD, on top of a daily cycle and Gaussian noise.
+SHIFT_PERIOD = 5_000
+SHIFT_LENGTH = 500
+SHIFT_HEIGHT = 25.0
+
+
+@dataclass
+class BenchResult:
+    name: str
+    rows: int
+    seconds: float
+    rows_per_second: float
+    p50_us: float
+    p99_us: float
+    peak_rss_mb: Optional[float]
+    latency_basis: str
+    
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def synthetic_chunk(start: int, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Rows start .. start + n_rows of the benchmark series (one row per second)."""
+    rng = np.random.default_rng([seed, start])
+    index = np.arange(start, start + n_rows, dtype=np.int64)
+    shifted = (index % SHIFT_PERIOD) >= SHIFT_PERIOD - SHIFT_LENGTH
+    cycle = 10.0 * np.sin(2 * np.pi * index / 86400.0)
+    cpu = 50.0 + cycle + rng.normal(0.0, 5.0, n_rows) + SHIFT_HEIGHT * shifted
+    mem = 40.0 + 0.5 * cycle + rng.normal(0.0, 2.0, n_rows)
+    return pd.DataFrame({
+        "machine_id": BENCH_MACHINE,
+        "timestamp": index,
+        "cpu_util": cpu,
+        "mem_util": mem
+    })
+
+
+def synthetic_chunks(n_rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for start in range(0, n_rows, chunk_rows):
+        yield synthetic_chunk(start, min(chunk_rows, n_rows - start), seed)
+
+
+def synthetic_shifts(n_rows: int) -> List[AnomalyInterval]:
+    return [
+        AnomalyInterval(start, start + SHIFT_LENGTH - 1)
+        for start in range(SHIFT_PERIOD - SHIFT_LENGTH, n_rows, SHIFT_PERIOD)
+    ]
+
+
+def _percentiles(latencies_ns: np.ndarray) -> Tuple[float, float]:
+    if len(latencies_ns) == 0:
+        return 0.0, 0.0
+    p50, p99 = np.percentile(latencies_ns, [50, 99])
+    return float(p50) / 1000.0, float(p99) / 1000.0
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _bench_calls(
+    name: str,
+    n_rows: int,
+    seed: int,
+    make: Callable[[], Callable],
+    with_timestamp: bool
+) -> BenchResult:
+    call = make()
+    clock = time.perf_counter
+    elapsed = 0.0
+    ts = 0
+    
+    for chunk in synthetic_chunks(n_rows, seed):
+        values = chunk["cpu_util"].tolist()
+        start = clock()
+        if with_timestamp:
+            for value in values:
+                call(value, ts)
+                ts += 1
+        else:
+            for value in values:
+                call(value)
+        elapsed += clock() - start
+    
+    sample = synthetic_chunk(n_rows, min(LATENCY_SAMPLE, n_rows), seed)["cpu_util"].tolist()
+    latencies = np.empty(len(sample), dtype=np.int64)
+    ns = time.perf_counter_ns
+    for i, value in enumerate(sample):
+        if with_timestamp:
+            t0 = ns()
+            call(value, ts)
+            latencies[i] = ns() - t0
+            ts += 1
+        else:
+            t0 = ns()
+            call(value)
+            latencies[i] = ns() - t0
+    
+    p50, p99 = _percentiles(latencies)
+    return BenchResult(name, n_rows, elapsed, n_rows / elapsed if elapsed > 0 else 0.0,
+                       p50, p99, None, "call")
+
+
+def _chunk_result(name: str, n_rows: int, chunk_timings: List[Tuple[float, int]]) -> BenchResult:
+    elapsed = sum(seconds for seconds, _ in chunk_timings)
+    per_point = np.asarray([seconds * 1e9 / rows for seconds, rows in chunk_timings if rows], dtype=np.float64)
+    p50, p99 = _percentiles(per_point)
+    return BenchResult(name, n_rows, elapsed, n_rows / elapsed if elapsed > 0 else 0.0,
+                       p50, p99, None, "chunk")
+
+
+def bench_rolling_buffer(n_rows: int, seed: int) -> BenchResult:
+    return _bench_calls("rolling_buffer", n_rows, seed, lambda: RollingBuffer(60).push, False)
+
+
+def bench_baseline(n_rows: int, seed: int) -> BenchResult:
+    return _bench_calls("baseline", n_rows, seed, lambda: BaselineComputer(window_size=60).update, False)
+
+
+def bench_deviation(n_rows: int, seed: int) -> BenchResult:
+    def make() -> Callable:
+        return DeviationTracker(BaselineComputer(window_size=60), zscore_threshold=3.0).update
+    return _bench_calls("deviation", n_rows, seed, make, True)
+
+
+def bench_detector(n_rows: int, seed: int) -> BenchResult:
+    return _bench_calls("detector", n_rows, seed, lambda: RegimeDetector().update, True)
+
+
+def bench_pipeline(n_rows: int, seed: int) -> BenchResult:
+    pipeline = BlackicePipeline(PipelineConfig(), profile_memory=False)
+    timings: List[Tuple[float, int]] = []
+    for chunk in synthetic_chunks(n_rows, seed):
+        start = time.perf_counter()
+        pipeline.process_chunk(chunk)
+        timings.append((time.perf_counter() - start, len(chunk)))
+    return _chunk_result("pipeline", n_rows, timings)
+
+
+def bench_ingest(n_rows: int, seed: int) -> BenchResult:
+    fd, path = tempfile.mkstemp(suffix=".csv", prefix="blackice-bench-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in synthetic_chunks(n_rows, seed):
+                # Alibaba traces store integer percentages.
+                f.write(format_csv_rows(
+                    BENCH_MACHINE,
+                    chunk["timestamp"].to_numpy(),
+                    np.clip(np.rint(chunk["cpu_util"].to_numpy()), 0, 100).astype(np.int64),
+                    np.clip(np.rint(chunk["mem_util"].to_numpy()), 0, 100).astype(np.int64)
+                ))
+        
+        timings: List[Tuple[float, int]] = []
+        reader = stream_machine_data(path, BENCH_MACHINE, chunksize=CHUNK_ROWS)
+        while True:
+            start = time.perf_counter()
+            chunk = next(reader, None)
+            if chunk is None:
+                break
+            timings.append((time.perf_counter() - start, len(chunk)))
+        return _chunk_result("ingest", n_rows, timings)
+    finally:
+        os.unlink(path)
+
+
+def bench_optimizer(n_rows: int, seed: int) -> BenchResult:
+    from blackice.learning.optimizer import GridSearchOptimizer
+    
+    grid: Dict[str, List[Any]] = {
+        "window_size": [30, 60],
+        "zscore_threshold": [2.5, 3.5],
+        "min_consecutive_points": [5, 10]
+    }
+    df = pd.concat(list(synthetic_chunks(n_rows, seed)), ignore_index=True)
+    ground_truth = synthetic_shifts(n_rows)
+    optimizer = GridSearchOptimizer(grid)
+    n_configs = len(optimizer._generate_configs())
+    
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        optimizer.train(df, ground_truth)
+    elapsed = time.perf_counter() - start
+    
+    # Throughput is dataset rows per second of search; latency is per row
+    # replayed, since every configuration replays every row.
+    per_point_us = elapsed * 1e6 / (n_rows * n_configs) if n_rows else 0.0
+    return BenchResult("optimizer", n_rows, elapsed, n_rows / elapsed if elapsed > 0 else 0.0,
+                       per_point_us, per_point_us, None, "run")
+
+
+# name -> (benchmark, largest size it runs at)
+BENCHMARKS: Dict[str, Tuple[Callable[[int, int], BenchResult], int]] = {
+    "rolling_buffer": (bench_rolling_buffer, 10**7),
+    "baseline": (bench_baseline, 10**7),
+    "deviation": (bench_deviation, 10**7),
+    "detector": (bench_detector, 10**7),
+    "pipeline": (bench_pipeline, 10**8),
+    "ingest": (bench_ingest, 10**8),
+    "optimizer": (bench_optimizer, 10**6),
+}
+
+
+def run_case(name: str, n_rows: int, seed: int = 0) -> BenchResult:
+    benchmark, _ = BENCHMARKS[name]
+    result = benchmark(n_rows, seed)
+    result.peak_rss_mb = _peak_rss_mb()
+    return result
+
+
+def _run_isolated(name: str, n_rows: int, seed: int) -> BenchResult:
+    # A fresh interpreter per case so peak RSS belongs to that case alone.
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_case, name, n_rows, seed).result()
+
+
+def run_suite(
+    sizes: List[int],
+    names: Optional[List[str]] = None,
+    seed: int = 0,
+    isolate: bool = True,
+    progress: Optional[Callable[[BenchResult], None]] = None
+) -> List[BenchResult]:
+    """
+    Runs every selected benchmark at every size it supports.
+    
+    Args:
+        sizes: Row counts of the synthetic input.
+        names: Benchmarks to run (default: all of BENCHMARKS).
+        seed: Seed of the synthetic data.
+        isolate: Run each case in its own process so peak RSS is per case.
+        progress: Called with each result as it completes.
+    """
+    results: List[BenchResult] = []
+    for name in list(BENCHMARKS) if names is None else names:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark: {name}")
+        _, max_rows = BENCHMARKS[name]
+        for n_rows in sizes:
+            if n_rows > max_rows:
+                continue
+            result = _run_isolated(name, n_rows, seed) if isolate else run_case(name, n_rows, seed)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+
+@dataclass
+class StartupResult:
+    name: str
+    p50_ms: float
+    p99_ms: float
+    budget_ms: float
+    heavy_modules: List[str]
+    
+    @property
+    def ok(self) -> bool:
+        return self.p50_ms <= self.budget_ms and not self.heavy_modules
+    
+    def to_dict(self) -> dict:
+        return {**asdict(self), "ok": self.ok}
+
+
+def _launch(code: str) -> Tuple[float, str]:
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (src, env.get("PYTHONPATH", "")) if p)
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, done.stdout
+
+
+def startup_probe(code: str, repeats: int = STARTUP_REPEATS) -> Tuple[List[float], List[str]]:
+    """
+    Times `code` in fresh interpreters.
+    
+    Returns:
+        (wall seconds per launch, heavy modules the code left loaded)
+    """
+    report = (
+        "\nimport sys as _sys"
+        f"\nprint('\\n' + ','.join(m for m in {HEAVY_MODULES!r} if m in _sys.modules))"
+    )
+    timings: List[float] = []
+    heavy: List[str] = []
+    for _ in range(repeats):
+        seconds, stdout = _launch(code + report)
+        timings.append(seconds)
+        heavy = [m for m in stdout.rstrip("\n").rsplit("\n", 1)[-1].split(",") if m]
+    return timings, heavy
+
+
+def run_startup(repeats: int = STARTUP_REPEATS) -> List[StartupResult]:
+    """Runs every start-up probe, net of a bare interpreter's start-up time."""
+    bare = float(np.median([_launch("pass")[0] for _ in range(repeats)]))
+    results: List[StartupResult] = []
+    for name, (code, budget_ms) in STARTUP_PROBES.items():
+        timings, heavy = startup_probe(code, repeats)
+        net_ms = np.maximum(np.asarray(timings) - bare, 0.0) * 1000.0
+        p50, p99 = np.percentile(net_ms, [50, 99])
+        results.append(StartupResult(name, float(p50), float(p99), budget_ms, heavy))
+    return results
+
+
+def _case_key(entry: dict) -> Tuple[str, int]:
+    return entry["name"], int(entry["rows"])
+
+
+def compare_to_baseline(
+    results: List[BenchResult],
+    baseline: dict,
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[dict]:
+    """
+    Flags cases that got slower than the stored baseline.
+    
+    A case regresses when its rows/sec drops, or its p99 latency grows, by
+    more than `tolerance` (a fraction). Cases missing from the baseline are
+    not compared.
+    
+    Returns:
+        One dict per regressed case with the baseline and current figures.
+    """
+    previous = {_case_key(entry): entry for entry in baseline.get("results", [])}
+    regressions: List[dict] = []
+    for result in results:
+        before = previous.get((result.name, result.rows))
+        if before is None:
+            continue
+        reasons = []
+        if result.rows_per_second < before["rows_per_second"] * (1 - tolerance):
+            reasons.append("throughput")
+        if before["p99_us"] > 0 and result.p99_us > before["p99_us"] * (1 + tolerance):
+            reasons.append("p99")
+        if reasons:
+            regressions.append({
+                "name": result.name,
+                "rows": result.rows,
+                "reasons": reasons,
+                "baseline_rows_per_second": before["rows_per_second"],
+                "rows_per_second": result.rows_per_second,
+                "baseline_p99_us": before["p99_us"],
+                "p99_us": result.p99_us
+            })
+    return regressions
+
+
+def build_report(
+    results: List[BenchResult],
+    seed: int,
+    startup: Optional[List[StartupResult]] = None
+) -> dict:
+    from blackice import __version__
+    return {
+        "bench_version": BENCH_VERSION,
+        "blackice_version": __version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": [result.to_dict() for result in results],
+        "startup": [result.to_dict() for result in startup or []]
+    }
+
+
+def _print_result(result: BenchResult) -> None:
+    rss = f"{result.peak_rss_mb:9.1f}" if result.peak_rss_mb is not None else "      n/a"
+    print(
+        f"  {result.name:<15} {result.rows:>12,} {result.rows_per_second:>14,.0f} "
+        f"{result.p50_us:>9.2f} {result.p99_us:>9.2f} {rss}  ({result.latency_basis})"
+    )
+
+
+def _parse_sizes(text: str) -> List[int]:
+    return [int(float(part)) for part in text.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="blackice bench",
+        description="BLACKICE benchmark suite on synthetic data"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=_parse_sizes,
+        help="Comma-separated row counts (default: 1e5,1e6; --full: 1e5 .. 1e8)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Run the full 1e5 .. 1e8 matrix"
+    )
+    parser.add_argument(
+        "--only",
+        help=f"Comma-separated benchmarks to run ({', '.join(BENCHMARKS)}, startup)"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        help="Write results as JSON to this path"
+    )
+    parser.add_argument(
+        "--baseline", "-b",
+        help="Stored results to compare against; exits 1 on regression"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Overwrite --baseline with these results"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed slowdown before a case is flagged (fraction, default: 0.10)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the synthetic data"
+    )
+    parser.add_argument(
+        "--no-isolate",
+        action="store_true",
+        help="Run all cases in this process (faster; peak RSS becomes cumulative)"
+    )
+    
+    args = parser.parse_args(argv)
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(BENCHMARKS)
+    with_startup = "startup" in names or not args.only
+    names = [name for name in names if name != "startup"]
+    
+    print("BLACKICE Benchmark Suite")
+    print(f"Sizes: {', '.join(f'{s:,}' for s in sizes)}")
+    print("-" * 80)
+    print(f"  {'benchmark':<15} {'rows':>12} {'rows/sec':>14} {'p50 us':>9} {'p99 us':>9} {'RSS MB':>9}")
+    
+    try:
+        results = run_suite(sizes, names, seed=args.seed, isolate=not args.no_isolate, progress=_print_result)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    
+    startup: List[StartupResult] = []
+    if with_startup:
+        print(f"\n  {'start-up':<15} {'p50 ms':>9} {'p99 ms':>9} {'budget':>9}")
+        startup = run_startup()
+        for probe in startup:
+            loaded = f"  loads {', '.join(probe.heavy_modules)}" if probe.heavy_modules else ""
+            print(
+                f"  {probe.name:<15} {probe.p50_ms:>9.1f} {probe.p99_ms:>9.1f} {probe.budget_ms:>9.0f}"
+                f"  {'ok' if probe.ok else 'OVER BUDGET'}{loaded}"
+            )
+    
+    report = build_report(results, args.seed, startup)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+    
+    over_budget = [probe.name for probe in startup if not probe.ok]
+    if over_budget:
+        print(f"\nStart-up budget exceeded: {', '.join(over_budget)}")
+    status = 1 if over_budget else 0
+    
+    if not args.baseline:
+        return status
+    
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to: {args.baseline}")
+        return status
+    
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("bench_version") != BENCH_VERSION:
+        print(f"Baseline {args.baseline} is from another benchmark version; not compared")
+        return status
+    
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return status
+    
+    print(f"\nREGRESSIONS against {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for r in regressions:
+        print(
+            f"  {r['name']} @ {r['rows']:,} rows: "
+            f"{r['baseline_rows_per_second']:,.0f} -> {r['rows_per_second']:,.0f} rows/sec, "
+            f"p99 {r['baseline_p99_us']:.2f} -> {r['p99_us']:.2f} us"
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+
+from typing import List, Optional
+
+
+class ThresholdCalibrator:
+    """
+    Picks a z-score threshold online to meet a target false-alert rate.
+    
+    Keeps two fixed-size histograms over |z| bins, fed one point at a time
+    in O(1):
+    
+    - the distribution of |z| itself, and
+    - for every candidate threshold t (a bin edge), how many times |z|
+      crossed from below t to at or above it. Each such crossing is what
+      starts a NORMAL -> UNSTABLE entry at threshold t, and the counts for
+      all candidates are maintained with a single difference-array update.
+    
+    Every `interval` recorded points the crossing counts are prefix-summed
+    (O(bins), so O(1) amortised) and the smallest threshold whose crossing
+    rate per hour of observed time is within the target is selected.
+    """
+    
+    def __init__(
+        self,
+        target_rate_per_hour: float = 1.0,
+        interval: int = 1000,
+        min_threshold: float = 2.0,
+        max_threshold: float = 10.0,
+        bin_width: float = 0.05,
+        decay: float = 1.0
+    ):
+        """
+        Args:
+            target_rate_per_hour: Tolerated UNSTABLE entries per hour of
+                normal operation.
+            interval: Recorded points between recalibrations (and before
+                the first one).
+            min_threshold: Lowest threshold that may be chosen.
+            max_threshold: Highest threshold considered; chosen when even it
+                exceeds the target rate.
+            bin_width: Histogram resolution in sigma.
+            decay: Factor applied to all counts at each recalibration;
+                below 1.0 older behaviour is gradually forgotten.
+        """
+        if target_rate_per_hour <= 0:
+            raise ValueError("target_rate_per_hour must be positive")
+        if interval < 1:
+            raise ValueError("interval must be at least 1")
+        if not (0 < min_threshold <= max_threshold):
+            raise ValueError("need 0 < min_threshold <= max_threshold")
+        if not (0 < decay <= 1):
+            raise ValueError("decay must be in (0, 1]")
+        
+        self.target_rate_per_hour = target_rate_per_hour
+        self.interval = interval
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.bin_width = bin_width
+        self.decay = decay
+        
+        # Bin k covers [k * bin_width, (k + 1) * bin_width); the last bin
+        # also takes everything beyond max_threshold.
+        self._n_bins = int(round(max_threshold / bin_width)) + 1
+        self._magnitudes: List[float] = [0.0] * self._n_bins
+        self._crossing_diff: List[float] = [0.0] * (self._n_bins + 1)
+        self._observed_seconds: float = 0.0
+        self._recorded: float = 0.0
+        self._since_calibration: int = 0
+        
+        self._last_bin: Optional[int] = None
+        self._last_ts: Optional[float] = None
+        self._threshold: Optional[float] = None
+        self.calibrations: int = 0
+    
+    def _bin(self, magnitude: float) -> int:
+        return min(int(magnitude / self.bin_width), self._n_bins - 1)
+    
+    def observe(self, zscore: float, timestamp: float, record: bool = True) -> Optional[float]:
+        """
+        Feeds one scored point.
+        
+        Args:
+            zscore: The point's z-score.
+            timestamp: Point time in seconds.
+            record: False for points that must not shape the threshold
+                (e.g. while a deviation is already being tracked); they only
+                advance the crossing and time bookkeeping.
+        
+        Returns:
+            The new threshold if this point triggered a recalibration, else None.
+        """
+        current = self._bin(abs(zscore))
+        previous = self._last_bin
+        elapsed = timestamp - self._last_ts if self._last_ts is not None else 0.0
+        self._last_bin = current
+        self._last_ts = timestamp
+        
+        if not record:
+            return None
+        
+        self._magnitudes[current] += 1
+        self._recorded += 1
+        if elapsed > 0:
+            self._observed_seconds += elapsed
+        # Thresholds at edges previous+1 .. current are crossed upwards.
+        if previous is not None and current > previous:
+            self._crossing_diff[previous + 1] += 1
+            self._crossing_diff[current + 1] -= 1
+        
+        self._since_calibration += 1
+        if self._since_calibration >= self.interval:
+            return self.recalibrate()
+        return None
+    
+    def crossing_rates(self) -> List[float]:
+        """UNSTABLE entries per hour for each candidate threshold (bin edge)."""
+        hours = self._observed_seconds / 3600.0
+        rates: List[float] = []
+        running = 0.0
+        for k in range(self._n_bins):
+            running += self._crossing_diff[k]
+            rates.append(running / hours if hours > 0 else float('inf'))
+        return rates
+    
+    def recalibrate(self) -> float:
+        """Selects the threshold from the histograms gathered so far."""
+        rates = self.crossing_rates()
+        first = min(int(round(self.min_threshold / self.bin_width)), self._n_bins - 1)
+        chosen = self.max_threshold
+        for k in range(first, self._n_bins):
+            if rates[k] <= self.target_rate_per_hour:
+                chosen = min(k * self.bin_width, self.max_threshold)
+                break
+        
+        self._threshold = max(chosen, self.min_threshold)
+        self.calibrations += 1
+        self._since_calibration = 0
+        if self.decay < 1.0:
+            self._magnitudes = [c * self.decay for c in self._magnitudes]
+            self._crossing_diff = [c * self.decay for c in self._crossing_diff]
+            self._observed_seconds *= self.decay
+            self._recorded *= self.decay
+        return self._threshold
+    
+    def exceedance(self, threshold: float) -> float:
+        """Fraction of recorded points with |z| >= threshold."""
+        if self._recorded <= 0:
+            return 0.0
+        return sum(self._magnitudes[self._bin(threshold):]) / self._recorded
+    
+    @property
+    def threshold(self) -> Optional[float]:
+        """The calibrated threshold, or None before the first calibration."""
+        return self._threshold
+    
+    @property
+    def is_calibrated(self) -> bool:
+        return self._threshold is not None
+    
+    def __repr__(self) -> str:
+        return (
+            f"ThresholdCalibrator(target={self.target_rate_per_hour}/h, "
+            f"threshold={self._threshold}, calibrations={self.calibrations})"
+        )
@@ -0,0 +1,110 @@
+
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Parsing needs transient buffers on top of the finished DataFrame.
+PARSE_OVERHEAD = 2.0
+# Rows sampled when measuring a chunk's bytes per row (deep sizes of
+# object columns are expensive to take on a whole chunk).
+SAMPLE_ROWS = 10_000
+
+
+def frame_bytes_per_row(frame: "pd.DataFrame") -> float:
+    sample = frame.iloc[:SAMPLE_ROWS]
+    if len(sample) == 0:
+        return 0.0
+    return float(sample.memory_usage(deep=True, index=True).sum()) / len(sample)
+
+
+class ChunkSizer:
+    # Chooses read-chunk sizes under a memory budget. The ceiling comes from
+    # the measured bytes per parsed row, counting every chunk in flight (the
+    # one being processed plus any prefetched ones). Below the ceiling the
+    # size doubles for as long as rows/second keeps improving, then settles
+    # on the best size seen; it only moves again if the ceiling drops.
+    
+    GROWTH = 2
+    # Minimum relative throughput gain that justifies another doubling.
+    MIN_GAIN = 0.05
+    
+    def __init__(
+        self,
+        memory_budget_mb: float,
+        initial_rows: int = 50_000,
+        min_rows: int = 1_000,
+        max_rows: int = 10_000_000,
+        in_flight: int = 2
+    ):
+        if memory_budget_mb <= 0:
+            raise ValueError("memory_budget_mb must be positive")
+        if not 0 < min_rows <= max_rows:
+            raise ValueError("need 0 < min_rows <= max_rows")
+        self.memory_budget_mb = memory_budget_mb
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.in_flight = max(1, in_flight)
+        
+        # Requested size of every chunk read so far, in order.
+        self.sizes: List[int] = []
+        self.bytes_per_row: Optional[float] = None
+        self._size = self._clamp(initial_rows)
+        self._pending: Optional[int] = None
+        self._settled = False
+        self._best_size = self._size
+        self._best_rate = 0.0
+    
+    def _clamp(self, rows: int) -> int:
+        return max(self.min_rows, min(rows, self.max_rows, self.ceiling))
+    
+    @property
+    def ceiling(self) -> int:
+        # Largest chunk whose in-flight copies fit the budget.
+        if not self.bytes_per_row:
+            return self.max_rows
+        budget = self.memory_budget_mb * 1024 * 1024
+        rows = int(budget / (self.bytes_per_row * PARSE_OVERHEAD * self.in_flight))
+        return max(self.min_rows, rows)
+    
+    @property
+    def settled(self) -> bool:
+        return self._settled
+    
+    def next_size(self) -> int:
+        self._pending = self._size
+        return self._size
+    
+    def observe(self, rows: int, bytes_per_row: float, seconds: float) -> None:
+        # rows: parsed rows of the chunk just handled; seconds: time from
+        # asking for it until asking for the next one (parse + processing).
+        if self._pending is None:
+            return
+        size, self._pending = self._pending, None
+        self.sizes.append(size)
+        
+        if bytes_per_row > 0:
+            if self.bytes_per_row is None:
+                self.bytes_per_row = bytes_per_row
+            else:
+                self.bytes_per_row = 0.7 * self.bytes_per_row + 0.3 * bytes_per_row
+        
+        # A short final chunk says nothing about throughput at this size.
+        if rows == size and not self._settled:
+            rate = rows / seconds if seconds > 0 else float("inf")
+            if rate > self._best_rate * (1 + self.MIN_GAIN):
+                self._best_rate = rate
+                self._best_size = size
+                grown = self._clamp(size * self.GROWTH)
+                self._settled = grown == size
+                size = grown
+            else:
+                self._settled = True
+                size = self._best_size
+        
+        self._size = self._clamp(self._best_size if self._settled else size)
+    
+    def __repr__(self) -> str:
+        state = "settled" if self._settled else "probing"
+        return f"ChunkSizer({state}, rows={self._size}, budget={self.memory_budget_mb:g}MB)"
@@ -1,17 +1,25 @@
 
 import argparse
+import importlib
 import json
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import datetime
-import yaml  # type: ignore
 
-# RELATIVE IMPORTS for package execution
-from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
+# `blackice <name> ...` hands the remaining arguments to the module's main().
+SUBCOMMANDS = {
+    "bench": "blackice.bench",
+    "synth": "blackice.synth",
+    "replay": "blackice.replay",
+    "backfill": "blackice.backfill",
+    "fleet": "blackice.fanout",
+}
 
 
 def load_config(config_path: str) -> dict:
+    import yaml  # type: ignore
+    
     with open(config_path, "r") as f:
         cfg = yaml.safe_load(f)
         # Ensure we have a dict even if yaml is empty
@@ -43,10 +51,12 @@ def print_metrics(metrics: dict):
     print(f"  Throughput: {sys_metrics['rows_per_second']:,.0f} rows/sec")
     print(f"  Peak Memory: {sys_metrics['peak_memory_mb']:.2f} MB")
     print(f"  Avg Time/Chunk: {sys_metrics['avg_time_per_chunk_ms']:.2f} ms")
+    sizes = sys_metrics.get("chunk_sizes")
+    if sizes:
+        print(f"  Chunk Size: {sizes[0]:,} -> {sizes[-1]:,} rows ({sys_metrics['memory_budget_mb']:g} MB budget)")
     
-    for metric_name in ["cpu", "memory"]:
-        if metric_name in metrics:
-            m = metrics[metric_name]
+    for metric_name, m in metrics.items():
+        if isinstance(m, dict) and "detection" in m:
             print(f"\n--- {metric_name.upper()} Metrics ---")
             print(f"  Current State: {m['current_state']}")
             print(f"  Total Transitions: {m['transition_count']}")
@@ -350,8 +360,16 @@ def run_pipeline(
     config: dict,
     verbose: bool = False,
     output_path: Optional[str] = None,
-    report_file: Optional[str] = None
+    report_file: Optional[str] = None,
+    snapshot_path: Optional[str] = None,
+    snapshot_every: int = 0,
+    snapshot_seconds: int = 0,
+    warm_start_path: Optional[str] = None,
+    save_warm_start_path: Optional[str] = None
 ):
+    # Deferred so `blackice --help` and the subcommands never load pandas.
+    from blackice.pipeline import BlackicePipeline, PipelineConfig, stream_machine_data
+    from blackice.snapshots import SnapshotWriter
     
     print("BLACKICE Regime Detection System")
     print(f"Machine: {machine_id}")
@@ -361,14 +379,40 @@ def run_pipeline(
     pipeline_config = PipelineConfig.from_dict(config)
     pipeline = BlackicePipeline(pipeline_config)
     
+    if warm_start_path:
+        from blackice.warmstart import WarmStartTable
+        
+        seeded = pipeline.warm_start(WarmStartTable.load(warm_start_path), machine_id)
+        print(f"Warm start: {seeded} baseline(s) seeded from {warm_start_path}")
+    
+    snapshots = None
+    if snapshot_every or snapshot_seconds:
+        from blackice.replay import default_snapshot_path
+        
+        snapshot_path = snapshot_path or default_snapshot_path(data_path, machine_id)
+        snapshots = SnapshotWriter(snapshot_path, every_points=snapshot_every, every_seconds=snapshot_seconds)
+        pipeline.attach_snapshots(snapshots)
+    
     chunksize = config.get("data", {}).get("chunksize", 500000)
+    prefetch = config.get("data", {}).get("prefetch", 1)
+    
+    sizer = None
+    memory_budget_mb = config.get("data", {}).get("memory_budget_mb")
+    if memory_budget_mb:
+        from blackice.chunking import ChunkSizer
+        
+        # The chunk being processed plus the prefetched ones share the budget.
+        sizer = ChunkSizer(memory_budget_mb, in_flight=prefetch + 1)
+        pipeline.attach_chunk_sizer(sizer)
     
     chunk_count = 0
     total_events = 0
     
     print("\\nProcessing data in streaming mode...")
     
-    for chunk in stream_machine_data(data_path, machine_id, chunksize=chunksize):
+    # One read pass loads every configured metric column.
+    usecols = pipeline.input_columns
+    for chunk in stream_machine_data(data_path, machine_id, chunksize=chunksize, usecols=usecols, prefetch=prefetch, sizer=sizer):
         chunk_count += 1
         events = pipeline.process_chunk(chunk)
         
@@ -383,20 +427,44 @@ def run_pipeline(
             print(f"  Processed chunk {chunk_count}...")
     
     pipeline.stop()
+    if snapshots is not None:
+        snapshots.close()
+    
+    if save_warm_start_path:
+        from blackice.warmstart import WarmStartTable
+        
+        # Other machines' rows in an existing table are kept.
+        table = WarmStartTable.load(save_warm_start_path) if Path(save_warm_start_path).exists() else WarmStartTable()
+        table.capture(pipeline)
+        table.save(save_warm_start_path)
+        print(f"Baselines saved to {save_warm_start_path}")
     
     print("\\nProcessing complete!")
     print(f"  Chunks: {chunk_count}")
     print(f"  Events: {total_events}")
+    if snapshots is not None:
+        print(f"  Snapshots: {snapshots.written} -> {snapshots.path}")
     
     metrics = pipeline.get_all_metrics()
     print_metrics(metrics)
     
     if output_path:
+        # Per-metric state changes in time order, so tooling can bisect for
+        # the state at a given time instead of scanning the event list.
+        timeline = {}
+        for name in pipeline_config.tracked_metrics:
+            transitions = pipeline.get_transitions(name)
+            timeline[name] = {
+                "timestamps": [t.timestamp for t in transitions],
+                "states": [t.to_state.value for t in transitions]
+            }
+        
         output = {
             "machine_id": machine_id,
             "config": config,
             "metrics": metrics,
-            "events": [e.to_dict() for e in pipeline.events]
+            "events": [e.to_dict() for e in pipeline.events],
+            "timeline": timeline
         }
         with open(output_path, "w") as f:
             json.dump(output, f, indent=2)
@@ -408,9 +476,20 @@ def run_pipeline(
     return pipeline
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBCOMMANDS:
+        module = importlib.import_module(SUBCOMMANDS[argv[0]])
+        sys.exit(module.main(argv[1:]))
+    
     parser = argparse.ArgumentParser(
-        description="BLACKICE - Infrastructure Regime Detection System"
+        description="BLACKICE - Infrastructure Regime Detection System",
+        epilog=(
+            "Subcommands: 'blackice bench' (benchmark suite), 'blackice synth' (synthetic traces), "
+            "'blackice replay' (re-run a time slice from snapshots), "
+            "'blackice backfill' (one machine's history in parallel time shards), "
+            "'blackice fleet' (every machine in one pass over shared memory)."
+        )
     )
     parser.add_argument(
         "--config", "-c",
@@ -434,13 +513,41 @@ def main():
         action="store_true",
         help="Generate markdown report (default: reports/analysis_<machine_id>.md)"
     )
+    parser.add_argument(
+        "--params", "-p",
+        help="Per-machine parameter table from train_model.py --per-machine"
+    )
+    parser.add_argument(
+        "--snapshot-every",
+        type=int,
+        default=0,
+        help="Write detector snapshots every N rows (for 'blackice replay')"
+    )
+    parser.add_argument(
+        "--snapshot-seconds",
+        type=int,
+        default=0,
+        help="Write detector snapshots every T seconds of stream time"
+    )
+    parser.add_argument(
+        "--snapshots",
+        help="Snapshot file (default: <data>.<machine_id>.snapshots.jsonl)"
+    )
+    parser.add_argument(
+        "--warm-start",
+        help="Seed baselines from a warm-start table so detection starts immediately"
+    )
+    parser.add_argument(
+        "--save-warm-start",
+        help="Write this machine's final baselines into a warm-start table"
+    )
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
         help="Print detailed event information"
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     config_path = Path(args.config)
     
@@ -464,6 +571,20 @@ def main():
         print("Please provide a path to a valid csv data file.")
         sys.exit(1)
     
+    if args.params:
+        from blackice.learning.params import ParameterTable
+        
+        params_path = Path(args.params)
+        if not params_path.exists():
+            print(f"Error: Parameter table not found: {args.params}")
+            sys.exit(1)
+        table = ParameterTable.load(str(params_path))
+        if machine_id in table:
+            config = table.apply_to(machine_id, config)
+            print(f"Using learned parameters for {machine_id} from {params_path}")
+        else:
+            print(f"No learned parameters for {machine_id} in {params_path}; using {config_path}")
+    
     report_file = None
     if args.report:
         # Save report to current directory reports/ by default if not specified
@@ -477,7 +598,12 @@ def main():
         config=config,
         verbose=args.verbose,
         output_path=args.output,
-        report_file=report_file
+        report_file=report_file,
+        snapshot_path=args.snapshots,
+        snapshot_every=args.snapshot_every,
+        snapshot_seconds=args.snapshot_seconds,
+        warm_start_path=args.warm_start,
+        save_warm_start_path=args.save_warm_start
     )
 
 
@@ -1,12 +1,13 @@
 
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Sequence
 
 from .baseline import BaselineComputer
 from .deviation import DeviationTracker
 from .persistence import PersistenceValidator, PersistenceConfig
 from .state import RegimeStateMachine, RegimeState
+from .calibration import ThresholdCalibrator
 
 @dataclass
 class DetectionEvent:
@@ -42,7 +43,10 @@ class RegimeDetector:
         z_threshold: float = 3.0,
         persistence: int = 10,
         min_fraction: float = 0.1,
-        metric_name: str = "metric"
+        metric_name: str = "metric",
+        window_fraction: bool = False,
+        target_alert_rate: Optional[float] = None,
+        calibration_interval: int = 1000
     ):
         """
         Initialize the detector with configuration.
@@ -53,6 +57,14 @@ class RegimeDetector:
             persistence: Minimum consecutive outliers to confirm a regime shift.
             min_fraction: Minimum fraction of outliers in window (e.g., 0.1).
             metric_name: Label for the metric (used in logs/reasons).
+            window_fraction: Measure min_fraction over a true sliding window and
+                confirm on either criterion, instead of folding it into the
+                consecutive-count threshold.
+            target_alert_rate: Enables online calibration: z_threshold is only
+                the starting value, and is re-picked every
+                `calibration_interval` normal points so that UNSTABLE entries
+                stay at or below this many per hour of normal operation.
+            calibration_interval: Points between recalibrations.
         """
         self.metric_name = metric_name
         
@@ -70,13 +82,22 @@ class RegimeDetector:
             PersistenceConfig(
                 min_consecutive_points=persistence,
                 min_fraction_of_window=min_fraction,
-                window_size=window_size
+                window_size=window_size,
+                use_window_fraction=window_fraction
             )
         )
         
         # 4. State Machine (Deterministic regimes)
         self.sm = RegimeStateMachine(metric_name=metric_name)
         
+        # 5. Optional threshold calibration (|z| histograms, O(1) per point)
+        self.calibrator: Optional[ThresholdCalibrator] = None
+        if target_alert_rate is not None:
+            self.calibrator = ThresholdCalibrator(
+                target_rate_per_hour=target_alert_rate,
+                interval=calibration_interval
+            )
+        
         # Internal tracking for duration
         self._state_start_ts: Optional[float] = None
         self._last_state: RegimeState = RegimeState.NORMAL
@@ -100,6 +121,8 @@ class RegimeDetector:
             self._state_start_ts = timestamp
             
         # 1. Update internals (Chain of Responsibility)
+        state_before = self.sm.current_state
+        baseline_ready = self.baseline.is_ready
         dev_result = self.deviation.update(value, int(timestamp))
         persist_result = self.persistence.check(dev_result)
         
@@ -108,6 +131,14 @@ class RegimeDetector:
         transition = self.sm.process(persist_result, int(timestamp), zscore=dev_result.zscore)
         current_state = self.sm.current_state
         
+        # 2b. Calibrate on warm-up and NORMAL points only, so that real
+        # shifts do not drag the threshold up.
+        if self.calibrator is not None and baseline_ready:
+            record = not self.calibrator.is_calibrated or state_before == RegimeState.NORMAL
+            threshold = self.calibrator.observe(dev_result.zscore, timestamp, record=record)
+            if threshold is not None:
+                self.deviation.zscore_threshold = threshold
+        
         # 3. Handle Duration Logic
         if current_state != self._last_state:
             self._state_start_ts = timestamp
@@ -136,7 +167,33 @@ class RegimeDetector:
             is_anomaly=(current_state != RegimeState.NORMAL)
         )
         
+    def warm_start(
+        self,
+        values: Optional[Sequence[float]] = None,
+        count: int = 0,
+        mean: float = 0.0,
+        m2: float = 0.0
+    ) -> None:
+        """
+        Seeds the baseline from history so detection is live immediately.
+        
+        Args:
+            values: Recent raw values (the last window_size are used); exact.
+            count: Points summarised by (mean, m2), used when values is None.
+            mean: Mean of those points.
+            m2: Sum of squared deviations from the mean (Welford's M2).
+        """
+        if values is not None:
+            self.baseline.seed_values(values)
+        else:
+            self.baseline.seed_stats(count, mean, m2)
+    
     @property
     def is_calibrated(self) -> bool:
         """True if the baseline window is full and statistics are reliable."""
         return self.baseline.is_ready
+    
+    @property
+    def z_threshold(self) -> float:
+        """The z-score threshold currently in force (calibrated if enabled)."""
+        return self.deviation.zscore_threshold
@@ -1,10 +1,13 @@
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from .baseline import BaselineComputer
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class DeviationDirection(Enum):
     NONE = "NONE"
@@ -30,6 +33,39 @@ class DeviationResult:
         return self.timestamp - self.deviation_start_ts
 
 
+# Compact int8 codes used by the array (batch) code paths.
+DIRECTION_CODES = {
+    DeviationDirection.NONE: 0,
+    DeviationDirection.HIGH: 1,
+    DeviationDirection.LOW: -1,
+}
+DIRECTIONS_BY_CODE = {code: direction for direction, code in DIRECTION_CODES.items()}
+
+
+@dataclass
+class DeviationBatch:
+    timestamps: "np.ndarray"
+    values: "np.ndarray"
+    zscores: "np.ndarray"
+    means: "np.ndarray"
+    stds: "np.ndarray"
+    directions: "np.ndarray"
+    consecutive: "np.ndarray"
+    ready_from: int
+    prior_direction: DeviationDirection
+    prior_consecutive: int
+    prior_start_ts: Optional[int]
+    final_start_ts: Optional[int] = None
+    last_significant: Optional[int] = None
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    @property
+    def significant(self) -> "np.ndarray":
+        return self.directions != 0
+
+
 class DeviationTracker:
     
     def __init__(
@@ -87,10 +123,39 @@ class DeviationTracker:
             is_significant=is_significant
         )
     
+    def update_batch(self, values: "np.ndarray", timestamps: "np.ndarray") -> DeviationBatch:
+        means, stds, ready_from = self.baseline.update_series(values)
+        
+        batch = classify_deviations(
+            timestamps,
+            values,
+            means,
+            stds,
+            self.zscore_threshold,
+            ready_from,
+            prior_direction=self._current_direction,
+            prior_consecutive=self._consecutive_deviations,
+            prior_start_ts=self._deviation_start_ts
+        )
+        
+        if len(batch):
+            last_code = int(batch.directions[-1])
+            self._current_direction = DIRECTIONS_BY_CODE[last_code]
+            self._consecutive_deviations = int(batch.consecutive[-1])
+            self._deviation_start_ts = batch.final_start_ts
+            if batch.last_significant is not None:
+                self._last_significant_zscore = float(batch.zscores[batch.last_significant])
+        
+        return batch
+    
     @property
     def consecutive_deviations(self) -> int:
         return self._consecutive_deviations
     
+    @property
+    def deviation_start_ts(self) -> Optional[int]:
+        return self._deviation_start_ts
+    
     @property
     def current_direction(self) -> DeviationDirection:
         return self._current_direction
@@ -99,6 +164,22 @@ class DeviationTracker:
     def last_significant_zscore(self) -> float:
         return self._last_significant_zscore
     
+    def snapshot(self) -> dict:
+        return {
+            "baseline": self.baseline.snapshot(),
+            "consecutive": self._consecutive_deviations,
+            "start_ts": self._deviation_start_ts,
+            "direction": self._current_direction.value,
+            "last_significant_zscore": self._last_significant_zscore
+        }
+    
+    def restore(self, state: dict) -> None:
+        self.baseline.restore(state["baseline"])
+        self._consecutive_deviations = state["consecutive"]
+        self._deviation_start_ts = state["start_ts"]
+        self._current_direction = DeviationDirection(state["direction"])
+        self._last_significant_zscore = state["last_significant_zscore"]
+    
     def reset(self) -> None:
         self._consecutive_deviations = 0
         self._deviation_start_ts = None
@@ -111,3 +192,77 @@ class DeviationTracker:
             f"consecutive={self._consecutive_deviations}, "
             f"direction={self._current_direction.value})"
         )
+
+
+def classify_deviations(
+    timestamps: "np.ndarray",
+    values: "np.ndarray",
+    means: "np.ndarray",
+    stds: "np.ndarray",
+    zscore_threshold: float,
+    ready_from: int = 0,
+    prior_direction: DeviationDirection = DeviationDirection.NONE,
+    prior_consecutive: int = 0,
+    prior_start_ts: Optional[int] = None
+) -> DeviationBatch:
+    # Vectorized equivalent of DeviationTracker.update() given the baseline
+    # (mean, std) seen by each point. Kept separate from the baseline pass so
+    # one z-score series can be re-thresholded cheaply.
+    import numpy as np
+    
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zscores = np.where(stds < 1e-6, 0.0, (values - means) / stds)
+        significant = np.abs(zscores) >= zscore_threshold
+    directions = np.where(
+        significant, np.where(zscores > 0, 1, -1), 0
+    ).astype(np.int8)
+    
+    # Run-length encode the direction codes to get consecutive counts,
+    # carrying the open run in from the previous batch.
+    consecutive = np.zeros(n, dtype=np.int64)
+    final_start_ts = prior_start_ts
+    last_significant = None
+    if n:
+        idx = np.arange(n)
+        change = np.empty(n, dtype=bool)
+        change[0] = True
+        change[1:] = directions[1:] != directions[:-1]
+        run_start = np.maximum.accumulate(np.where(change, idx, 0))
+        consecutive = idx - run_start + 1
+        
+        prior_code = DIRECTION_CODES[prior_direction]
+        if prior_code != 0 and directions[0] == prior_code:
+            consecutive[run_start == 0] += prior_consecutive
+        consecutive[directions == 0] = 0
+        
+        last_code = int(directions[-1])
+        if last_code == 0:
+            final_start_ts = None
+        elif run_start[-1] == 0 and last_code == prior_code:
+            final_start_ts = prior_start_ts
+        else:
+            final_start_ts = int(timestamps[run_start[-1]])
+        
+        significant_idx = np.flatnonzero(significant)
+        if len(significant_idx):
+            last_significant = int(significant_idx[-1])
+    
+    return DeviationBatch(
+        timestamps=timestamps,
+        values=values,
+        zscores=zscores,
+        means=means,
+        stds=stds,
+        directions=directions,
+        consecutive=consecutive,
+        ready_from=ready_from,
+        prior_direction=prior_direction,
+        prior_consecutive=prior_consecutive,
+        prior_start_ts=prior_start_ts,
+        final_start_ts=final_start_ts,
+        last_significant=last_significant
+    )
@@ -0,0 +1,200 @@
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from .deviation import DIRECTION_CODES, DIRECTIONS_BY_CODE
+from .state import (
+    _STATE_INDEX,
+    STATE_CODES,
+    StateEvent,
+    StateTransition,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Column name -> dtype. Metric and machine names are dictionary-encoded:
+# the column holds an index into EventLog.metrics / EventLog.machines.
+EVENT_COLUMNS = {
+    "timestamp": "int64",
+    "from_state": "uint8",
+    "to_state": "uint8",
+    "direction": "int8",
+    "zscore": "float32",
+    "metric": "uint16",
+    "machine": "uint32",
+    "count": "int64",
+    "required": "int32",
+}
+
+
+class EventLog:
+
+    INITIAL_CAPACITY = 1024
+    
+    def __init__(self):
+        self._columns: Dict[str, "np.ndarray"] = {}
+        self._size = 0
+        self._capacity = 0
+        self.metrics: List[str] = []
+        self.machines: List[str] = []
+        self._metric_ids: Dict[str, int] = {}
+        self._machine_ids: Dict[str, int] = {}
+    
+    def _grow(self, needed: int) -> None:
+        # Amortised O(1) appends: capacity doubles. Views handed out by
+        # columns() keep the old buffers alive and stay valid.
+        import numpy as np
+        
+        capacity = max(self.INITIAL_CAPACITY, self._capacity)
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in EVENT_COLUMNS.items():
+            column = np.empty(capacity, dtype=dtype)
+            if self._size:
+                column[:self._size] = self._columns[name][:self._size]
+            self._columns[name] = column
+        self._capacity = capacity
+    
+    def _encode(self, value: str, ids: Dict[str, int], names: List[str]) -> int:
+        code = ids.get(value)
+        if code is None:
+            code = ids[value] = len(names)
+            names.append(value)
+        return code
+    
+    def append(self, event: StateEvent) -> None:
+        if self._size == self._capacity:
+            self._grow(self._size + 1)
+        transition = event.transition
+        i = self._size
+        columns = self._columns
+        columns["timestamp"][i] = transition.timestamp
+        columns["from_state"][i] = _STATE_INDEX[transition.from_state]
+        columns["to_state"][i] = _STATE_INDEX[transition.to_state]
+        columns["direction"][i] = DIRECTION_CODES[transition.direction]
+        columns["zscore"][i] = transition.zscore
+        columns["metric"][i] = self._encode(event.metric_name, self._metric_ids, self.metrics)
+        columns["machine"][i] = self._encode(event.machine_id, self._machine_ids, self.machines)
+        columns["count"][i] = transition.count
+        columns["required"][i] = transition.required
+        self._size += 1
+    
+    def extend(self, events: List[StateEvent]) -> None:
+        if self._size + len(events) > self._capacity:
+            self._grow(self._size + len(events))
+        for event in events:
+            self.append(event)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, index: int) -> StateEvent:
+        # Rebuilds the event; the reason string is rendered on read, not stored.
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("event index out of range")
+        columns = self._columns
+        return StateEvent(
+            metric_name=self.metrics[columns["metric"][index]],
+            machine_id=self.machines[columns["machine"][index]],
+            transition=StateTransition(
+                from_state=STATE_CODES[columns["from_state"][index]],
+                to_state=STATE_CODES[columns["to_state"][index]],
+                timestamp=int(columns["timestamp"][index]),
+                direction=DIRECTIONS_BY_CODE[int(columns["direction"][index])],
+                zscore=float(columns["zscore"][index]),
+                count=int(columns["count"][index]),
+                required=int(columns["required"][index])
+            )
+        )
+    
+    def __iter__(self) -> Iterator[StateEvent]:
+        for index in range(self._size):
+            yield self[index]
+    
+    def to_list(self) -> List[StateEvent]:
+        return list(self)
+    
+    def columns(self) -> Dict[str, "np.ndarray"]:
+        # Zero-copy views of the filled part of every column.
+        import numpy as np
+        
+        if not self._columns:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in EVENT_COLUMNS.items()}
+        return {name: column[:self._size] for name, column in self._columns.items()}
+    
+    def select(
+        self,
+        metric: Optional[str] = None,
+        machine_id: Optional[str] = None,
+        to_state: Optional[Any] = None
+    ) -> "np.ndarray":
+        # Indices of matching events, computed on the code columns.
+        import numpy as np
+        
+        columns = self.columns()
+        mask = np.ones(self._size, dtype=bool)
+        if metric is not None:
+            mask &= columns["metric"] == self._metric_ids.get(metric, -1)
+        if machine_id is not None:
+            mask &= columns["machine"] == self._machine_ids.get(machine_id, -1)
+        if to_state is not None:
+            mask &= columns["to_state"] == _STATE_INDEX[to_state]
+        return np.flatnonzero(mask)
+    
+    @property
+    def nbytes(self) -> int:
+        # Bytes used by the filled rows plus the two dictionaries' strings.
+        row = sum(column.itemsize for column in self._columns.values())
+        names = sum(len(name) for name in self.metrics + self.machines)
+        return row * self._size + names
+    
+    def to_arrow(self) -> Any:
+        # A pyarrow RecordBatch sharing the numeric buffers; states,
+        # directions, metrics and machines become dictionary columns.
+        import numpy as np
+        import pyarrow as pa
+        
+        columns = self.columns()
+        
+        def dictionary(indices: "np.ndarray", values: List[str]) -> Any:
+            return pa.DictionaryArray.from_arrays(pa.array(indices), pa.array(values, type=pa.string()))
+        
+        states = [state.value for state in STATE_CODES]
+        # Direction codes are signed, so map them to dictionary positions.
+        direction_codes = sorted(DIRECTIONS_BY_CODE)
+        directions = [DIRECTIONS_BY_CODE[code].value for code in direction_codes]
+        direction_indices = np.searchsorted(direction_codes, columns["direction"]).astype(np.int8)
+        arrays: List[Tuple[str, Any]] = [
+            ("timestamp", pa.array(columns["timestamp"])),
+            ("metric", dictionary(columns["metric"], self.metrics)),
+            ("machine_id", dictionary(columns["machine"], self.machines)),
+            ("from_state", dictionary(columns["from_state"], states)),
+            ("to_state", dictionary(columns["to_state"], states)),
+            ("direction", dictionary(direction_indices, directions)),
+            ("zscore", pa.array(columns["zscore"])),
+            ("count", pa.array(columns["count"])),
+            ("required", pa.array(columns["required"])),
+        ]
+        return pa.RecordBatch.from_arrays([a for _, a in arrays], names=[n for n, _ in arrays])
+    
+    def write_parquet(self, path: str) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        pq.write_table(pa.Table.from_batches([self.to_arrow()]), path)
+    
+    def clear(self) -> None:
+        # Fresh buffers, so views from columns() are never overwritten.
+        self._columns = {}
+        self._size = 0
+        self._capacity = 0
+        self.metrics.clear()
+        self.machines.clear()
+        self._metric_ids.clear()
+        self._machine_ids.clear()
+    
+    def __repr__(self) -> str:
+        return f"EventLog(events={self._size}, metrics={len(self.metrics)}, machines={len(self.machines)})"
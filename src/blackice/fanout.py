@@ -0,0 +1,426 @@
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from multiprocessing import get_context, shared_memory
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from blackice.eventlog import EventLog
+from blackice.pipeline import MACHINE_USAGE_COLUMNS, BlackicePipeline, PipelineConfig, read_ahead
+
+# Slot header: rows in the slot, runs in the slot (-1 marks end of stream).
+_HEADER = 2
+# Run table entry: (machine code, first row, row count).
+_RUN = 3
+# Seconds between liveness checks while blocked on a ring.
+_POLL = 1.0
+
+
+@dataclass
+class RingSpec:
+    """Layout of one worker's ring of slots in a shared-memory block."""
+    name: str
+    metrics: List[str]
+    slots: int
+    slot_rows: int
+    max_runs: int
+    
+    @property
+    def slot_bytes(self) -> int:
+        return 8 * (_HEADER + _RUN * self.max_runs + self.slot_rows * (1 + len(self.metrics)))
+    
+    @property
+    def nbytes(self) -> int:
+        return self.slots * self.slot_bytes
+
+
+class _Slot:
+    """int64/float64 views of one slot; nothing is copied."""
+    
+    def __init__(self, spec: RingSpec, buffer: Any, index: int):
+        offset = index * spec.slot_bytes
+        self.header = np.ndarray((_HEADER,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * _HEADER
+        self.runs = np.ndarray((spec.max_runs, _RUN), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * _RUN * spec.max_runs
+        self.timestamps = np.ndarray((spec.slot_rows,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * spec.slot_rows
+        self.metrics: Dict[str, np.ndarray] = {}
+        for name in spec.metrics:
+            self.metrics[name] = np.ndarray((spec.slot_rows,), dtype=np.float64, buffer=buffer, offset=offset)
+            offset += 8 * spec.slot_rows
+
+
+class SharedRing:
+    """
+    Single-producer, single-consumer ring of fixed-size slots in shared memory.
+    
+    `free` counts slots the reader may fill and `filled` slots the worker
+    may consume; both sides walk the slots in the same order. A reader
+    that gets ahead blocks on `free`, so it never outruns its worker by
+    more than the ring.
+    """
+    
+    def __init__(self, spec: RingSpec, free: Any, filled: Any, create: bool = False):
+        self.spec = spec
+        self.free = free
+        self.filled = filled
+        if create:
+            self._block = shared_memory.SharedMemory(create=True, size=spec.nbytes)
+            spec.name = self._block.name
+        else:
+            self._block = shared_memory.SharedMemory(name=spec.name)
+        self.slots = [_Slot(spec, self._block.buf, i) for i in range(spec.slots)]
+        self._next = 0
+    
+    def acquire(self, semaphore: Any, alive: Any) -> _Slot:
+        while not semaphore.acquire(timeout=_POLL):
+            if not alive():
+                raise RuntimeError("fan-out peer process exited")
+        slot = self.slots[self._next]
+        self._next = (self._next + 1) % self.spec.slots
+        return slot
+    
+    def close(self, unlink: bool = False) -> None:
+        for slot in self.slots:
+            slot.__dict__.clear()
+        self.slots = []
+        self._block.close()
+        if unlink:
+            self._block.unlink()
+
+
+class _Filler:
+    """Reader-side cursor: appends machine runs into a worker's ring."""
+    
+    def __init__(self, ring: SharedRing, alive: Any):
+        self.ring = ring
+        self.alive = alive
+        self.slot: Optional[_Slot] = None
+        self.rows = 0
+        self.runs = 0
+        self.wait_s = 0.0
+    
+    def _open(self) -> _Slot:
+        if self.slot is None:
+            started = time.perf_counter()
+            self.slot = self.ring.acquire(self.ring.free, self.alive)
+            self.wait_s += time.perf_counter() - started
+            self.rows = self.runs = 0
+        return self.slot
+    
+    def append(self, code: int, timestamps: np.ndarray, metrics: Dict[str, np.ndarray], index: np.ndarray) -> None:
+        spec = self.ring.spec
+        pos = 0
+        while pos < len(index):
+            slot = self._open()
+            take = min(len(index) - pos, spec.slot_rows - self.rows)
+            rows = index[pos:pos + take]
+            lo, hi = self.rows, self.rows + take
+            np.take(timestamps, rows, out=slot.timestamps[lo:hi])
+            for name, values in metrics.items():
+                np.take(values, rows, out=slot.metrics[name][lo:hi])
+            # A machine continuing where its last run in this slot ended
+            # extends that run, so workers see the largest possible batch.
+            last = slot.runs[self.runs - 1] if self.runs else None
+            if last is not None and last[0] == code and last[1] + last[2] == lo:
+                last[2] += take
+            else:
+                slot.runs[self.runs] = (code, lo, take)
+                self.runs += 1
+            self.rows = hi
+            pos += take
+            if self.rows == spec.slot_rows or self.runs == spec.max_runs:
+                self.publish()
+    
+    def publish(self) -> None:
+        if self.slot is not None:
+            self.slot.header[:] = (self.rows, self.runs)
+            self.slot = None
+            self.ring.filled.release()
+    
+    def finish(self) -> None:
+        self.publish()
+        slot = self._open()
+        slot.header[:] = (0, -1)
+        self.slot = None
+        self.ring.filled.release()
+
+
+def _detect(
+    spec: RingSpec,
+    free: Any,
+    filled: Any,
+    names: Any,
+    results: Any,
+    config_fields: Dict[str, Any],
+    parent_pid: int,
+    params_path: Optional[str] = None,
+    warm_start_path: Optional[str] = None
+) -> None:
+    """Worker process: one pipeline per machine, fed straight from the ring."""
+    ring = SharedRing(spec, free, filled)
+    config = PipelineConfig.from_fields(config_fields)
+    params = None
+    if params_path:
+        from blackice.learning.params import ParameterTable
+        
+        params = ParameterTable.load(params_path)
+    warm_start = None
+    if warm_start_path:
+        from blackice.warmstart import WarmStartTable
+        
+        warm_start = WarmStartTable.load(warm_start_path)
+    pipelines: Dict[int, BlackicePipeline] = {}
+    machine_ids: Dict[int, str] = {}
+    
+    def parent_alive() -> bool:
+        return os.getppid() == parent_pid
+    
+    try:
+        while True:
+            slot = ring.acquire(filled, parent_alive)
+            runs = int(slot.header[1])
+            if runs < 0:
+                break
+            for code, lo, length in slot.runs[:runs].tolist():
+                while code not in machine_ids:
+                    known, machine_id = names.get()
+                    machine_ids[known] = machine_id
+                pipeline = pipelines.get(code)
+                if pipeline is None:
+                    machine_id = machine_ids[code]
+                    machine_config = params.config_for(machine_id, config) if params is not None else config
+                    pipeline = pipelines[code] = BlackicePipeline(machine_config, profile_memory=False)
+                    if warm_start is not None:
+                        pipeline.warm_start(warm_start, machine_id)
+                pipeline.process_arrays(
+                    slot.timestamps[lo:lo + length],
+                    {name: values[lo:lo + length] for name, values in slot.metrics.items()},
+                    machine_id=machine_ids[code]
+                )
+            free.release()
+        
+        for code, pipeline in pipelines.items():
+            pipeline.stop()
+            results.put((machine_ids[code], pipeline.event_log, pipeline.get_all_metrics()))
+    except BaseException as exc:
+        results.put(RuntimeError(f"detector worker failed: {exc!r}"))
+        raise
+    finally:
+        results.put(None)
+        ring.close()
+
+
+@dataclass
+class MachineResult:
+    machine_id: str
+    events: EventLog
+    metrics: Dict[str, Any]
+
+
+@dataclass
+class FleetRun:
+    machines: Dict[str, MachineResult] = field(default_factory=dict)
+    rows: int = 0
+    elapsed_s: float = 0.0
+    # Time the reader spent blocked on full rings (backpressure).
+    reader_wait_s: float = 0.0
+
+
+def run_fleet(
+    data_path: str,
+    config: PipelineConfig,
+    n_workers: int = -1,
+    chunksize: int = 500000,
+    slots: int = 4,
+    slot_rows: int = 65536,
+    max_runs: int = 4096,
+    prefetch: int = 1,
+    params_path: Optional[str] = None,
+    warm_start_path: Optional[str] = None
+) -> FleetRun:
+    """
+    Detects every machine in a machine_usage CSV with one parse.
+    
+    This process parses the CSV and partitions rows by machine_id: each
+    machine is pinned to one worker (round-robin in order of first
+    appearance) and its rows, sorted by timestamp within each chunk, are
+    copied once into that worker's shared-memory ring. Workers run
+    `BlackicePipeline.process_arrays` directly on views of the ring, so
+    no DataFrame is pickled. When a worker falls behind, its ring fills
+    and the reader blocks on it.
+    
+    Args:
+        data_path: Headerless machine_usage.csv.
+        config: Detector configuration for every machine.
+        n_workers: Detector processes (-1 = all cores but the reader's).
+        chunksize: CSV rows parsed at a time.
+        slots: Slots per worker ring.
+        slot_rows: Rows per slot.
+        max_runs: Machine runs per slot.
+        prefetch: Chunks parsed ahead on the reader's background thread.
+        params_path: Per-machine ParameterTable; machines in it run with
+            their learned parameters on top of `config`.
+        warm_start_path: WarmStartTable to seed each machine's baselines from.
+    
+    Returns:
+        FleetRun with events and metrics per machine. Each machine's events
+        equal a `blackice --machine` run with the same chunksize, params
+        and warm-start table.
+    """
+    import pandas as pd
+    
+    start_time = time.time()
+    workers = max(1, (os.cpu_count() or 2) - 1) if n_workers == -1 else max(1, n_workers)
+    probe = BlackicePipeline(config, profile_memory=False)
+    metric_columns = probe.columns
+    usecols = probe.input_columns
+    
+    ctx = get_context("spawn")
+    results = ctx.Queue()
+    rings: List[SharedRing] = []
+    names: List[Any] = []
+    processes: List[Any] = []
+    run = FleetRun()
+    try:
+        for _ in range(workers):
+            spec = RingSpec("", list(metric_columns), slots, slot_rows, min(max_runs, slot_rows))
+            ring = SharedRing(spec, ctx.Semaphore(slots), ctx.Semaphore(0), create=True)
+            rings.append(ring)
+            names.append(ctx.Queue())
+        for index, ring in enumerate(rings):
+            process = ctx.Process(
+                target=_detect,
+                args=(
+                    ring.spec, ring.free, ring.filled, names[index], results, config.to_dict(), os.getpid(),
+                    params_path, warm_start_path
+                ),
+                name=f"blackice-detect-{index}",
+                daemon=True
+            )
+            process.start()
+            processes.append(process)
+        fillers = [_Filler(ring, process.is_alive) for ring, process in zip(rings, processes)]
+        
+        codes: Dict[str, int] = {}
+        reader = pd.read_csv(data_path, names=MACHINE_USAGE_COLUMNS, header=None, usecols=usecols, chunksize=chunksize)
+        chunks = read_ahead(iter(reader), prefetch) if prefetch > 0 else reader
+        for chunk in chunks:
+            run.rows += len(chunk)
+            local, uniques = pd.factorize(chunk["machine_id"])
+            timestamps = chunk["timestamp"].to_numpy(dtype=np.int64)
+            metrics = {
+                name: chunk[column].to_numpy(dtype=np.float64)
+                for name, column in metric_columns.items()
+            }
+            # Rows grouped by machine (first appearance), by time within each.
+            order = np.lexsort((timestamps, local))
+            grouped = local[order]
+            bounds = np.flatnonzero(np.diff(grouped)) + 1
+            for lo, hi in zip([0] + bounds.tolist(), bounds.tolist() + [len(order)]):
+                machine_id = str(uniques[grouped[lo]])
+                code = codes.get(machine_id)
+                if code is None:
+                    code = codes[machine_id] = len(codes)
+                    names[code % workers].put((code, machine_id))
+                fillers[code % workers].append(code, timestamps, metrics, order[lo:hi])
+        for filler in fillers:
+            filler.finish()
+        run.reader_wait_s = sum(filler.wait_s for filler in fillers)
+        
+        finished = 0
+        while finished < workers:
+            item = results.get()
+            if item is None:
+                finished += 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            machine_id, events, metrics = item
+            run.machines[machine_id] = MachineResult(machine_id, events, metrics)
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for ring in rings:
+            ring.close(unlink=True)
+    
+    run.elapsed_s = time.time() - start_time
+    return run
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from blackice.cli import load_config
+    
+    parser = argparse.ArgumentParser(
+        prog="blackice fleet",
+        description="Detect every machine in one CSV pass, fanning rows out to worker processes over shared memory"
+    )
+    parser.add_argument("data", help="machine_usage.csv")
+    parser.add_argument("--config", "-c", default="configs/default.yaml", help="Path to configuration YAML file")
+    parser.add_argument("--workers", "-j", type=int, default=-1, help="Detector processes (-1 = cores - 1)")
+    parser.add_argument("--chunksize", type=int, help="CSV rows per chunk (default: data.chunksize)")
+    parser.add_argument("--slots", type=int, default=4, help="Slots per worker ring")
+    parser.add_argument("--slot-rows", type=int, default=65536, help="Rows per slot")
+    parser.add_argument("--params", "-p", help="Per-machine parameter table from train_model.py --per-machine")
+    parser.add_argument("--warm-start", help="Seed baselines from a warm-start table so detection starts immediately")
+    parser.add_argument("--output", "-o", help="Write events and metrics per machine as JSON here")
+    
+    args = parser.parse_args(argv)
+    raw = load_config(args.config) if os.path.exists(args.config) else {}
+    config = PipelineConfig.from_dict(raw)
+    data = raw.get("data", {})
+    for path, what in ((args.params, "Parameter table"), (args.warm_start, "Warm-start table")):
+        if path and not os.path.exists(path):
+            print(f"Error: {what} not found: {path}")
+            sys.exit(1)
+    
+    run = run_fleet(
+        args.data, config,
+        n_workers=args.workers,
+        chunksize=args.chunksize or data.get("chunksize", 500000),
+        slots=args.slots,
+        slot_rows=args.slot_rows,
+        prefetch=data.get("prefetch", 1),
+        params_path=args.params,
+        warm_start_path=args.warm_start
+    )
+    
+    rate = run.rows / run.elapsed_s if run.elapsed_s > 0 else 0.0
+    print("BLACKICE Fleet")
+    print(f"Data: {args.data}")
+    if args.params:
+        print(f"Learned parameters: {args.params}")
+    if args.warm_start:
+        print(f"Warm start: {args.warm_start}")
+    print(f"  Rows: {run.rows:,}  Machines: {len(run.machines):,}  Time: {run.elapsed_s:.2f}s ({rate:,.0f} rows/s)")
+    print(f"  Reader blocked on full rings: {run.reader_wait_s:.2f}s")
+    for machine_id in sorted(run.machines)[:20]:
+        result = run.machines[machine_id]
+        states = ", ".join(
+            f"{name}={m['current_state']}" for name, m in result.metrics.items()
+            if isinstance(m, dict) and "current_state" in m
+        )
+        print(f"    {machine_id}: {len(result.events):,} transitions ({states})")
+    if len(run.machines) > 20:
+        print(f"    ... {len(run.machines) - 20:,} more")
+    
+    if args.output:
+        output = {
+            machine_id: {"metrics": result.metrics, "events": [e.to_dict() for e in result.events]}
+            for machine_id, result in sorted(run.machines.items())
+        }
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"  Written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
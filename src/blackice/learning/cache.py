@@ -0,0 +1,169 @@
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from dataclasses import asdict
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+
+from blackice.pipeline import BlackicePipeline, PipelineConfig
+from blackice.learning.objective import AnomalyInterval, IntervalIndex
+
+# Bump when detection or scoring semantics change so stale entries are ignored.
+EVALUATION_VERSION = 3
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Hashes the rows the pipeline consumes (machine, timestamps, metric columns)."""
+    digest = hashlib.sha1()
+    digest.update(f"v{EVALUATION_VERSION}|{len(df)}|".encode())
+    if "machine_id" in df.columns and len(df):
+        digest.update(str(df["machine_id"].iloc[0]).encode())
+    digest.update(np.ascontiguousarray(df["timestamp"].to_numpy(dtype="int64")).tobytes())
+    for column in BlackicePipeline.COLUMNS.values():
+        if column in df.columns:
+            digest.update(column.encode())
+            digest.update(np.ascontiguousarray(df[column].to_numpy(dtype="float64")).tobytes())
+    return digest.hexdigest()
+
+
+def ground_truth_fingerprint(ground_truth: Union[Sequence[AnomalyInterval], IntervalIndex]) -> str:
+    intervals = ground_truth.intervals if isinstance(ground_truth, IntervalIndex) else ground_truth
+    bounds = np.asarray([(iv.start_time, iv.end_time) for iv in intervals], dtype=np.float64)
+    return hashlib.sha1(bounds.tobytes()).hexdigest()
+
+
+def config_key(config: PipelineConfig) -> str:
+    return json.dumps(asdict(config), sort_keys=True)
+
+
+class EvaluationCache:
+    """
+    Persistent memo of optimizer evaluations in a local SQLite file.
+    
+    Entries are keyed by (dataset fingerprint, ground-truth fingerprint,
+    config), so re-running a search after widening the grid only scores
+    the new configurations. The connection is opened lazily and dropped on
+    pickling, so the cache can be handed to worker processes. If the file
+    cannot be opened or written (e.g. a read-only directory), the cache
+    warns once and behaves as empty.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file; created (with parent directories) on first use.
+        """
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+    
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._disabled:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Concurrent fleet workers share the file; wait out their writes.
+                self._conn = sqlite3.connect(str(self.path), timeout=60)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS evaluations ("
+                    " dataset TEXT NOT NULL,"
+                    " ground_truth TEXT NOT NULL,"
+                    " config TEXT NOT NULL,"
+                    " loss REAL NOT NULL,"
+                    " summary TEXT NOT NULL,"
+                    " created REAL NOT NULL,"
+                    " PRIMARY KEY (dataset, ground_truth, config))"
+                )
+            except (OSError, sqlite3.Error) as e:
+                self._disable(e)
+        return self._conn
+    
+    def _disable(self, error: Exception) -> None:
+        print(f"Warning: evaluation cache {self.path} is unavailable ({error}); continuing without it.")
+        self.close()
+        self._disabled = True
+    
+    def lookup(
+        self,
+        dataset: str,
+        ground_truth: str,
+        configs: List[PipelineConfig]
+    ) -> Dict[int, float]:
+        """
+        Returns:
+            Position in `configs` -> cached loss, for the configs already scored.
+        """
+        keys = [config_key(config) for config in configs]
+        positions: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            positions.setdefault(key, []).append(i)
+        
+        found: Dict[int, float] = {}
+        conn = self._connect()
+        if conn is None:
+            return found
+        rows = conn.execute(
+            "SELECT config, loss FROM evaluations WHERE dataset = ? AND ground_truth = ?",
+            (dataset, ground_truth)
+        )
+        for key, loss in rows:
+            for i in positions.get(key, []):
+                found[i] = loss
+        return found
+    
+    def summary(self, dataset: str, ground_truth: str, config: PipelineConfig) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT summary FROM evaluations WHERE dataset = ? AND ground_truth = ? AND config = ?",
+            (dataset, ground_truth, config_key(config))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def store(
+        self,
+        dataset: str,
+        ground_truth: str,
+        results: List[Tuple[PipelineConfig, float, Dict[str, Any]]]
+    ) -> None:
+        """
+        Args:
+            results: (config, loss, summary dict) per evaluated config.
+        """
+        if not results:
+            return
+        now = time.time()
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (dataset, ground_truth, config_key(config), float(loss), json.dumps(summary), now)
+                        for config, loss, summary in results
+                    ]
+                )
+        except sqlite3.OperationalError as e:
+            # An existing but read-only file opens fine and only fails here.
+            self._disable(e)
+    
+    def __len__(self) -> int:
+        conn = self._connect()
+        if conn is None:
+            return 0
+        return int(conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0])
+    
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
@@ -0,0 +1,122 @@
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pandas as pd
+
+from blackice.pipeline import PipelineConfig
+from blackice.learning.objective import AnomalyInterval
+from blackice.learning.optimizer import GridSearchOptimizer
+from blackice.learning.params import ParameterTable
+
+# Headerless machine_meta.csv layout (see data/README.md).
+MACHINE_META_COLUMNS = [
+    "machine_id", "timestamp", "type_code", "cluster_code", "capacity_1", "capacity_2", "status"
+]
+
+MachineSeries = Dict[str, Tuple[pd.DataFrame, List[AnomalyInterval]]]
+
+
+def split_by_machine(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Splits a mixed multi-machine frame into one time-ordered frame per machine.
+    """
+    machines: Dict[str, pd.DataFrame] = {}
+    for machine_id, group in df.groupby("machine_id", sort=True):
+        machines[str(machine_id)] = group.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    return machines
+
+
+def load_machine_meta(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, names=MACHINE_META_COLUMNS, header=None)
+
+
+def cluster_groups(machine_ids: List[str], meta: pd.DataFrame) -> Dict[str, List[str]]:
+    """
+    Groups machines by their cluster_code in machine_meta.
+    
+    Each machine is assigned the cluster from its latest meta record;
+    machines without metadata are tuned on their own.
+    
+    Returns:
+        Group name -> machine ids.
+    """
+    latest = meta.sort_values("timestamp", kind="stable").drop_duplicates("machine_id", keep="last")
+    cluster_of = dict(zip(latest["machine_id"].astype(str), latest["cluster_code"]))
+    
+    groups: Dict[str, List[str]] = {}
+    for machine_id in machine_ids:
+        if machine_id in cluster_of:
+            name = f"cluster_{cluster_of[machine_id]}"
+        else:
+            name = machine_id
+        groups.setdefault(name, []).append(machine_id)
+    return groups
+
+
+def _train_group(
+    optimizer: GridSearchOptimizer,
+    series: List[Tuple[pd.DataFrame, List[AnomalyInterval]]]
+) -> Tuple[Optional[PipelineConfig], float]:
+    return optimizer.train_group(series)
+
+
+def train_fleet(
+    series: MachineSeries,
+    optimizer: GridSearchOptimizer,
+    groups: Optional[Dict[str, List[str]]] = None,
+    n_jobs: int = 1
+) -> ParameterTable:
+    """
+    Tunes detection parameters per machine (or per group of machines).
+    
+    Every machine is replayed through its own pipeline, so baselines never
+    mix rows from different machines. Groups are independent and are
+    trained in parallel worker processes.
+    
+    Args:
+        series: machine_id -> (time-ordered data, ground truth).
+        optimizer: Supplies the search space; its train_group() is called
+            once per group.
+        groups: Group name -> machine ids sharing one configuration.
+            Defaults to one group per machine.
+        n_jobs: Worker processes (-1 = all CPUs).
+    
+    Returns:
+        ParameterTable: One row per machine that received a configuration.
+    """
+    if groups is None:
+        groups = {machine_id: [machine_id] for machine_id in series}
+    
+    work = [
+        (name, [m for m in members if m in series])
+        for name, members in groups.items()
+    ]
+    work = [(name, members) for name, members in work if members]
+    
+    jobs = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+    jobs = max(1, min(jobs, len(work)))
+    
+    table = ParameterTable()
+    results: List[Tuple[str, List[str], Tuple[Optional[PipelineConfig], float]]] = []
+    
+    if jobs == 1:
+        for name, members in work:
+            results.append((name, members, _train_group(optimizer, [series[m] for m in members])))
+            print(f"[{len(results)}/{len(work)}] {name}: {len(members)} machine(s)")
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                (name, members, pool.submit(_train_group, optimizer, [series[m] for m in members]))
+                for name, members in work
+            ]
+            for name, members, future in futures:
+                results.append((name, members, future.result()))
+                print(f"[{len(results)}/{len(work)}] {name}: {len(members)} machine(s)")
+    
+    for name, members, (config, loss) in results:
+        if config is None:
+            continue
+        for machine_id in members:
+            table.set(machine_id, config, loss=loss, group=name)
+    
+    return table
@@ -0,0 +1,235 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, Iterable, Union
+from pathlib import Path
+import hashlib
+import numpy as np
+import pandas as pd
+
+from blackice.learning.objective import AnomalyInterval
+
+# machine_id -> ground-truth intervals for that machine's stream.
+MachineLabels = Dict[str, List[AnomalyInterval]]
+
+
+class LabelSource(ABC):
+    """
+    Produces ground-truth intervals per machine for training.
+    
+    Subclasses implement label() and label_stream(); cache_key() identifies the source's
+    settings so cached labels are rebuilt when they change.
+    """
+    
+    @abstractmethod
+    def label(self, df: pd.DataFrame) -> MachineLabels:
+        """
+        Args:
+            df: Usage data for one or more machines (any row order).
+        
+        Returns:
+            machine_id -> intervals, with an entry for every machine in df.
+        """
+        ...
+    
+    @abstractmethod
+    def label_stream(self, chunks: Iterable[pd.DataFrame]) -> MachineLabels:
+        """
+        Same as label() over the concatenated chunks, reading them one at a
+        time. Each machine's rows must arrive in time order across chunks.
+        """
+        ...
+    
+    @abstractmethod
+    def cache_key(self) -> str:
+        ...
+
+
+class ThresholdLabels(LabelSource):
+    """
+    Heuristic labels: continuous regions where a metric exceeds a threshold.
+    """
+    
+    def __init__(self, column: str = "cpu_util", threshold: float = 95.0):
+        """
+        Args:
+            column: Metric column to threshold.
+            threshold: Strict lower bound for a point to count as anomalous.
+        """
+        self.column = column
+        self.threshold = threshold
+    
+    def label(self, df: pd.DataFrame) -> MachineLabels:
+        return self.label_stream([df])
+    
+    def label_stream(self, chunks: Iterable[pd.DataFrame]) -> MachineLabels:
+        labels: MachineLabels = {}
+        # Runs still open at the end of a chunk: machine_id -> start time
+        open_runs: Dict[str, Optional[float]] = {}
+        last_seen: Dict[str, float] = {}
+        
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            ordered = chunk.sort_values(["machine_id", "timestamp"], kind="stable")
+            machine_ids = ordered["machine_id"].astype(str).to_numpy()
+            timestamps = ordered["timestamp"].to_numpy()
+            high = ordered[self.column].to_numpy(dtype=np.float64) > self.threshold
+            
+            bounds = np.flatnonzero(machine_ids[1:] != machine_ids[:-1]) + 1
+            for lo, hi in zip(np.concatenate(([0], bounds)).tolist(), np.append(bounds, len(ordered)).tolist()):
+                machine_id = str(machine_ids[lo])
+                intervals = labels.setdefault(machine_id, [])
+                ts = timestamps[lo:hi].tolist()
+                edges = np.diff(np.concatenate(([0], high[lo:hi].view(np.int8), [0])))
+                starts = [ts[i] for i in np.flatnonzero(edges == 1).tolist()]
+                ends = np.flatnonzero(edges == -1).tolist()
+                
+                carried = open_runs.get(machine_id)
+                if carried is not None:
+                    if high[lo]:
+                        starts[0] = carried
+                    else:
+                        intervals.append(AnomalyInterval(carried, ts[0]))
+                
+                open_runs[machine_id] = None
+                for start, end in zip(starts, ends):
+                    if end == len(ts):
+                        open_runs[machine_id] = start
+                    else:
+                        intervals.append(AnomalyInterval(start, ts[end]))
+                last_seen[machine_id] = ts[-1]
+        
+        # Close pending
+        for machine_id, start in open_runs.items():
+            if start is not None:
+                labels[machine_id].append(AnomalyInterval(start, last_seen[machine_id]))
+        return labels
+    
+    def cache_key(self) -> str:
+        return f"threshold:{self.column}:{self.threshold!r}"
+
+
+class IntervalFileLabels(LabelSource):
+    """
+    Labels read from a CSV of known anomaly intervals.
+    
+    The file needs `start_time` and `end_time` columns. With a `machine_id`
+    column each interval applies to that machine only; without one every
+    interval applies to every machine.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: CSV with start_time, end_time and optionally machine_id.
+        """
+        self.path = Path(path)
+    
+    def label(self, df: pd.DataFrame) -> MachineLabels:
+        intervals = pd.read_csv(self.path)
+        missing = {"start_time", "end_time"} - set(intervals.columns)
+        if missing:
+            raise ValueError(f"{self.path} is missing columns: {sorted(missing)}")
+        intervals = intervals.sort_values("start_time", kind="stable")
+        
+        machines = [str(m) for m in pd.unique(df["machine_id"])] if not df.empty else []
+        if "machine_id" not in intervals.columns:
+            shared = _to_intervals(intervals)
+            return {machine_id: list(shared) for machine_id in machines}
+        
+        labels: MachineLabels = {machine_id: [] for machine_id in machines}
+        for machine_id, group in intervals.groupby(intervals["machine_id"].astype(str), sort=False):
+            if machine_id in labels:
+                labels[machine_id] = _to_intervals(group)
+        return labels
+    
+    def label_stream(self, chunks: Iterable[pd.DataFrame]) -> MachineLabels:
+        machines: Dict[str, None] = {}
+        for chunk in chunks:
+            for machine_id in pd.unique(chunk["machine_id"]):
+                machines.setdefault(str(machine_id))
+        return self.label(pd.DataFrame({"machine_id": list(machines)}))
+    
+    def cache_key(self) -> str:
+        stat = self.path.stat()
+        return f"file:{self.path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _to_intervals(frame: pd.DataFrame) -> List[AnomalyInterval]:
+    return [
+        AnomalyInterval(start, end)
+        for start, end in zip(frame["start_time"].tolist(), frame["end_time"].tolist())
+    ]
+
+
+def label_cache_path(data_path: str, source: LabelSource, scope: str = "") -> Path:
+    """
+    Cache file for `source`'s labels of `data_path`, stored next to the data.
+    
+    The name hashes the source settings together with the data file's size
+    and modification time, so edits to either invalidate the cache. `scope`
+    distinguishes labels of a subset of the file (e.g. one machine).
+    """
+    data = Path(data_path)
+    stat = data.stat()
+    key = f"{source.cache_key()}|{stat.st_size}|{stat.st_mtime_ns}|{scope}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return data.with_name(f"{data.name}.labels-{digest}.npz")
+
+
+def save_labels(path: Path, labels: MachineLabels) -> None:
+    machine_ids = list(labels)
+    counts = [len(labels[m]) for m in machine_ids]
+    flat = [iv for m in machine_ids for iv in labels[m]]
+    np.savez(
+        path,
+        machine_ids=np.asarray(machine_ids, dtype=str),
+        offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        starts=np.asarray([iv.start_time for iv in flat], dtype=np.float64),
+        ends=np.asarray([iv.end_time for iv in flat], dtype=np.float64),
+    )
+
+
+def load_labels(path: Path) -> MachineLabels:
+    with np.load(path, allow_pickle=False) as cached:
+        machine_ids = cached["machine_ids"].tolist()
+        offsets = cached["offsets"].tolist()
+        starts = cached["starts"].tolist()
+        ends = cached["ends"].tolist()
+    return {
+        machine_id: [AnomalyInterval(s, e) for s, e in zip(starts[lo:hi], ends[lo:hi])]
+        for machine_id, lo, hi in zip(machine_ids, offsets[:-1], offsets[1:])
+    }
+
+
+def build_labels(
+    source: LabelSource,
+    df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    data_path: Optional[str] = None,
+    use_cache: bool = True,
+    scope: str = ""
+) -> MachineLabels:
+    """
+    Labels every machine in df, reusing a cached result when available.
+    
+    Args:
+        source: Where the labels come from.
+        df: The loaded training data, or an iterator of chunks.
+        data_path: File df was read from; enables the on-disk cache.
+        use_cache: Read and write the cache next to data_path.
+        scope: Cache qualifier when df covers only part of data_path.
+    
+    Returns:
+        machine_id -> intervals.
+    """
+    cache = label_cache_path(data_path, source, scope) if data_path and use_cache else None
+    if cache is not None and cache.exists():
+        return load_labels(cache)
+    
+    labels = source.label(df) if isinstance(df, pd.DataFrame) else source.label_stream(df)
+    if cache is not None:
+        try:
+            save_labels(cache, labels)
+        except OSError:
+            # Read-only data directories just go uncached.
+            pass
+    return labels
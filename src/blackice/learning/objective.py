@@ -1,7 +1,10 @@
-from typing import List
+from typing import List, Dict, Sequence, Union
 from dataclasses import dataclass
+import numpy as np
 from blackice.state import StateEvent
 
+Timestamps = Union[Sequence[float], np.ndarray]
+
 @dataclass
 class AnomalyInterval:
     """Represents a time range where a true anomaly exists."""
@@ -11,9 +14,66 @@ class AnomalyInterval:
     def contains(self, timestamp: float) -> bool:
         return self.start_time <= timestamp <= self.end_time
 
+
+class IntervalIndex:
+    """
+    Ground-truth intervals sorted once for O(log I) event matching.
+    
+    An event matches the first interval (in the original list order) that
+    contains it, exactly as a linear scan over the list would. Disjoint
+    intervals - the common case - are matched with a single binary search;
+    overlapping ones fall back to walking left from the bisection point
+    while an earlier interval can still reach the timestamp.
+    """
+    
+    def __init__(self, intervals: Sequence[AnomalyInterval]):
+        self.intervals = list(intervals)
+        order = sorted(range(len(self.intervals)), key=lambda i: self.intervals[i].start_time)
+        
+        self.order = np.asarray(order, dtype=np.int64)
+        self.starts = np.asarray([self.intervals[i].start_time for i in order], dtype=np.float64)
+        self.ends = np.asarray([self.intervals[i].end_time for i in order], dtype=np.float64)
+        # Running max of end times: no interval at or before position p can
+        # contain a timestamp greater than reach[p].
+        self.reach = np.maximum.accumulate(self.ends) if len(order) else self.ends
+        self.disjoint = bool(np.all(self.starts[1:] > self.ends[:-1])) if len(order) > 1 else True
+        self.original_starts = np.asarray([iv.start_time for iv in self.intervals], dtype=np.float64)
+    
+    def __len__(self) -> int:
+        return len(self.intervals)
+    
+    def match(self, timestamps: Timestamps) -> np.ndarray:
+        """
+        Returns, per timestamp, the original index of the matching interval
+        (-1 when the timestamp falls outside every interval).
+        """
+        ts = np.asarray(timestamps, dtype=np.float64)
+        if len(self.intervals) == 0 or len(ts) == 0:
+            return np.full(len(ts), -1, dtype=np.int64)
+        
+        pos = np.searchsorted(self.starts, ts, side="right") - 1
+        
+        if self.disjoint:
+            safe = np.maximum(pos, 0)
+            hit = (pos >= 0) & (ts <= self.ends[safe])
+            return np.where(hit, self.order[safe], -1)
+        
+        return np.asarray([self._match_overlapping(t, p) for t, p in zip(ts.tolist(), pos.tolist())], dtype=np.int64)
+    
+    def _match_overlapping(self, timestamp: float, pos: int) -> int:
+        best = -1
+        while pos >= 0 and self.reach[pos] >= timestamp:
+            if self.ends[pos] >= timestamp:
+                candidate = int(self.order[pos])
+                if best == -1 or candidate < best:
+                    best = candidate
+            pos -= 1
+        return best
+
+
 def calculate_loss(
     events: List[StateEvent], 
-    ground_truth: List[AnomalyInterval],
+    ground_truth: Union[List[AnomalyInterval], IntervalIndex],
     penalty_fp: float = 5.0,
     penalty_fn: float = 10.0,
     penalty_delay: float = 0.1
@@ -25,7 +85,8 @@ def calculate_loss(
     
     Args:
         events: List of detection events produced by the pipeline.
-        ground_truth: List of time intervals that are TRUE anomalies.
+        ground_truth: List of time intervals that are TRUE anomalies, or an
+            IntervalIndex built from them (reuse it when scoring many runs).
         penalty_fp: Cost of a False Positive (Alert where no anomaly exists).
         penalty_fn: Cost of a False Negative (Missed anomaly interval).
         penalty_delay: Cost per second of delay in detecting the start of an anomaly.
@@ -33,36 +94,120 @@ def calculate_loss(
     Returns:
         float: Total loss scores (lower is better).
     """
-    false_positives = 0
-    detected_intervals = set()
-    total_delay = 0.0
-    
-    # 1. Evaluate Precision (False Positives & Delay)
-    for event in events:
-        timestamp = event.transition.timestamp
-        matched = False
+    timestamps = np.asarray([event.transition.timestamp for event in events], dtype=np.float64)
+    return float(calculate_losses(
+        [timestamps],
+        ground_truth,
+        penalty_fp=penalty_fp,
+        penalty_fn=penalty_fn,
+        penalty_delay=penalty_delay
+    )[0])
+
+
+def calculate_losses(
+    event_timestamps: Sequence[Timestamps],
+    ground_truth: Union[List[AnomalyInterval], IntervalIndex],
+    penalty_fp: float = 5.0,
+    penalty_fn: float = 10.0,
+    penalty_delay: float = 0.1
+) -> np.ndarray:
+    """
+    Vectorized loss for many detection runs at once.
+    
+    All runs' event timestamps are matched against the ground truth in a
+    single sorted search, then false positives, detected intervals and
+    delays are aggregated per run.
+    
+    Args:
+        event_timestamps: One array of event timestamps per run (config).
+        ground_truth: Intervals, or a prebuilt IntervalIndex.
+    
+    Returns:
+        np.ndarray: Loss per run, in input order (same formula as calculate_loss).
+    """
+    accumulator = LossAccumulator(
+        ground_truth,
+        len(event_timestamps),
+        penalty_fp=penalty_fp,
+        penalty_fn=penalty_fn,
+        penalty_delay=penalty_delay
+    )
+    accumulator.add(event_timestamps)
+    return accumulator.losses()
+
+
+class LossAccumulator:
+    """
+    Incremental form of calculate_losses for runs whose events arrive in
+    pieces (e.g. chunk by chunk while streaming).
+    
+    Only the per-run counters and a detected flag per (run, interval) are
+    kept, so memory does not grow with the number of events.
+    """
+    
+    def __init__(
+        self,
+        ground_truth: Union[List[AnomalyInterval], IntervalIndex],
+        n_runs: int,
+        penalty_fp: float = 5.0,
+        penalty_fn: float = 10.0,
+        penalty_delay: float = 0.1
+    ):
+        self.index = ground_truth if isinstance(ground_truth, IntervalIndex) else IntervalIndex(ground_truth)
+        self.n_runs = n_runs
+        self.penalty_fp = penalty_fp
+        self.penalty_fn = penalty_fn
+        self.penalty_delay = penalty_delay
+        
+        self.events = np.zeros(n_runs, dtype=np.int64)
+        self.false_positives = np.zeros(n_runs, dtype=np.int64)
+        self.total_delay = np.zeros(n_runs, dtype=np.float64)
+        self.detected = np.zeros((n_runs, len(self.index)), dtype=bool)
+    
+    def add(self, event_timestamps: Sequence[Timestamps]) -> None:
+        """
+        Args:
+            event_timestamps: New event timestamps, one array per run.
+        """
+        n_runs = self.n_runs
+        arrays = [np.asarray(ts, dtype=np.float64) for ts in event_timestamps]
+        lengths = np.asarray([len(a) for a in arrays], dtype=np.int64)
+        run_ids = np.repeat(np.arange(n_runs), lengths)
+        flat = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.float64)
         
-        for i, interval in enumerate(ground_truth):
-            if interval.contains(timestamp):
-                matched = True
-                detected_intervals.add(i)
-                # Calculate delay only for the first detection in an interval
-                # (Simple heuristic: assumes events are sorted)
-                delay = max(0, timestamp - interval.start_time)
-                total_delay += delay
-                break
+        matched = self.index.match(flat)
+        hit = matched >= 0
+        self.events += lengths
         
-        if not matched:
-            false_positives += 1
-            
-    # 2. Evaluate Recall (False Negatives)
-    false_negatives = len(ground_truth) - len(detected_intervals)
-    
-    # 3. Calculate Weighted Loss
-    loss = (
-        (false_positives * penalty_fp) +
-        (false_negatives * penalty_fn) +
-        (total_delay * penalty_delay)
-    )
+        # 1. Evaluate Precision (False Positives & Delay)
+        self.false_positives += np.bincount(run_ids[~hit], minlength=n_runs)
+        delays = np.maximum(0.0, flat[hit] - self.index.original_starts[matched[hit]])
+        self.total_delay += np.bincount(run_ids[hit], weights=delays, minlength=n_runs)
+        
+        # 2. Evaluate Recall (intervals detected at least once)
+        self.detected[run_ids[hit], matched[hit]] = True
+    
+    def losses(self) -> np.ndarray:
+        """Loss per run so far (same formula as calculate_loss)."""
+        false_negatives = len(self.index) - self.detected.sum(axis=1)
+        
+        # 3. Calculate Weighted Loss
+        return (
+            (self.false_positives * self.penalty_fp) +
+            (false_negatives * self.penalty_fn) +
+            (self.total_delay * self.penalty_delay)
+        )
     
-    return loss
+    def summaries(self) -> List[Dict[str, float]]:
+        """Per-run event counts behind the loss."""
+        detected = self.detected.sum(axis=1)
+        return [
+            {
+                "events": int(self.events[run]),
+                "false_positives": int(self.false_positives[run]),
+                "detected": int(detected[run]),
+                "missed": len(self.index) - int(detected[run]),
+                "total_delay": float(self.total_delay[run]),
+            }
+            for run in range(self.n_runs)
+        ]
@@ -1,14 +1,345 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterable, Callable
 import itertools
 import pandas as pd
-from dataclasses import asdict
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from dataclasses import asdict, fields
 import logging
+import os
 
+from blackice.baseline import BaselineComputer
+from blackice.deviation import (
+    DeviationBatch, DeviationDirection, DIRECTIONS_BY_CODE, classify_deviations
+)
+from blackice.persistence import PersistenceValidator
 from blackice.pipeline import BlackicePipeline, PipelineConfig
-from blackice.learning.objective import calculate_loss, AnomalyInterval
+from blackice.state import RegimeStateMachine, StateEvent
+from blackice.learning.cache import EvaluationCache, dataset_fingerprint, ground_truth_fingerprint
+from blackice.learning.objective import (
+    calculate_loss, AnomalyInterval, IntervalIndex, LossAccumulator
+)
 
 logger = logging.getLogger(__name__)
 
+# Numeric columns the pipeline consumes; these are the only ones shipped to workers.
+TRAINING_COLUMNS = ["timestamp", "cpu_util", "mem_util"]
+
+
+class SharedFrame:
+    """
+    Numeric DataFrame columns copied once into POSIX shared memory.
+    
+    Workers attach by name and build zero-copy NumPy views, so the training
+    data is never pickled per task.
+    """
+    
+    def __init__(self, df: pd.DataFrame, columns: Optional[List[str]] = None):
+        self.columns = [c for c in (columns or TRAINING_COLUMNS) if c in df.columns]
+        self.machine_id = str(df["machine_id"].iloc[0]) if "machine_id" in df.columns and len(df) else ""
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, str, int]] = {}
+        
+        for column in self.columns:
+            dtype = np.int64 if column == "timestamp" else np.float64
+            values = df[column].to_numpy(dtype=dtype)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=dtype, buffer=block.buf)[:] = values
+            self._blocks.append(block)
+            self.spec[column] = (block.name, np.dtype(dtype).str, len(values))
+    
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+
+# Per-worker state installed by _init_worker.
+_worker_frame: Optional[pd.DataFrame] = None
+_worker_blocks: List[shared_memory.SharedMemory] = []
+_worker_ground_truth: Optional[IntervalIndex] = None
+
+
+def _init_worker(
+    spec: Dict[str, Tuple[str, str, int]],
+    machine_id: str,
+    ground_truth: List[AnomalyInterval]
+) -> None:
+    global _worker_frame, _worker_ground_truth
+    
+    columns = {}
+    for column, (name, dtype, length) in spec.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        columns[column] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+    
+    frame = pd.DataFrame(columns, copy=False)
+    frame.insert(0, "machine_id", machine_id)
+    _worker_frame = frame
+    _worker_ground_truth = IntervalIndex(ground_truth)
+
+
+def _evaluate_in_worker(
+    indexed_configs: List[Tuple[int, PipelineConfig]]
+) -> Tuple[Dict[int, float], Dict[int, Dict[str, Any]]]:
+    assert _worker_frame is not None and _worker_ground_truth is not None
+    summaries: Dict[int, Dict[str, Any]] = {}
+    losses = evaluate_grid(indexed_configs, _worker_frame, _worker_ground_truth, summaries=summaries)
+    return losses, summaries
+
+
+def evaluate_config(
+    config: PipelineConfig,
+    df: pd.DataFrame,
+    ground_truth: Union[List[AnomalyInterval], IntervalIndex]
+) -> float:
+    """Runs one configuration over the training data and returns its loss."""
+    # tracemalloc costs more than the detection itself; not needed here.
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    
+    # We treat the whole df as one stream source per machine
+    events = pipeline.process_chunk(df)
+    pipeline.stop()
+    
+    return calculate_loss(events, ground_truth)
+
+
+def evaluate_grid(
+    indexed_configs: List[Tuple[int, PipelineConfig]],
+    df: pd.DataFrame,
+    ground_truth: Union[List[AnomalyInterval], IntervalIndex],
+    summaries: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Dict[int, float]:
+    """
+    Scores many configurations while sharing work between them.
+    
+    The rolling baseline (and therefore every z-score) depends only on
+    window_size, so it is computed once per window. Each zscore_threshold
+    then re-classifies that cached series with array operations, and each
+    persistence setting replays only the run boundaries through a fresh
+    validator and state machine. The events, and so the losses, are
+    identical to running a BlackicePipeline per configuration.
+    
+    Args:
+        summaries: If given, filled with each index's event counts
+            (see LossAccumulator.summaries).
+    
+    Returns:
+        Dict mapping each given index to its loss.
+    """
+    losses: Dict[int, float] = {}
+    if not isinstance(ground_truth, IntervalIndex):
+        ground_truth = IntervalIndex(ground_truth)
+    if df.empty:
+        empty = LossAccumulator(ground_truth, 1)
+        for i, config in indexed_configs:
+            losses[i] = evaluate_config(config, df, ground_truth)
+            if summaries is not None:
+                summaries[i] = empty.summaries()[0]
+        return losses
+    
+    timestamps = df["timestamp"].to_numpy(dtype="int64")
+    machine_id = str(df["machine_id"].iloc[0]) if "machine_id" in df.columns else ""
+    metrics = {
+        name: _present(timestamps, df[column].to_numpy(dtype="float64"))
+        for name, column in BlackicePipeline.COLUMNS.items()
+        if column in df.columns
+    }
+    rows = {name: metric_rows for name, (_, _, metric_rows) in metrics.items()}
+    
+    by_window: Dict[int, List[Tuple[int, PipelineConfig]]] = {}
+    for i, config in indexed_configs:
+        by_window.setdefault(config.window_size, []).append((i, config))
+    
+    for window_size, window_configs in by_window.items():
+        series = {}
+        for name, (metric_timestamps, values, _) in metrics.items():
+            means, stds, ready_from = BaselineComputer(window_size).update_series(values)
+            series[name] = (metric_timestamps, values, means, stds, ready_from)
+        
+        by_threshold: Dict[float, List[Tuple[int, PipelineConfig]]] = {}
+        for i, config in window_configs:
+            by_threshold.setdefault(config.zscore_threshold, []).append((i, config))
+        
+        for threshold, threshold_configs in by_threshold.items():
+            batches = {
+                name: classify_deviations(metric_timestamps, values, means, stds, threshold, ready_from)
+                for name, (metric_timestamps, values, means, stds, ready_from) in series.items()
+            }
+            runs = [
+                [e.transition.timestamp for e in _replay_events(config, batches, machine_id, rows=rows)]
+                for _, config in threshold_configs
+            ]
+            accumulator = LossAccumulator(ground_truth, len(runs))
+            accumulator.add(runs)
+            for (i, _), loss in zip(threshold_configs, accumulator.losses().tolist()):
+                losses[i] = loss
+            if summaries is not None:
+                for (i, _), summary in zip(threshold_configs, accumulator.summaries()):
+                    summaries[i] = summary
+    
+    return losses
+
+
+def _present(
+    timestamps: np.ndarray,
+    values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    # Drops a metric's missing (non-finite) rows, as BlackicePipeline does
+    # per metric. Returns its timestamps, values and the original row of
+    # each kept value (None when nothing was dropped).
+    present = np.isfinite(values)
+    if present.all():
+        return timestamps, values, None
+    rows = np.flatnonzero(present)
+    return timestamps[rows], values[rows], rows
+
+
+def _replay_events(
+    config: PipelineConfig,
+    batches: Dict[str, DeviationBatch],
+    machine_id: str,
+    trackers: Optional[Dict[str, Tuple[PersistenceValidator, RegimeStateMachine]]] = None,
+    rows: Optional[Dict[str, Optional[np.ndarray]]] = None
+) -> List[StateEvent]:
+    # `trackers` carries validator/state-machine state between calls when
+    # the batches are successive chunks of one stream. `rows` maps each
+    # batch position back to its row when missing values were dropped, so
+    # events interleave across metrics in row order.
+    if trackers is None:
+        trackers = {}
+    if rows is None:
+        rows = {}
+    keyed: List[Tuple[int, int, StateEvent]] = []
+    for order, name in enumerate(BlackicePipeline.COLUMNS):
+        batch = batches.get(name)
+        if batch is None or name not in config.tracked_metrics:
+            continue
+        if name not in trackers:
+            trackers[name] = (
+                PersistenceValidator(config.to_persistence_config()),
+                RegimeStateMachine(metric_name=name)
+            )
+        validator, state_machine = trackers[name]
+        metric_rows = rows.get(name)
+        for index, result in validator.check_batch(batch):
+            transition = state_machine.process(
+                result,
+                int(batch.timestamps[index]),
+                zscore=float(batch.zscores[index])
+            )
+            if transition:
+                row = index if metric_rows is None else int(metric_rows[index])
+                keyed.append((row, order, StateEvent(
+                    metric_name=name,
+                    transition=transition,
+                    machine_id=machine_id
+                )))
+    keyed.sort(key=lambda item: (item[0], item[1]))
+    return [event for _, _, event in keyed]
+
+
+class StreamingGridEvaluator:
+    """
+    Scores many configurations over a stream of chunks, in lockstep.
+    
+    Every candidate is advanced over each chunk before the next one is
+    read, and losses are accumulated incrementally, so memory is bounded
+    by the chunk size and the per-candidate detector state rather than the
+    dataset size. Work is shared exactly as in evaluate_grid (one baseline
+    per window_size, one classification per threshold), and the final
+    losses match evaluate_grid on the concatenated data.
+    """
+    
+    def __init__(
+        self,
+        indexed_configs: List[Tuple[int, PipelineConfig]],
+        ground_truth: Union[List[AnomalyInterval], IntervalIndex]
+    ):
+        self.indexed_configs = list(indexed_configs)
+        self.rows = 0
+        self._accumulator = LossAccumulator(ground_truth, len(self.indexed_configs))
+        self._machine_id = ""
+        
+        # window -> metric -> baseline
+        self._baselines: Dict[int, Dict[str, BaselineComputer]] = {}
+        # (window, threshold) -> metric -> (direction, consecutive, start_ts)
+        self._carry: Dict[Tuple[int, float], Dict[str, Tuple[DeviationDirection, int, Optional[int]]]] = {}
+        # run position -> metric -> (validator, state machine)
+        self._trackers: List[Dict[str, Tuple[PersistenceValidator, RegimeStateMachine]]] = [
+            {} for _ in self.indexed_configs
+        ]
+        
+        self._plan: Dict[int, Dict[float, List[int]]] = {}
+        for position, (_, config) in enumerate(self.indexed_configs):
+            by_threshold = self._plan.setdefault(config.window_size, {})
+            by_threshold.setdefault(config.zscore_threshold, []).append(position)
+    
+    def feed(self, chunk: pd.DataFrame) -> List[List[int]]:
+        """
+        Advances every candidate over the next chunk of the stream.
+        
+        Returns:
+            The chunk's event timestamps per candidate (in construction order).
+        """
+        runs: List[List[int]] = [[] for _ in self.indexed_configs]
+        if chunk.empty:
+            return runs
+        if self._machine_id == "" and "machine_id" in chunk.columns:
+            self._machine_id = str(chunk["machine_id"].iloc[0])
+        self.rows += len(chunk)
+        
+        timestamps = chunk["timestamp"].to_numpy(dtype="int64")
+        metrics = {}
+        for name, column in BlackicePipeline.COLUMNS.items():
+            if column in chunk.columns:
+                present = _present(timestamps, chunk[column].to_numpy(dtype="float64"))
+                # A metric missing from the whole chunk leaves its state untouched.
+                if len(present[1]):
+                    metrics[name] = present
+        rows = {name: metric_rows for name, (_, _, metric_rows) in metrics.items()}
+        
+        for window_size, by_threshold in self._plan.items():
+            baselines = self._baselines.setdefault(window_size, {})
+            series = {}
+            for name, (metric_timestamps, values, _) in metrics.items():
+                baseline = baselines.setdefault(name, BaselineComputer(window_size))
+                means, stds, ready_from = baseline.update_series(values)
+                series[name] = (metric_timestamps, values, means, stds, ready_from)
+            
+            for threshold, positions in by_threshold.items():
+                carry = self._carry.setdefault((window_size, threshold), {})
+                batches = {}
+                for name, (metric_timestamps, values, means, stds, ready_from) in series.items():
+                    direction, consecutive, start_ts = carry.get(name, (DeviationDirection.NONE, 0, None))
+                    batch = classify_deviations(
+                        metric_timestamps, values, means, stds, threshold, ready_from,
+                        prior_direction=direction,
+                        prior_consecutive=consecutive,
+                        prior_start_ts=start_ts
+                    )
+                    carry[name] = (
+                        DIRECTIONS_BY_CODE[int(batch.directions[-1])],
+                        int(batch.consecutive[-1]),
+                        batch.final_start_ts
+                    )
+                    batches[name] = batch
+                
+                for position in positions:
+                    _, config = self.indexed_configs[position]
+                    events = _replay_events(config, batches, self._machine_id, self._trackers[position], rows)
+                    runs[position] = [e.transition.timestamp for e in events]
+        
+        self._accumulator.add(runs)
+        return runs
+    
+    def losses(self) -> Dict[int, float]:
+        """Loss per config index over everything fed so far."""
+        scores = self._accumulator.losses().tolist()
+        return {i: scores[position] for position, (i, _) in enumerate(self.indexed_configs)}
+
+
 class GridSearchOptimizer:
     """
     Performs a Grid Search to find the optimal BlackIce configuration
@@ -16,18 +347,37 @@ class GridSearchOptimizer:
     """
     
     def __init__(
-        self, 
-        param_grid: Optional[Dict[str, List[Any]]] = None
+        self,
+        param_grid: Optional[Dict[str, List[Any]]] = None,
+        n_jobs: int = 1,
+        cache: Optional[EvaluationCache] = None
     ):
+        """
+        Args:
+            param_grid: Parameter name -> candidate values.
+            n_jobs: Worker processes used to evaluate configurations.
+                1 runs serially in-process; -1 uses every CPU.
+            cache: On-disk memo of past evaluations; configs already scored
+                on the same data and ground truth are not re-run.
+        """
         self.param_grid = param_grid or {
             "window_size": [10, 20, 50, 100],
             "zscore_threshold": [2.0, 3.0, 4.0, 5.0],
             "min_consecutive_points": [3, 5, 8, 12]
         }
-        
+        self.n_jobs = n_jobs
+        self.cache = cache
+        # Config index (grid order) -> loss, from the last train() call.
+        self.losses: Dict[int, float] = {}
+    
     def _generate_configs(self) -> List[PipelineConfig]:
         """Generates all combinations of parameters."""
-        keys = self.param_grid.keys()
+        keys = list(self.param_grid.keys())
+        known = {f.name for f in fields(PipelineConfig)}
+        unknown = [k for k in keys if k not in known]
+        if unknown:
+            raise ValueError(f"Unknown PipelineConfig parameters in grid: {unknown}")
+        
         values = self.param_grid.values()
         combinations = itertools.product(*values)
         
@@ -35,58 +385,224 @@ class GridSearchOptimizer:
         for combo in combinations:
             params = dict(zip(keys, combo))
             # Create config object (handling defaults for others)
-            config = PipelineConfig(
-                window_size=params["window_size"],
-                zscore_threshold=params["zscore_threshold"],
-                min_consecutive_points=params["min_consecutive_points"]
-            )
+            config = PipelineConfig(**params)
             configs.append(config)
         return configs
-
+    
+    def _resolve_jobs(self, n_configs: int) -> int:
+        jobs = self.n_jobs if self.n_jobs > 0 else (os.cpu_count() or 1)
+        return max(1, min(jobs, n_configs))
+    
     def train(
         self, 
-        df: pd.DataFrame, 
+        df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
         ground_truth: List[AnomalyInterval]
     ) -> Optional[PipelineConfig]:
         """
         Runs the optimization loop.
         
         Args:
-            df: Historical training data.
+            df: Historical training data, or an iterator of time-ordered
+                chunks of one stream (e.g. from stream_machine_data) for
+                data that does not fit in memory.
             ground_truth: Known anomaly intervals.
             
         Returns:
             PipelineConfig: The best configuration found.
         """
         configs = self._generate_configs()
-        best_loss = float('inf')
-        best_config = None
         
         print(f"Starting Grid Search over {len(configs)} configurations...")
         
-        for i, config in enumerate(configs):
-            # 1. Initialize Pipeline
-            pipeline = BlackicePipeline(config)
-            
-            # 2. Run Inference (Offline Training Mode)
-            # We treat the whole df as one stream source per machine
-            events = pipeline.process_chunk(df)
-            
-            # 3. Calculate Loss
-            loss = calculate_loss(events, ground_truth)
-            
-            print(f"[{i+1}/{len(configs)}] Params: {asdict(config)} -> Loss: {loss:.4f}")
+        if isinstance(df, pd.DataFrame):
+            losses = self._score_configs(configs, df, ground_truth)
+        else:
+            losses = self._train_streaming(configs, df, ground_truth)
+        self.losses = losses
+        best_config, best_loss = self._select_best(configs, losses)
+        self._report(best_config, best_loss)
+        
+        return best_config
+    
+    def train_group(
+        self,
+        series: List[Tuple[pd.DataFrame, List[AnomalyInterval]]]
+    ) -> Tuple[Optional[PipelineConfig], float]:
+        """
+        Finds the configuration with the lowest total loss over several
+        machines, each replayed as its own stream.
+        
+        Runs serially and quietly; callers parallelise across groups.
+        
+        Args:
+            series: One (machine data, ground truth) pair per machine.
+        
+        Returns:
+            The best configuration and its summed loss.
+        """
+        configs = self._generate_configs()
+        totals: Dict[int, float] = {i: 0.0 for i in range(len(configs))}
+        
+        for df, ground_truth in series:
+            def evaluate(subset, summaries, df=df, ground_truth=ground_truth):
+                return evaluate_grid(list(enumerate(subset)), df, ground_truth, summaries=summaries)
             
-            # 4. Update Best
+            for i, loss in self._memoized(configs, df, ground_truth, evaluate).items():
+                totals[i] += loss
+        
+        return self._select_best(configs, totals)
+    
+    def _score_configs(
+        self,
+        configs: List[PipelineConfig],
+        df: pd.DataFrame,
+        ground_truth: List[AnomalyInterval]
+    ) -> Dict[int, float]:
+        def evaluate(subset, summaries):
+            n_jobs = self._resolve_jobs(len(subset))
+            if n_jobs == 1:
+                return self._train_serial(subset, df, ground_truth, summaries)
+            return self._train_parallel(subset, df, ground_truth, n_jobs, summaries)
+        
+        return self._memoized(configs, df, ground_truth, evaluate)
+    
+    def _memoized(
+        self,
+        configs: List[PipelineConfig],
+        df: pd.DataFrame,
+        ground_truth: List[AnomalyInterval],
+        evaluate: Callable[[List[PipelineConfig], Dict[int, Dict[str, Any]]], Dict[int, float]]
+    ) -> Dict[int, float]:
+        # evaluate(subset, summaries) scores a list of configs, filling in
+        # their summaries; only configs missing from the cache reach it.
+        if self.cache is None:
+            return evaluate(configs, {})
+        
+        dataset = dataset_fingerprint(df)
+        truth = ground_truth_fingerprint(ground_truth)
+        losses = self.cache.lookup(dataset, truth, configs)
+        missing = [i for i in range(len(configs)) if i not in losses]
+        if losses and missing:
+            print(f"Reusing {len(losses)} cached evaluations; scoring {len(missing)} new ones")
+        elif losses:
+            print(f"Reusing {len(losses)} cached evaluations")
+        
+        if missing:
+            subset = [configs[i] for i in missing]
+            summaries: Dict[int, Dict[str, Any]] = {}
+            fresh = evaluate(subset, summaries)
+            self.cache.store(dataset, truth, [
+                (subset[k], loss, summaries.get(k, {})) for k, loss in fresh.items()
+            ])
+            for k, loss in fresh.items():
+                losses[missing[k]] = loss
+        return losses
+    
+    @staticmethod
+    def _select_best(
+        configs: List[PipelineConfig],
+        losses: Dict[int, float]
+    ) -> Tuple[Optional[PipelineConfig], float]:
+        # Ties go to the earliest configuration in grid order, so serial and
+        # parallel runs always agree.
+        best_loss = float('inf')
+        best_config = None
+        for i, config in enumerate(configs):
+            loss = losses.get(i, float('inf'))
             if loss < best_loss:
                 best_loss = loss
                 best_config = config
-                
+        return best_config, best_loss
+    
+    @staticmethod
+    def _report(best_config: Optional[PipelineConfig], best_loss: float) -> None:
         print("\nOptimization Complete.")
         if best_config:
             print(f"Best Loss: {best_loss:.4f}")
             print(f"Best Config: {asdict(best_config)}")
         else:
             print("Optimization failed: No valid config found.")
+    
+    def _train_serial(
+        self,
+        configs: List[PipelineConfig],
+        df: pd.DataFrame,
+        ground_truth: List[AnomalyInterval],
+        summaries: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> Dict[int, float]:
+        losses: Dict[int, float] = {}
+        for group in self._group_configs(configs, 1):
+            for i, loss in sorted(evaluate_grid(group, df, ground_truth, summaries=summaries).items()):
+                losses[i] = loss
+                print(f"[{len(losses)}/{len(configs)}] Params: {asdict(configs[i])} -> Loss: {loss:.4f}")
+        return losses
+    
+    def _train_streaming(
+        self,
+        configs: List[PipelineConfig],
+        chunks: Iterable[pd.DataFrame],
+        ground_truth: List[AnomalyInterval]
+    ) -> Dict[int, float]:
+        # Chunks can only be read once, so every candidate advances over
+        # each chunk together; this path always runs in-process.
+        evaluator = StreamingGridEvaluator(list(enumerate(configs)), ground_truth)
+        for n_chunks, chunk in enumerate(chunks, start=1):
+            evaluator.feed(chunk)
+            print(f"  Chunk {n_chunks}: {evaluator.rows:,} rows scored")
         
-        return best_config
+        losses = evaluator.losses()
+        for i, loss in sorted(losses.items()):
+            print(f"[{i + 1}/{len(configs)}] Params: {asdict(configs[i])} -> Loss: {loss:.4f}")
+        return losses
+    
+    def _train_parallel(
+        self,
+        configs: List[PipelineConfig],
+        df: pd.DataFrame,
+        ground_truth: List[AnomalyInterval],
+        n_jobs: int,
+        summaries: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> Dict[int, float]:
+        losses: Dict[int, float] = {}
+        shared = SharedFrame(df)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                initializer=_init_worker,
+                initargs=(shared.spec, shared.machine_id, ground_truth)
+            ) as pool:
+                futures = [
+                    pool.submit(_evaluate_in_worker, group)
+                    for group in self._group_configs(configs, n_jobs)
+                ]
+                for future in as_completed(futures):
+                    group_losses, group_summaries = future.result()
+                    if summaries is not None:
+                        summaries.update(group_summaries)
+                    for i, loss in sorted(group_losses.items()):
+                        losses[i] = loss
+                        print(f"[{len(losses)}/{len(configs)}] Params: {asdict(configs[i])} -> Loss: {loss:.4f}")
+        finally:
+            shared.close()
+        return losses
+    
+    @staticmethod
+    def _group_configs(
+        configs: List[PipelineConfig],
+        n_jobs: int
+    ) -> List[List[Tuple[int, PipelineConfig]]]:
+        """
+        Splits configs into units of work that share a baseline pass.
+        
+        One group per window_size; if that leaves workers idle, groups are
+        split further per zscore_threshold at the cost of repeating the
+        baseline pass once per split.
+        """
+        groups: Dict[Any, List[Tuple[int, PipelineConfig]]] = {}
+        for i, config in enumerate(configs):
+            groups.setdefault(config.window_size, []).append((i, config))
+        if len(groups) < n_jobs:
+            groups = {}
+            for i, config in enumerate(configs):
+                groups.setdefault((config.window_size, config.zscore_threshold), []).append((i, config))
+        return list(groups.values())
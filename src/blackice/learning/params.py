@@ -0,0 +1,134 @@
+from typing import Dict, Any, Optional, List, Callable
+from dataclasses import asdict, replace
+from pathlib import Path
+import csv
+
+from blackice.pipeline import PipelineConfig
+
+# PipelineConfig fields that are tuned per machine; metric selection stays global.
+PARAM_FIELDS = [
+    "window_size",
+    "use_ewma",
+    "ewma_alpha",
+    "zscore_threshold",
+    "min_consecutive_points",
+    "min_fraction_of_window",
+    "use_window_fraction",
+]
+
+# Section of the YAML config each field lives in (see configs/default.yaml).
+PARAM_SECTIONS = {
+    "window_size": "baseline",
+    "use_ewma": "baseline",
+    "ewma_alpha": "baseline",
+    "zscore_threshold": "deviation",
+    "min_consecutive_points": "persistence",
+    "min_fraction_of_window": "persistence",
+    "use_window_fraction": "persistence",
+}
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() == "true"
+
+
+_CASTS: Dict[str, Callable[[str], Any]] = {
+    "window_size": int,
+    "use_ewma": _parse_bool,
+    "ewma_alpha": float,
+    "zscore_threshold": float,
+    "min_consecutive_points": int,
+    "min_fraction_of_window": float,
+    "use_window_fraction": _parse_bool,
+}
+
+
+class ParameterTable:
+    """
+    Learned detection parameters keyed by machine_id.
+    
+    Stored as a small CSV (one row per machine, plus the training loss and
+    the group the parameters were tuned on) so that the CLI can look up a
+    machine's parameters at start-up without loading pandas.
+    """
+    
+    COLUMNS = ["machine_id"] + PARAM_FIELDS + ["loss", "group"]
+    
+    def __init__(self) -> None:
+        self._rows: Dict[str, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, machine_id: object) -> bool:
+        return machine_id in self._rows
+    
+    @property
+    def machine_ids(self) -> List[str]:
+        return list(self._rows)
+    
+    def set(
+        self,
+        machine_id: str,
+        config: PipelineConfig,
+        loss: float = float('nan'),
+        group: Optional[str] = None
+    ) -> None:
+        """Records the tuned parameters for one machine."""
+        params = asdict(config)
+        row = {name: params[name] for name in PARAM_FIELDS}
+        row["loss"] = loss
+        row["group"] = group if group is not None else machine_id
+        self._rows[machine_id] = row
+    
+    def lookup(self, machine_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            The PipelineConfig overrides for the machine, or None if the
+            machine was not part of training.
+        """
+        row = self._rows.get(machine_id)
+        if row is None:
+            return None
+        return {name: row[name] for name in PARAM_FIELDS}
+    
+    def config_for(self, machine_id: str, base: Optional[PipelineConfig] = None) -> PipelineConfig:
+        """
+        Builds the machine's PipelineConfig, falling back to `base` (or the
+        defaults) for machines missing from the table.
+        """
+        base = base or PipelineConfig()
+        overrides = self.lookup(machine_id)
+        return replace(base, **overrides) if overrides else base
+    
+    def apply_to(self, machine_id: str, config: dict) -> dict:
+        """
+        Returns a copy of a nested YAML-style config dict with the machine's
+        parameters written into their sections (unchanged if not in the table).
+        """
+        merged = {key: dict(value) if isinstance(value, dict) else value for key, value in config.items()}
+        for name, value in (self.lookup(machine_id) or {}).items():
+            section = merged.setdefault(PARAM_SECTIONS[name], {})
+            section[name] = value
+        return merged
+    
+    def save(self, path: str) -> None:
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            for machine_id in sorted(self._rows):
+                writer.writerow({"machine_id": machine_id, **self._rows[machine_id]})
+    
+    @classmethod
+    def load(cls, path: str) -> "ParameterTable":
+        table = cls()
+        with open(path, newline="") as f:
+            for record in csv.DictReader(f):
+                row: Dict[str, Any] = {
+                    name: _CASTS[name](record[name]) for name in PARAM_FIELDS
+                }
+                row["loss"] = float(record.get("loss") or "nan")
+                row["group"] = record.get("group") or record["machine_id"]
+                table._rows[record["machine_id"]] = row
+        return table
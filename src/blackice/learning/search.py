@@ -0,0 +1,282 @@
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterable
+from dataclasses import asdict
+import itertools
+import math
+import random
+import logging
+import pandas as pd
+
+from blackice.pipeline import BlackicePipeline, PipelineConfig
+from blackice.state import StateEvent
+from blackice.learning.objective import AnomalyInterval, IntervalIndex, LossAccumulator
+from blackice.learning.cache import EvaluationCache, dataset_fingerprint, ground_truth_fingerprint
+from blackice.learning.optimizer import GridSearchOptimizer
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate_with_pruning(
+    config: PipelineConfig,
+    df: pd.DataFrame,
+    ground_truth: IntervalIndex,
+    bound: float = float('inf'),
+    chunk_rows: int = 50000,
+    penalty_fp: float = 5.0,
+    summary: Optional[Dict[str, Any]] = None
+) -> Optional[float]:
+    """
+    Scores one configuration, abandoning it as soon as it cannot win.
+    
+    The data is streamed through the pipeline in chunks. False positives
+    only ever accumulate, and every other loss term is non-negative, so
+    once false_positives * penalty_fp exceeds `bound` the final loss must
+    too and the remaining rows are skipped.
+    
+    Args:
+        summary: If given, filled with the event counts of a completed run.
+    
+    Returns:
+        The loss, or None if the candidate was abandoned.
+    """
+    pipeline = BlackicePipeline(config, profile_memory=False)
+    events: List[StateEvent] = []
+    false_positives = 0
+    
+    try:
+        for start in range(0, len(df), chunk_rows):
+            new_events = pipeline.process_chunk(df.iloc[start:start + chunk_rows])
+            if not new_events:
+                continue
+            events.extend(new_events)
+            matched = ground_truth.match([e.transition.timestamp for e in new_events])
+            false_positives += int((matched < 0).sum())
+            if false_positives * penalty_fp > bound:
+                return None
+    finally:
+        pipeline.stop()
+    
+    accumulator = LossAccumulator(ground_truth, 1, penalty_fp=penalty_fp)
+    accumulator.add([[e.transition.timestamp for e in events]])
+    if summary is not None:
+        summary.update(accumulator.summaries()[0])
+    return float(accumulator.losses()[0])
+
+
+class RandomSearchOptimizer(GridSearchOptimizer):
+    """
+    Evaluates a random sample of the grid, pruning losers mid-stream.
+    
+    Because cost no longer grows with the full product of the grid, extra
+    dimensions such as ewma_alpha or min_fraction_of_window can be searched
+    for the same wall time.
+    """
+    
+    def __init__(
+        self,
+        param_grid: Optional[Dict[str, List[Any]]] = None,
+        n_iter: int = 20,
+        seed: int = 0,
+        chunk_rows: int = 50000,
+        cache: Optional[EvaluationCache] = None
+    ):
+        """
+        Args:
+            param_grid: Parameter name -> candidate values.
+            n_iter: Number of configurations to sample (without replacement).
+            seed: Sampling seed, so runs are reproducible.
+            chunk_rows: Rows per step between pruning checks.
+            cache: On-disk memo of past evaluations.
+        """
+        super().__init__(param_grid, cache=cache)
+        self.n_iter = n_iter
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+    
+    def _generate_configs(self) -> List[PipelineConfig]:
+        configs = super()._generate_configs()
+        if len(configs) <= self.n_iter:
+            return configs
+        picked = sorted(random.Random(self.seed).sample(range(len(configs)), self.n_iter))
+        return [configs[i] for i in picked]
+    
+    def train(
+        self,
+        df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        ground_truth: List[AnomalyInterval]
+    ) -> Optional[PipelineConfig]:
+        """
+        Runs the random search.
+        
+        Args:
+            df: Historical training data, or an iterator of chunks (scored
+                in lockstep without pruning).
+            ground_truth: Known anomaly intervals.
+        
+        Returns:
+            PipelineConfig: The best configuration found.
+        """
+        if not isinstance(df, pd.DataFrame):
+            # Pruning per candidate would re-read the stream; score the
+            # sample in lockstep instead.
+            return super().train(df, ground_truth)
+        
+        configs = self._generate_configs()
+        index = IntervalIndex(ground_truth)
+        
+        print(f"Starting Random Search over {len(configs)} sampled configurations...")
+        
+        losses = _evaluate_in_order(list(enumerate(configs)), df, index, self.chunk_rows, self.cache)
+        self.losses = losses
+        best_config, best_loss = self._select_best(configs, losses)
+        self._report(best_config, best_loss)
+        
+        return best_config
+
+
+class SuccessiveHalvingOptimizer(GridSearchOptimizer):
+    """
+    Successive halving over the grid (or a random sample of it).
+    
+    Every candidate is first scored on a prefix of the data; only the best
+    1/eta move on to a prefix eta times longer, until the survivors are run
+    over the full dataset with mid-stream pruning against the best loss.
+    """
+    
+    def __init__(
+        self,
+        param_grid: Optional[Dict[str, List[Any]]] = None,
+        eta: int = 3,
+        initial_fraction: float = 0.1,
+        min_rows: int = 1000,
+        n_candidates: Optional[int] = None,
+        seed: int = 0,
+        chunk_rows: int = 50000,
+        n_jobs: int = 1,
+        cache: Optional[EvaluationCache] = None
+    ):
+        """
+        Args:
+            param_grid: Parameter name -> candidate values.
+            eta: Keep 1/eta of the candidates per rung and grow the prefix by eta.
+            initial_fraction: Fraction of rows used by the first rung.
+            min_rows: Lower bound on the first rung's prefix length.
+            n_candidates: Randomly sample this many configs from the grid
+                instead of starting from all of them.
+            seed: Sampling seed, so runs are reproducible.
+            chunk_rows: Rows per step between pruning checks in the final rung.
+            n_jobs: Worker processes for the prefix rungs.
+            cache: On-disk memo of past evaluations (every rung is cached).
+        """
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        if not (0 < initial_fraction <= 1):
+            raise ValueError("initial_fraction must be in (0, 1]")
+        super().__init__(param_grid, n_jobs=n_jobs, cache=cache)
+        self.eta = eta
+        self.initial_fraction = initial_fraction
+        self.min_rows = min_rows
+        self.n_candidates = n_candidates
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+    
+    def _generate_configs(self) -> List[PipelineConfig]:
+        configs = super()._generate_configs()
+        if self.n_candidates is None or len(configs) <= self.n_candidates:
+            return configs
+        picked = sorted(random.Random(self.seed).sample(range(len(configs)), self.n_candidates))
+        return [configs[i] for i in picked]
+    
+    def train(
+        self,
+        df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        ground_truth: List[AnomalyInterval]
+    ) -> Optional[PipelineConfig]:
+        """
+        Runs successive halving.
+        
+        Args:
+            df: Historical training data, in time order.
+            ground_truth: Known anomaly intervals.
+        
+        Returns:
+            PipelineConfig: The best configuration found.
+        """
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("Successive halving re-reads data prefixes and needs an in-memory DataFrame")
+        
+        configs = self._generate_configs()
+        candidates = list(enumerate(configs))
+        total_rows = len(df)
+        rows = max(self.min_rows, int(total_rows * self.initial_fraction))
+        
+        print(f"Starting Successive Halving over {len(configs)} configurations...")
+        
+        for rung in itertools.count():
+            if len(candidates) <= 1 or rows >= total_rows:
+                break
+            
+            prefix = df.iloc[:rows]
+            horizon = prefix["timestamp"].max()
+            # Intervals that start after the prefix would be missed by every
+            # candidate alike; dropping them keeps the rung loss meaningful.
+            prefix_truth = [iv for iv in ground_truth if iv.start_time <= horizon]
+            
+            subset = [config for _, config in candidates]
+            rung_losses = self._score_configs(subset, prefix, prefix_truth)
+            ranked = sorted(
+                range(len(candidates)),
+                key=lambda k: (rung_losses.get(k, float('inf')), candidates[k][0])
+            )
+            keep = max(1, math.ceil(len(candidates) / self.eta))
+            candidates = [candidates[k] for k in ranked[:keep]]
+            
+            print(f"Rung {rung}: {rows:,} rows, kept {len(candidates)}/{len(subset)}")
+            rows *= self.eta
+        
+        index = IntervalIndex(ground_truth)
+        losses = _evaluate_in_order(candidates, df, index, self.chunk_rows, self.cache)
+        self.losses = losses
+        best_config, best_loss = self._select_best(configs, losses)
+        self._report(best_config, best_loss)
+        
+        return best_config
+
+
+def _evaluate_in_order(
+    candidates: List[Tuple[int, PipelineConfig]],
+    df: pd.DataFrame,
+    ground_truth: IntervalIndex,
+    chunk_rows: int,
+    cache: Optional[EvaluationCache] = None
+) -> Dict[int, float]:
+    losses: Dict[int, float] = {}
+    best_loss = float('inf')
+    
+    # Cached losses are known up front and tighten the pruning bound for
+    # everything else; pruned candidates are never cached.
+    cached: Dict[int, float] = {}
+    if cache is not None:
+        dataset = dataset_fingerprint(df)
+        truth = ground_truth_fingerprint(ground_truth)
+        found = cache.lookup(dataset, truth, [config for _, config in candidates])
+        cached = {candidates[k][0]: loss for k, loss in found.items()}
+        if cached:
+            best_loss = min(cached.values())
+            print(f"Reusing {len(cached)} cached evaluations")
+    
+    for done, (i, config) in enumerate(candidates, start=1):
+        if i in cached:
+            losses[i] = cached[i]
+            continue
+        summary: Dict[str, Any] = {}
+        loss = evaluate_with_pruning(config, df, ground_truth, bound=best_loss, chunk_rows=chunk_rows, summary=summary)
+        if loss is None:
+            print(f"[{done}/{len(candidates)}] Params: {asdict(config)} -> pruned")
+            continue
+        if cache is not None:
+            cache.store(dataset, truth, [(config, loss, summary)])
+        losses[i] = loss
+        best_loss = min(best_loss, loss)
+        print(f"[{done}/{len(candidates)}] Params: {asdict(config)} -> Loss: {loss:.4f}")
+    
+    return losses
@@ -1,11 +1,14 @@
 
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Dict, Optional
 import time
 import tracemalloc
 
 from .state import StateTransition, RegimeState
 
+if TYPE_CHECKING:
+    from .chunking import ChunkSizer
+
 
 @dataclass
 class DetectionQualityMetrics:
@@ -53,6 +56,9 @@ class SystemsMetrics:
     peak_memory_mb: float = 0.0
     avg_time_per_chunk_ms: float = 0.0
     chunks_processed: int = 0
+    # Read-chunk sizes (rows, in order) when adapted to a memory budget.
+    memory_budget_mb: float = 0.0
+    chunk_sizes: List[int] = field(default_factory=list)
     
     def to_dict(self) -> dict:
         return {
@@ -61,7 +67,9 @@ class SystemsMetrics:
             "rows_per_second": self.rows_per_second,
             "peak_memory_mb": self.peak_memory_mb,
             "avg_time_per_chunk_ms": self.avg_time_per_chunk_ms,
-            "chunks_processed": self.chunks_processed
+            "chunks_processed": self.chunks_processed,
+            "memory_budget_mb": self.memory_budget_mb,
+            "chunk_sizes": list(self.chunk_sizes)
         }
 
 
@@ -206,7 +214,7 @@ class MetricsComputer:
             time_in_shifted_pct=(time_in_shifted / total_time) * 100
         )
     
-    def compute_systems_metrics(self) -> SystemsMetrics:
+    def compute_systems_metrics(self, sizer: Optional["ChunkSizer"] = None) -> SystemsMetrics:
         total_time = time.time() - self._start_time if self._start_time else 0.0
         
         return SystemsMetrics(
@@ -215,7 +223,9 @@ class MetricsComputer:
             rows_per_second=self._rows_processed / total_time if total_time > 0 else 0.0,
             peak_memory_mb=self._peak_memory,
             avg_time_per_chunk_ms=(sum(self._chunk_times) / len(self._chunk_times) * 1000) if self._chunk_times else 0.0,
-            chunks_processed=len(self._chunk_times)
+            chunks_processed=len(self._chunk_times),
+            memory_budget_mb=sizer.memory_budget_mb if sizer is not None else 0.0,
+            chunk_sizes=list(sizer.sizes) if sizer is not None else []
         )
     
     def stop_tracking(self) -> None:
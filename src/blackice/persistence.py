@@ -1,9 +1,12 @@
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+import math
 
-from .deviation import DeviationResult, DeviationDirection
+from .deviation import (
+    DeviationResult, DeviationDirection, DeviationBatch, DIRECTION_CODES, DIRECTIONS_BY_CODE
+)
 
 
 class PersistenceStatus(Enum):
@@ -17,11 +20,26 @@ class PersistenceConfig:
     min_consecutive_points: int = 10
     min_fraction_of_window: float = 0.3
     window_size: int = 60
+    use_window_fraction: bool = False
     
     @property
     def effective_threshold(self) -> int:
         fractional = int(self.min_fraction_of_window * self.window_size)
         return max(self.min_consecutive_points, fractional)
+    
+    @property
+    def consecutive_threshold(self) -> int:
+        # In window-fraction mode the two criteria are measured separately;
+        # otherwise the fraction is folded into a single consecutive count.
+        if self.use_window_fraction:
+            return self.min_consecutive_points
+        return self.effective_threshold
+    
+    @property
+    def window_count_threshold(self) -> int:
+        if not self.use_window_fraction or self.min_fraction_of_window <= 0:
+            return 0
+        return math.ceil(self.min_fraction_of_window * self.window_size)
 
 
 @dataclass
@@ -39,6 +57,79 @@ class PersistenceResult:
         return self.status == PersistenceStatus.CONFIRMED
 
 
+class SignificanceWindow:
+    __slots__ = ('_bits', '_capacity', '_head', '_size', '_count')
+    
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._bits = bytearray((capacity + 7) >> 3)
+        self._capacity = capacity
+        self._head = 0
+        self._size = 0
+        self._count = 0
+    
+    def push(self, flag: bool) -> None:
+        byte = self._head >> 3
+        mask = 1 << (self._head & 7)
+        
+        if self._size == self._capacity:
+            if self._bits[byte] & mask:
+                self._count -= 1
+        else:
+            self._size += 1
+        
+        if flag:
+            self._bits[byte] |= mask
+            self._count += 1
+        else:
+            self._bits[byte] &= ~mask & 0xFF
+        
+        self._head += 1
+        if self._head == self._capacity:
+            self._head = 0
+    
+    @property
+    def count(self) -> int:
+        return self._count
+    
+    @property
+    def size(self) -> int:
+        return self._size
+    
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+    
+    @property
+    def fraction(self) -> float:
+        return self._count / self._capacity
+    
+    def flags(self) -> List[bool]:
+        # Oldest first, independent of where the ring's head happens to be.
+        start = self._head if self._size == self._capacity else 0
+        slots = [(start + i) % self._capacity for i in range(self._size)]
+        return [bool(self._bits[slot >> 3] & (1 << (slot & 7))) for slot in slots]
+    
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self._head = 0
+        self._size = 0
+        self._count = 0
+    
+    def snapshot(self) -> dict:
+        return {"bits": self._bits.hex(), "head": self._head, "size": self._size, "count": self._count}
+    
+    def restore(self, state: dict) -> None:
+        bits = bytearray.fromhex(state["bits"])
+        if len(bits) != len(self._bits):
+            raise ValueError("snapshot window size does not match")
+        self._bits = bits
+        self._head = state["head"]
+        self._size = state["size"]
+        self._count = state["count"]
+
+
 class PersistenceValidator:
     
     def __init__(self, config: PersistenceConfig):
@@ -49,18 +140,76 @@ class PersistenceValidator:
         self._confirmed: bool = False
         self._confirmation_ts: Optional[int] = None
         self._last_direction: DeviationDirection = DeviationDirection.NONE
+        
+        # One ring per direction, so a window full of HIGH points can never
+        # confirm a LOW deviation (or the other way round).
+        self._windows: Optional[Dict[DeviationDirection, SignificanceWindow]] = None
+        if config.use_window_fraction:
+            self._windows = {
+                DeviationDirection.HIGH: SignificanceWindow(config.window_size),
+                DeviationDirection.LOW: SignificanceWindow(config.window_size)
+            }
     
     def check(self, deviation: DeviationResult) -> PersistenceResult:
-        required = self.config.effective_threshold
+        status = self._advance(
+            deviation.is_significant,
+            deviation.direction,
+            deviation.consecutive_count,
+            deviation.timestamp,
+            deviation.deviation_start_ts
+        )
+        return self._result(status, deviation.consecutive_count)
+    
+    def _advance(
+        self,
+        significant: bool,
+        direction: DeviationDirection,
+        consecutive: int,
+        timestamp: int,
+        deviation_start_ts: Optional[int]
+    ) -> PersistenceStatus:
+        if self._windows is not None:
+            for window_direction, window in self._windows.items():
+                window.push(significant and direction == window_direction)
+        
+        if not significant:
+            # A confirmed intermittent deviation stays confirmed for as long
+            # as the window still holds enough significant points.
+            if self._confirmed and self._window_fraction_met():
+                return PersistenceStatus.CONFIRMED
+            self._clear_run()
+            return PersistenceStatus.NOT_DEVIATING
         
-        if not deviation.is_significant:
-            status = PersistenceStatus.NOT_DEVIATING
-            self._watching = False
+        if direction != self._last_direction:
+            self._watching = True
+            self._watch_start_ts = deviation_start_ts
             self._confirmed = False
-            self._watch_start_ts = None
             self._confirmation_ts = None
-            self._last_direction = DeviationDirection.NONE
-            
+            self._last_direction = direction
+        
+        if consecutive >= self.config.consecutive_threshold or self._window_fraction_met():
+            if not self._confirmed:
+                self._confirmed = True
+                self._confirmation_ts = timestamp
+            return PersistenceStatus.CONFIRMED
+        
+        return PersistenceStatus.WATCHING
+    
+    def _window_fraction_met(self) -> bool:
+        required = self.config.window_count_threshold
+        return self._windows is not None and required > 0 and self.window_count >= required
+    
+    def _clear_run(self) -> None:
+        self._watching = False
+        self._confirmed = False
+        self._watch_start_ts = None
+        self._confirmation_ts = None
+        self._last_direction = DeviationDirection.NONE
+    
+    def _result(self, status: PersistenceStatus, consecutive: int) -> PersistenceResult:
+        required = self.config.consecutive_threshold
+        
+        if status == PersistenceStatus.NOT_DEVIATING:
             return PersistenceResult(
                 status=status,
                 consecutive_count=0,
@@ -71,34 +220,141 @@ class PersistenceValidator:
                 progress_fraction=0.0
             )
         
-        if deviation.direction != self._last_direction:
-            self._watching = True
-            self._watch_start_ts = deviation.deviation_start_ts
-            self._confirmed = False
-            self._confirmation_ts = None
-            self._last_direction = deviation.direction
-        
-        consecutive = deviation.consecutive_count
         progress = consecutive / required if required > 0 else 0.0
-        
-        if consecutive >= required:
-            status = PersistenceStatus.CONFIRMED
-            if not self._confirmed:
-                self._confirmed = True
-                self._confirmation_ts = deviation.timestamp
-        else:
-            status = PersistenceStatus.WATCHING
+        window_required = self.config.window_count_threshold
+        if self._windows is not None and window_required > 0:
+            progress = max(progress, self.window_count / window_required)
         
         return PersistenceResult(
             status=status,
             consecutive_count=consecutive,
             required_count=required,
-            direction=deviation.direction,
+            direction=self._last_direction,
             deviation_start_ts=self._watch_start_ts,
             confirmation_ts=self._confirmation_ts,
             progress_fraction=min(1.0, progress)
         )
     
+    def check_batch(self, batch: DeviationBatch) -> List[Tuple[int, PersistenceResult]]:
+        # Equivalent to calling check() on every point from batch.ready_from
+        # onwards, but only the points where the status can change the
+        # regime state machine are materialised: the first checked point of
+        # each run (WATCHING, or CONFIRMED if already persistent), the point
+        # a run reaches the threshold (CONFIRMED) and the first quiet point
+        # after a run (NOT_DEVIATING).
+        if self._windows is not None:
+            return self._check_batch_windowed(batch)
+        
+        import numpy as np
+        
+        required = self.config.consecutive_threshold
+        boundaries: List[Tuple[int, PersistenceResult]] = []
+        n = len(batch)
+        if n == 0:
+            return boundaries
+        
+        directions = batch.directions
+        consecutive = batch.consecutive
+        timestamps = batch.timestamps
+        ready_from = batch.ready_from
+        
+        change = np.empty(n, dtype=bool)
+        change[0] = True
+        change[1:] = directions[1:] != directions[:-1]
+        starts = np.flatnonzero(change)
+        ends = np.append(starts[1:], n)
+        
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end <= ready_from:
+                continue
+            code = int(directions[start])
+            first = max(start, ready_from)
+            
+            if code == 0:
+                if self._last_direction != DeviationDirection.NONE:
+                    self._clear_run()
+                    boundaries.append((first, self._result(PersistenceStatus.NOT_DEVIATING, 0)))
+                continue
+            
+            direction = DIRECTIONS_BY_CODE[code]
+            if direction != self._last_direction:
+                self._watching = True
+                if start == 0 and batch.prior_direction == direction:
+                    self._watch_start_ts = batch.prior_start_ts
+                else:
+                    self._watch_start_ts = int(timestamps[start])
+                self._confirmed = False
+                self._confirmation_ts = None
+                self._last_direction = direction
+                boundaries.append((first, self._run_result(first, int(consecutive[first]), batch)))
+            
+            if not self._confirmed:
+                confirm_at = first + max(required - int(consecutive[first]), 0)
+                if confirm_at < end:
+                    boundaries.append((
+                        confirm_at,
+                        self._run_result(confirm_at, int(consecutive[confirm_at]), batch)
+                    ))
+        
+        return boundaries
+    
+    def _run_result(
+        self,
+        index: int,
+        consecutive: int,
+        batch: DeviationBatch
+    ) -> PersistenceResult:
+        if consecutive >= self.config.consecutive_threshold:
+            status = PersistenceStatus.CONFIRMED
+            if not self._confirmed:
+                self._confirmed = True
+                self._confirmation_ts = int(batch.timestamps[index])
+        else:
+            status = PersistenceStatus.WATCHING
+        return self._result(status, consecutive)
+    
+    def _check_batch_windowed(self, batch: DeviationBatch) -> List[Tuple[int, PersistenceResult]]:
+        # The window criterion depends on every checked point, so step
+        # through them, but still only materialise results where the
+        # (status, direction) pair changes; repeats are no-ops for the
+        # state machine.
+        boundaries: List[Tuple[int, PersistenceResult]] = []
+        n = len(batch)
+        if batch.ready_from >= n:
+            return boundaries
+        
+        directions = batch.directions.tolist()
+        consecutive = batch.consecutive.tolist()
+        timestamps = batch.timestamps.tolist()
+        
+        previous_status: Optional[PersistenceStatus] = None
+        previous_direction = self._last_direction
+        run_start_ts = batch.prior_start_ts if batch.prior_direction != DeviationDirection.NONE else None
+        
+        for i in range(n):
+            code = directions[i]
+            if code == 0:
+                run_start_ts = None
+            elif i == 0 or directions[i - 1] != code:
+                if not (i == 0 and DIRECTIONS_BY_CODE[code] == batch.prior_direction):
+                    run_start_ts = timestamps[i]
+            if i < batch.ready_from:
+                continue
+            
+            status = self._advance(
+                code != 0,
+                DIRECTIONS_BY_CODE[code],
+                consecutive[i],
+                timestamps[i],
+                run_start_ts
+            )
+            if status != previous_status or self._last_direction != previous_direction:
+                boundaries.append((i, self._result(status, consecutive[i])))
+                previous_status = status
+                previous_direction = self._last_direction
+        
+        return boundaries
+    
     @property
     def is_watching(self) -> bool:
         return self._watching
@@ -107,12 +363,60 @@ class PersistenceValidator:
     def is_confirmed(self) -> bool:
         return self._confirmed
     
+    @property
+    def window_count(self) -> int:
+        # Significant points in the window for the direction being tracked.
+        if self._windows is None or self._last_direction not in self._windows:
+            return 0
+        return self._windows[self._last_direction].count
+    
+    @property
+    def window_flags(self) -> List[int]:
+        # Direction code of every point in the window, oldest first.
+        if self._windows is None:
+            return []
+        high = self._windows[DeviationDirection.HIGH].flags()
+        low = self._windows[DeviationDirection.LOW].flags()
+        return [
+            DIRECTION_CODES[DeviationDirection.HIGH] if is_high
+            else DIRECTION_CODES[DeviationDirection.LOW] if is_low
+            else DIRECTION_CODES[DeviationDirection.NONE]
+            for is_high, is_low in zip(high, low)
+        ]
+    
+    def snapshot(self) -> dict:
+        return {
+            "watching": self._watching,
+            "watch_start_ts": self._watch_start_ts,
+            "confirmed": self._confirmed,
+            "confirmation_ts": self._confirmation_ts,
+            "direction": self._last_direction.value,
+            "window": {
+                direction.value: window.snapshot() for direction, window in self._windows.items()
+            } if self._windows is not None else None
+        }
+    
+    def restore(self, state: dict) -> None:
+        if (state["window"] is None) != (self._windows is None):
+            raise ValueError("snapshot and validator disagree on use_window_fraction")
+        self._watching = state["watching"]
+        self._watch_start_ts = state["watch_start_ts"]
+        self._confirmed = state["confirmed"]
+        self._confirmation_ts = state["confirmation_ts"]
+        self._last_direction = DeviationDirection(state["direction"])
+        if self._windows is not None:
+            for direction, window in self._windows.items():
+                window.restore(state["window"][direction.value])
+    
     def reset(self) -> None:
         self._watching = False
         self._watch_start_ts = None
         self._confirmed = False
         self._confirmation_ts = None
         self._last_direction = DeviationDirection.NONE
+        if self._windows is not None:
+            for window in self._windows.values():
+                window.clear()
     
     def __repr__(self) -> str:
         status = "CONFIRMED" if self._confirmed else ("WATCHING" if self._watching else "IDLE")
@@ -1,15 +1,52 @@
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Iterator, Any
+from dataclasses import asdict, dataclass, field, replace
+from typing import TYPE_CHECKING, List, Dict, Optional, Iterator, Any, Tuple
 import time
-import pandas as pd
 
 from .baseline import BaselineComputer
 from .deviation import DeviationTracker
 from .persistence import PersistenceValidator, PersistenceConfig
 from .state import RegimeStateMachine, StateTransition, StateEvent, RegimeState
+from .eventlog import EventLog
 from .metrics import MetricsComputer
 
+# numpy and pandas are imported where first needed so that importing the
+# pipeline (and the CLI) stays cheap for short-lived processes.
+if TYPE_CHECKING:
+    import pandas as pd
+    
+    from .chunking import ChunkSizer
+    from .snapshots import SnapshotWriter
+    from .warmstart import WarmStartTable
+
+
+# Built-in metrics and the machine_usage.csv column each one reads.
+DEFAULT_METRIC_COLUMNS = {"cpu": "cpu_util", "memory": "mem_util"}
+
+# Detector settings a metric may override (see PipelineConfig.for_metric).
+METRIC_OVERRIDES = ("window_size", "zscore_threshold", "min_consecutive_points", "min_fraction_of_window")
+
+
+@dataclass
+class MetricSpec:
+    name: str
+    column: str
+    # None inherits the pipeline-wide setting.
+    window_size: Optional[int] = None
+    zscore_threshold: Optional[float] = None
+    min_consecutive_points: Optional[int] = None
+    min_fraction_of_window: Optional[float] = None
+    
+    @classmethod
+    def from_dict(cls, name: str, spec: dict) -> "MetricSpec":
+        unknown = set(spec) - {"column", *METRIC_OVERRIDES}
+        if unknown:
+            raise ValueError(f"metrics.{name}: unknown settings {sorted(unknown)}")
+        column = spec.get("column", DEFAULT_METRIC_COLUMNS.get(name))
+        if column is None:
+            raise ValueError(f"metrics.{name}: 'column' is required")
+        return cls(name=name, column=column, **{key: spec[key] for key in METRIC_OVERRIDES if key in spec})
+
 
 @dataclass
 class PipelineConfig:
@@ -19,8 +56,11 @@ class PipelineConfig:
     zscore_threshold: float = 2.0
     min_consecutive_points: int = 10
     min_fraction_of_window: float = 0.3
+    use_window_fraction: bool = False
     track_cpu: bool = True
     track_memory: bool = True
+    # Extra metrics, or per-metric overrides of cpu / memory.
+    custom_metrics: List[MetricSpec] = field(default_factory=list)
     
     @classmethod
     def from_dict(cls, config: dict) -> "PipelineConfig":
@@ -29,6 +69,14 @@ class PipelineConfig:
         persistence = config.get("persistence", {})
         metrics = config.get("metrics", {})
         
+        # `name: true/false` toggles a built-in metric; `name: {column: ...,
+        # zscore_threshold: ...}` adds (or tunes) a metric.
+        custom = [
+            MetricSpec.from_dict(name, spec or {})
+            for name, spec in metrics.items()
+            if not isinstance(spec, bool)
+        ]
+        
         return cls(
             window_size=baseline.get("window_size", 60),
             use_ewma=baseline.get("use_ewma", False),
@@ -36,9 +84,47 @@ class PipelineConfig:
             zscore_threshold=deviation.get("zscore_threshold", 2.0),
             min_consecutive_points=persistence.get("min_consecutive_points", 10),
             min_fraction_of_window=persistence.get("min_fraction_of_window", 0.3),
-            track_cpu=metrics.get("cpu", True),
-            track_memory=metrics.get("memory", True)
+            use_window_fraction=persistence.get("use_window_fraction", False),
+            track_cpu=metrics.get("cpu", True) is not False,
+            track_memory=metrics.get("memory", True) is not False,
+            custom_metrics=custom
         )
+    
+    def to_persistence_config(self) -> PersistenceConfig:
+        return PersistenceConfig(
+            min_consecutive_points=self.min_consecutive_points,
+            min_fraction_of_window=self.min_fraction_of_window,
+            window_size=self.window_size,
+            use_window_fraction=self.use_window_fraction
+        )
+    
+    @property
+    def metric_specs(self) -> List[MetricSpec]:
+        specs: Dict[str, MetricSpec] = {}
+        if self.track_cpu:
+            specs["cpu"] = MetricSpec("cpu", DEFAULT_METRIC_COLUMNS["cpu"])
+        if self.track_memory:
+            specs["memory"] = MetricSpec("memory", DEFAULT_METRIC_COLUMNS["memory"])
+        for spec in self.custom_metrics:
+            specs[spec.name] = spec
+        return list(specs.values())
+    
+    @property
+    def tracked_metrics(self) -> List[str]:
+        return [spec.name for spec in self.metric_specs]
+    
+    def to_dict(self) -> dict:
+        # Flat field dump (the inverse of from_fields, not of from_dict).
+        return asdict(self)
+    
+    @classmethod
+    def from_fields(cls, fields: dict) -> "PipelineConfig":
+        custom = [MetricSpec(**spec) for spec in fields.get("custom_metrics", [])]
+        return cls(**{**fields, "custom_metrics": custom})
+    
+    def for_metric(self, spec: MetricSpec) -> "PipelineConfig":
+        overrides = {key: getattr(spec, key) for key in METRIC_OVERRIDES if getattr(spec, key) is not None}
+        return replace(self, **overrides) if overrides else self
 
 
 @dataclass
@@ -57,42 +143,47 @@ class MetricTracker:
 
 
 class BlackicePipeline:
+
+    COLUMNS = DEFAULT_METRIC_COLUMNS
     
-    def __init__(self, config: PipelineConfig):
+    def __init__(self, config: PipelineConfig, profile_memory: bool = True, reanchor: bool = False):
         self.config = config
+        # Baselines re-anchor once per window (needed for sharded backfill).
+        self._reanchor = reanchor
         
         self._trackers: Dict[str, MetricTracker] = {}
+        # Metric name -> input column, resolved once for every chunk.
+        self._columns: Dict[str, str] = {}
         
-        if config.track_cpu:
-            self._trackers["cpu"] = self._create_tracker("cpu")
-        if config.track_memory:
-            self._trackers["memory"] = self._create_tracker("memory")
+        for spec in config.metric_specs:
+            self._trackers[spec.name] = self._create_tracker(spec.name, config.for_metric(spec))
+            self._columns[spec.name] = spec.column
         
-        self._metrics = MetricsComputer(track_memory=True)
-        self._events: List[StateEvent] = []
+        self._metrics = MetricsComputer(track_memory=profile_memory)
+        # Every emitted event, stored column-wise (see eventlog.py).
+        self._events = EventLog()
         self._machine_id: str = ""
         self._first_timestamp: Optional[int] = None
         self._last_timestamp: Optional[int] = None
         self._started: bool = False
+        self._rows: int = 0
+        self._snapshots: Optional["SnapshotWriter"] = None
+        self._chunk_sizer: Optional["ChunkSizer"] = None
     
-    def _create_tracker(self, name: str) -> MetricTracker:
+    def _create_tracker(self, name: str, config: PipelineConfig) -> MetricTracker:
         baseline = BaselineComputer(
-            window_size=self.config.window_size,
-            use_ewma=self.config.use_ewma,
-            ewma_alpha=self.config.ewma_alpha
+            window_size=config.window_size,
+            use_ewma=config.use_ewma,
+            ewma_alpha=config.ewma_alpha,
+            reanchor=self._reanchor
         )
         
         deviation = DeviationTracker(
             baseline=baseline,
-            zscore_threshold=self.config.zscore_threshold
+            zscore_threshold=config.zscore_threshold
         )
         
-        persistence_config = PersistenceConfig(
-            min_consecutive_points=self.config.min_consecutive_points,
-            min_fraction_of_window=self.config.min_fraction_of_window,
-            window_size=self.config.window_size
-        )
-        persistence = PersistenceValidator(persistence_config)
+        persistence = PersistenceValidator(config.to_persistence_config())
         
         state_machine = RegimeStateMachine(metric_name=name)
         
@@ -104,7 +195,52 @@ class BlackicePipeline:
             state_machine=state_machine
         )
     
-    def process_chunk(self, df_chunk: pd.DataFrame) -> List[StateEvent]:
+    def process_chunk(self, df_chunk: "pd.DataFrame") -> List[StateEvent]:
+        # Any mapping of column name -> sequence works as well as a DataFrame.
+        import numpy as np
+        
+        if "timestamp" not in df_chunk:
+            return self.process_arrays(np.empty(0, dtype=np.int64), {})
+        timestamps = np.asarray(df_chunk["timestamp"], dtype=np.int64)
+        
+        machine_id = None
+        if self._machine_id == "" and len(timestamps) and "machine_id" in df_chunk:
+            machine_id = str(_first(df_chunk["machine_id"]))
+        
+        metrics = {name: df_chunk[column] for name, column in self._columns.items() if column in df_chunk}
+        return self.process_arrays(timestamps, metrics, machine_id=machine_id)
+    
+    def process_record_batch(self, batch: Any, machine_id: Optional[str] = None) -> List[StateEvent]:
+        # An Arrow RecordBatch (duck-typed; pyarrow is not a dependency).
+        # Null-free numeric columns are handed over without a copy.
+        names = list(batch.schema.names)
+        
+        def column(name: str) -> Any:
+            array = batch.column(names.index(name))
+            try:
+                return array.to_numpy(zero_copy_only=True)
+            except ValueError:
+                return array.to_numpy(zero_copy_only=False)
+        
+        if machine_id is None and self._machine_id == "" and batch.num_rows and "machine_id" in names:
+            machine_id = str(batch.column(names.index("machine_id"))[0].as_py())
+        
+        metrics = {name: column(col) for name, col in self._columns.items() if col in names}
+        timestamps = column("timestamp") if "timestamp" in names else []
+        return self.process_arrays(timestamps, metrics, machine_id=machine_id)
+    
+    def process_arrays(
+        self,
+        timestamps: Any,
+        metrics: Dict[str, Any],
+        machine_id: Optional[str] = None
+    ) -> List[StateEvent]:
+        # timestamps and each metric's values are 1-D sequences of equal
+        # length; contiguous int64 / float64 arrays are used without a copy.
+        # Metrics are keyed by name ("cpu", "memory", custom metrics); rows
+        # where a metric is missing (NaN) are skipped for that metric only.
+        import numpy as np
+        
         if not self._started:
             self._metrics.start_processing()
             self._started = True
@@ -112,87 +248,191 @@ class BlackicePipeline:
         start_time = time.time()
         events: List[StateEvent] = []
         
-        if df_chunk.empty:
+        unknown = set(metrics) - set(self._trackers)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {sorted(unknown)} (tracking {list(self._trackers)})")
+        
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
             return events
         
-        if self._machine_id == "" and "machine_id" in df_chunk.columns:
-            self._machine_id = str(df_chunk["machine_id"].iloc[0])
-        
-        for row in df_chunk.itertuples(index=False):
-            timestamp = int(row.timestamp)
-            
-            if self._first_timestamp is None:
-                self._first_timestamp = timestamp
-            self._last_timestamp = timestamp
-            
-            if "cpu" in self._trackers and hasattr(row, "cpu_util"):
-                event = self._process_point(
-                    self._trackers["cpu"],
-                    float(row.cpu_util),
-                    timestamp
-                )
-                if event:
-                    events.append(event)
-            
-            if "memory" in self._trackers and hasattr(row, "mem_util"):
-                event = self._process_point(
-                    self._trackers["memory"],
-                    float(row.mem_util),
-                    timestamp
-                )
-                if event:
-                    events.append(event)
+        if machine_id is not None and self._machine_id == "":
+            self._machine_id = str(machine_id)
+        
+        if self._first_timestamp is None:
+            self._first_timestamp = int(timestamps[0])
+        
+        series: List[Tuple[int, MetricTracker, Any]] = []
+        for order, (name, tracker) in enumerate(self._trackers.items()):
+            if name not in metrics:
+                continue
+            values = np.asarray(metrics[name], dtype=np.float64)
+            if values.shape != timestamps.shape:
+                raise ValueError(f"{name}: {len(values)} values for {len(timestamps)} timestamps")
+            series.append((order, tracker, values))
+        
+        # Snapshots fall between rows, so the arrays are processed in
+        # segments ending at each snapshot point.
+        cuts = self._snapshots.cuts(self._rows, timestamps) if self._snapshots is not None else []
+        bounds = [0] + [cut for cut in cuts if cut < len(timestamps)] + [len(timestamps)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            events.extend(self._process_rows(timestamps[lo:hi], series, lo, hi))
+            self._rows += hi - lo
+            if self._snapshots is not None and hi in cuts:
+                self._last_timestamp = int(timestamps[hi - 1])
+                self._snapshots.write(self.snapshot())
+        self._last_timestamp = int(timestamps[-1])
         
         duration = time.time() - start_time
-        self._metrics.record_chunk(len(df_chunk), duration)
+        self._metrics.record_chunk(len(timestamps), duration)
         
         self._events.extend(events)
         
         return events
     
-    def _process_point(
-        self, 
-        tracker: MetricTracker, 
-        value: float, 
-        timestamp: int
-    ) -> Optional[StateEvent]:
-        tracker.values.append(value)
-        tracker.timestamps.append(timestamp)
-        tracker.means.append(tracker.baseline.mean)
-        tracker.stds.append(tracker.baseline.std)
-        
-        deviation_result = tracker.deviation.update(value, timestamp)
-        tracker.zscores.append(deviation_result.zscore)
-        
-        if not tracker.baseline.is_ready:
-            return None
-        
-        persistence_result = tracker.persistence.check(deviation_result)
-        
-        transition = tracker.state_machine.process(
-            persistence_result, 
-            timestamp,
-            zscore=deviation_result.zscore
-        )
+    def _process_rows(
+        self,
+        timestamps: Any,
+        series: List[Tuple[int, MetricTracker, Any]],
+        lo: int,
+        hi: int
+    ) -> List[StateEvent]:
+        import numpy as np
+        
+        # (row index, tracker order, event) so the merged stream keeps the
+        # row-major order of the per-point implementation.
+        keyed: List[Tuple[int, int, StateEvent]] = []
+        for order, tracker, all_values in series:
+            values = all_values[lo:hi]
+            present = np.isfinite(values)
+            if present.all():
+                for index, event in self._process_series(tracker, values, timestamps):
+                    keyed.append((index, order, event))
+            else:
+                rows = np.flatnonzero(present)
+                for index, event in self._process_series(tracker, values[rows], timestamps[rows]):
+                    keyed.append((int(rows[index]), order, event))
+        
+        keyed.sort(key=lambda item: (item[0], item[1]))
+        return [event for _, _, event in keyed]
+    
+    def _process_series(
+        self,
+        tracker: MetricTracker,
+        values: Any,
+        timestamps: Any
+    ) -> List[Tuple[int, StateEvent]]:
+        batch = tracker.deviation.update_batch(values, timestamps)
+        
+        tracker.values.extend(batch.values.tolist())
+        tracker.timestamps.extend(batch.timestamps.tolist())
+        tracker.means.extend(batch.means.tolist())
+        tracker.stds.extend(batch.stds.tolist())
+        tracker.zscores.extend(batch.zscores.tolist())
         
-        if transition:
-            self._metrics.record_transition(transition)
-            return StateEvent(
-                metric_name=tracker.name,
-                transition=transition,
-                machine_id=self._machine_id
+        if len(batch.timestamps):
+            tracker.state_machine.advance(int(batch.timestamps[0]))
+        
+        events: List[Tuple[int, StateEvent]] = []
+        for index, persistence_result in tracker.persistence.check_batch(batch):
+            transition = tracker.state_machine.process(
+                persistence_result,
+                int(batch.timestamps[index]),
+                zscore=float(batch.zscores[index])
             )
+            if transition:
+                self._metrics.record_transition(transition)
+                events.append((index, StateEvent(
+                    metric_name=tracker.name,
+                    transition=transition,
+                    machine_id=self._machine_id
+                )))
         
-        return None
+        if len(batch.timestamps):
+            tracker.state_machine.advance(int(batch.timestamps[-1]))
+        
+        return events
+    
+    def warm_start(self, table: "WarmStartTable", machine_id: Optional[str] = None) -> int:
+        # Seeds baselines from stored history (see warmstart.py) so the
+        # first window of points is scored instead of only warming up.
+        if machine_id is not None and self._machine_id == "":
+            self._machine_id = machine_id
+        return table.apply(self, machine_id or self._machine_id)
+    
+    def attach_snapshots(self, writer: "SnapshotWriter") -> None:
+        self._snapshots = writer
+    
+    def attach_chunk_sizer(self, sizer: "ChunkSizer") -> None:
+        # The sizes it picks are reported with the systems metrics.
+        self._chunk_sizer = sizer
+    
+    def snapshot(self) -> Dict[str, Any]:
+        # The detector internals of every metric, enough to resume the
+        # stream from the next row with identical output.
+        return {
+            "timestamp": self._last_timestamp,
+            "rows": self._rows,
+            "machine_id": self._machine_id,
+            "first_timestamp": self._first_timestamp,
+            "config": self.config.to_dict(),
+            "metrics": {
+                name: {
+                    "deviation": tracker.deviation.snapshot(),
+                    "persistence": tracker.persistence.snapshot(),
+                    "state": tracker.state_machine.snapshot()
+                }
+                for name, tracker in self._trackers.items()
+            }
+        }
+    
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        if set(snapshot["metrics"]) != set(self._trackers):
+            raise ValueError(
+                f"snapshot tracks {sorted(snapshot['metrics'])}, pipeline tracks {sorted(self._trackers)}"
+            )
+        self.reset()
+        for name, state in snapshot["metrics"].items():
+            tracker = self._trackers[name]
+            tracker.deviation.restore(state["deviation"])
+            tracker.persistence.restore(state["persistence"])
+            tracker.state_machine.restore(state["state"])
+        self._rows = snapshot["rows"]
+        self._machine_id = snapshot["machine_id"]
+        self._first_timestamp = snapshot["first_timestamp"]
+        self._last_timestamp = snapshot["timestamp"]
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any], profile_memory: bool = False) -> "BlackicePipeline":
+        pipeline = cls(PipelineConfig.from_fields(snapshot["config"]), profile_memory=profile_memory)
+        pipeline.restore(snapshot)
+        return pipeline
+    
+    @property
+    def rows_processed(self) -> int:
+        return self._rows
     
     @property
     def events(self) -> List[StateEvent]:
-        return self._events.copy()
+        return self._events.to_list()
+    
+    @property
+    def event_log(self) -> EventLog:
+        return self._events
     
     @property
     def machine_id(self) -> str:
         return self._machine_id
     
+    @property
+    def columns(self) -> Dict[str, str]:
+        return dict(self._columns)
+    
+    @property
+    def input_columns(self) -> List[str]:
+        # What a reader has to load to feed every tracked metric.
+        return ["machine_id", "timestamp"] + list(dict.fromkeys(self._columns.values()))
+    
     def get_tracker(self, metric: str) -> Optional[MetricTracker]:
         return self._trackers.get(metric)
     
@@ -202,6 +442,29 @@ class BlackicePipeline:
             return tracker.state_machine.transitions
         return []
     
+    def state_at(self, metric: str, timestamp: int) -> Optional[RegimeState]:
+        tracker = self._trackers.get(metric)
+        if tracker:
+            return tracker.state_machine.state_at(timestamp)
+        return None
+    
+    def transitions_between(self, metric: str, start: int, end: int) -> List[StateTransition]:
+        tracker = self._trackers.get(metric)
+        if tracker:
+            return tracker.state_machine.transitions_between(start, end)
+        return []
+    
+    def dwell_times(
+        self,
+        metric: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> Dict[str, int]:
+        tracker = self._trackers.get(metric)
+        if tracker:
+            return tracker.state_machine.dwell_times(start, end)
+        return {}
+    
     def get_current_state(self, metric: str) -> Optional[RegimeState]:
         tracker = self._trackers.get(metric)
         if tracker:
@@ -229,7 +492,7 @@ class BlackicePipeline:
         result = {
             "machine_id": self._machine_id,
             "total_duration": total_duration,
-            "systems": self._metrics.compute_systems_metrics().to_dict()
+            "systems": self._metrics.compute_systems_metrics(self._chunk_sizer).to_dict()
         }
         
         for name, tracker in self._trackers.items():
@@ -238,7 +501,8 @@ class BlackicePipeline:
                 "detection": self._metrics.compute_detection_quality(transitions).to_dict(),
                 "stability": self._metrics.compute_stability(transitions, total_duration).to_dict(),
                 "current_state": tracker.state_machine.current_state.value,
-                "transition_count": len(transitions)
+                "transition_count": len(transitions),
+                "dwell_time": tracker.state_machine.dwell_times()
             }
         
         return result
@@ -264,26 +528,104 @@ class BlackicePipeline:
         self._first_timestamp = None
         self._last_timestamp = None
         self._started = False
+        self._rows = 0
     
     def __repr__(self) -> str:
         trackers = ", ".join(self._trackers.keys())
         return f"BlackicePipeline(trackers=[{trackers}], events={len(self._events)})"
 
 
+def _first(column: Any) -> Any:
+    # Positional, so filtered DataFrame chunks with a non-zero index work.
+    return column.iloc[0] if hasattr(column, "iloc") else column[0]
+
+
+# Headerless Alibaba-format machine_usage.csv layout. c5 .. c9 are mem_gps,
+# mkpi, net_in, net_out and disk_io_percent in the Alibaba 2018 trace.
+MACHINE_USAGE_COLUMNS = ["machine_id", "timestamp", "cpu_util", "mem_util", "c5", "c6", "c7", "c8", "c9"]
+
+
+def read_ahead(items: Iterator[Any], depth: int) -> Iterator[Any]:
+    # Runs `items` on a background thread at most `depth` items ahead of
+    # the consumer. pandas' C parser releases the GIL while tokenizing, so
+    # the next chunk is read and filtered while the current one is being
+    # detected. Errors are re-raised in the consumer; closing the generator
+    # early stops the reader at its next chunk.
+    import queue
+    import threading
+    
+    buffer: "queue.Queue[Tuple[bool, Any]]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    
+    def offer(entry: Tuple[bool, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce() -> None:
+        try:
+            for item in items:
+                if not offer((False, item)):
+                    return
+            offer((True, None))
+        except BaseException as exc:
+            offer((True, exc))
+    
+    reader = threading.Thread(target=produce, name="blackice-prefetch", daemon=True)
+    reader.start()
+    try:
+        while True:
+            finished, item = buffer.get()
+            if finished:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
 def stream_machine_data(
     filepath: str,
     machine_id: str,
     chunksize: int = 500000,
-    columns: Optional[List[str]] = None
-) -> Iterator[pd.DataFrame]:
+    columns: Optional[List[str]] = None,
+    usecols: Optional[List[str]] = None,
+    prefetch: int = 0,
+    sizer: Optional["ChunkSizer"] = None
+) -> Iterator["pd.DataFrame"]:
+    # prefetch > 0 reads up to that many chunks ahead on a background
+    # thread (1 = double buffering); the chunks are the same either way.
+    # A ChunkSizer replaces the fixed chunksize with sizes adapted to its
+    # memory budget and the measured time per chunk.
+    if prefetch > 0:
+        chunks = stream_machine_data(filepath, machine_id, chunksize, columns, usecols, sizer=sizer)
+        yield from read_ahead(chunks, prefetch)
+        return
+    
+    import pandas as pd
+    
     if columns is None:
-        columns = ["machine_id", "timestamp", "cpu_util", "mem_util", "c5", "c6", "c7", "c8", "c9"]
+        columns = MACHINE_USAGE_COLUMNS
+    # Every metric column is read in the same pass; pass
+    # BlackicePipeline.input_columns to load custom metrics too.
+    if usecols is None:
+        usecols = ["machine_id", "timestamp", "cpu_util", "mem_util"]
+    
+    if sizer is not None:
+        yield from _stream_adaptive(filepath, machine_id, columns, usecols, sizer)
+        return
     
     reader = pd.read_csv(
         filepath,
         names=columns,
         header=None,
-        usecols=["machine_id", "timestamp", "cpu_util", "mem_util"],
+        usecols=usecols,
         chunksize=chunksize
     )
     
@@ -291,3 +633,30 @@ def stream_machine_data(
         filtered = chunk[chunk["machine_id"] == machine_id]
         if not filtered.empty:
             yield filtered.sort_values("timestamp")
+
+
+def _stream_adaptive(
+    filepath: str,
+    machine_id: str,
+    columns: List[str],
+    usecols: List[str],
+    sizer: "ChunkSizer"
+) -> Iterator["pd.DataFrame"]:
+    # Each chunk is timed from the request for it to the request for the
+    # next, so the caller's processing (spent while this generator is
+    # suspended) counts towards the chunk's cost.
+    import pandas as pd
+    
+    from .chunking import frame_bytes_per_row
+    
+    with pd.read_csv(filepath, names=columns, header=None, usecols=usecols, iterator=True) as reader:
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = reader.get_chunk(sizer.next_size())
+            except StopIteration:
+                return
+            filtered = chunk[chunk["machine_id"] == machine_id]
+            if not filtered.empty:
+                yield filtered.sort_values("timestamp")
+            sizer.observe(len(chunk), frame_bytes_per_row(chunk), time.perf_counter() - started)
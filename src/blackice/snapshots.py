@@ -0,0 +1,144 @@
+
+from bisect import bisect_right
+from contextlib import ExitStack
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def index_path(path: str) -> str:
+    # One "timestamp rows offset length" line per snapshot, so opening a
+    # sidecar never parses the snapshots themselves.
+    return path + ".idx"
+
+
+class SnapshotWriter:
+    # Appends pipeline snapshots (one JSON object per line) to a sidecar
+    # file every `every_points` rows and/or every `every_seconds` of stream
+    # time, whichever comes first, plus a line per snapshot to its index.
+    
+    def __init__(self, path: str, every_points: int = 0, every_seconds: int = 0):
+        if every_points <= 0 and every_seconds <= 0:
+            raise ValueError("set every_points and/or every_seconds")
+        self.path = path
+        self.every_points = every_points
+        self.every_seconds = every_seconds
+        self.written = 0
+        with ExitStack() as stack:
+            self._file = stack.enter_context(open(path, "wb"))
+            self._index = stack.enter_context(open(index_path(path), "w"))
+            self._handles = stack.pop_all()
+        self._offset = 0
+        self._last_rows = 0
+        self._last_ts: Optional[int] = None
+    
+    def cuts(self, rows_before: int, timestamps: "np.ndarray") -> List[int]:
+        # End offsets within `timestamps` (sorted) after which a snapshot is
+        # due, given `rows_before` rows were processed before this array.
+        import numpy as np
+        
+        n = len(timestamps)
+        if n == 0:
+            return []
+        if self._last_ts is None:
+            self._last_ts = int(timestamps[0])
+        
+        cuts: List[int] = []
+        pos = 0
+        while pos < n:
+            due = n
+            if self.every_points > 0:
+                due = min(due, self._last_rows + self.every_points - rows_before - 1)
+            if self.every_seconds > 0:
+                target = self._last_ts + self.every_seconds
+                due = min(due, pos + int(np.searchsorted(timestamps[pos:], target, side="left")))
+            due = max(due, pos)
+            if due >= n:
+                break
+            cuts.append(due + 1)
+            self._last_rows = rows_before + due + 1
+            self._last_ts = int(timestamps[due])
+            pos = due + 1
+        return cuts
+    
+    def write(self, snapshot: Dict[str, Any]) -> None:
+        line = (json.dumps(snapshot, separators=(",", ":")) + "\n").encode()
+        self._file.write(line)
+        self._file.flush()
+        # Written after the snapshot, so a crash leaves at worst an index
+        # that is one entry short (and is then ignored).
+        self._index.write(f"{snapshot['timestamp']} {snapshot['rows']} {self._offset} {len(line)}\n")
+        self._index.flush()
+        self._offset += len(line)
+        self.written += 1
+    
+    def close(self) -> None:
+        self._handles.close()
+    
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+    
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class SnapshotIndex:
+    # Timestamp -> byte offset of every snapshot in a sidecar file, read
+    # from the writer's index file; only the snapshot asked for is parsed.
+    # Sidecars without a matching index are scanned once instead.
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.timestamps: List[int] = []
+        self.rows: List[int] = []
+        self._offsets: List[int] = []
+        
+        if not self._read_index():
+            self._scan()
+    
+    def _read_index(self) -> bool:
+        try:
+            with open(index_path(self.path)) as f:
+                entries = [line.split() for line in f]
+        except FileNotFoundError:
+            return False
+        # The index must cover the sidecar exactly, or it is stale.
+        end = int(entries[-1][2]) + int(entries[-1][3]) if entries else 0
+        if end != os.path.getsize(self.path):
+            return False
+        for timestamp, rows, offset, _ in entries:
+            self.timestamps.append(int(timestamp))
+            self.rows.append(int(rows))
+            self._offsets.append(int(offset))
+        return True
+    
+    def _scan(self) -> None:
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                meta = json.loads(line)
+                self.timestamps.append(meta["timestamp"])
+                self.rows.append(meta["rows"])
+                self._offsets.append(offset)
+                offset += len(line)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def load(self, position: int) -> Dict[str, Any]:
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[position])
+            return json.loads(f.readline())
+    
+    def position_before(self, timestamp: int) -> Optional[int]:
+        # Latest snapshot taken strictly before `timestamp`, so replay
+        # re-runs the point at `timestamp` itself.
+        i = bisect_right(self.timestamps, timestamp - 1)
+        return i - 1 if i else None
+    
+    def nearest_before(self, timestamp: int) -> Optional[Dict[str, Any]]:
+        position = self.position_before(timestamp)
+        return self.load(position) if position is not None else None
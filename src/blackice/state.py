@@ -1,9 +1,11 @@
 
+from array import array
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from .deviation import DeviationDirection
+from .deviation import DIRECTION_CODES, DIRECTIONS_BY_CODE, DeviationDirection
 from .persistence import PersistenceResult, PersistenceStatus
 
 
@@ -13,14 +15,86 @@ class RegimeState(Enum):
     SHIFTED = "SHIFTED"
 
 
-@dataclass
+# Stable integer codes for compact storage (see eventlog.EventLog); the
+# position in the tuple is the code. Directions use the signed
+# deviation.DIRECTION_CODES.
+STATE_CODES = (RegimeState.NORMAL, RegimeState.UNSTABLE, RegimeState.SHIFTED)
+_STATE_INDEX = {state: code for code, state in enumerate(STATE_CODES)}
+
+
+def format_reason(
+    from_state: RegimeState,
+    to_state: RegimeState,
+    direction: DeviationDirection,
+    count: int,
+    required: int
+) -> str:
+    # count is the consecutive deviating points, or for returns to NORMAL
+    # the time spent in the state being left.
+    if to_state == RegimeState.UNSTABLE:
+        if from_state == RegimeState.SHIFTED:
+            return (
+                f"New deviation in opposite direction ({direction.value}), "
+                f"watching for new regime"
+            )
+        return (
+            f"Significant deviation detected ({direction.value}), "
+            f"watching for persistence ({count}/{required})"
+        )
+    if to_state == RegimeState.SHIFTED:
+        prefix = "Immediate regime shift" if from_state == RegimeState.NORMAL else "Regime shift"
+        return (
+            f"{prefix} confirmed ({direction.value}), "
+            f"deviation persisted for {count} points"
+        )
+    if from_state == RegimeState.SHIFTED:
+        return (
+            f"System returned to baseline, "
+            f"regime lasted {count} time units"
+        )
+    return (
+        f"Deviation did not persist (noise filtered), "
+        f"returning to normal after {count} time units"
+    )
+
+
+@dataclass(init=False)
 class StateTransition:
     from_state: RegimeState
     to_state: RegimeState
     timestamp: int
     direction: DeviationDirection
-    reason: str
     zscore: float = 0.0
+    # The numbers the reason is rendered from (see format_reason).
+    count: int = 0
+    required: int = 0
+    
+    def __init__(
+        self,
+        from_state: RegimeState,
+        to_state: RegimeState,
+        timestamp: int,
+        direction: DeviationDirection,
+        reason: Optional[str] = None,
+        zscore: float = 0.0,
+        count: int = 0,
+        required: int = 0
+    ):
+        self.from_state = from_state
+        self.to_state = to_state
+        self.timestamp = timestamp
+        self.direction = direction
+        self.zscore = zscore
+        self.count = count
+        self.required = required
+        # Rendered on first read unless given.
+        self._reason = reason
+    
+    @property
+    def reason(self) -> str:
+        if self._reason is None:
+            self._reason = format_reason(self.from_state, self.to_state, self.direction, self.count, self.required)
+        return self._reason
     
     def to_dict(self) -> dict:
         return {
@@ -52,10 +126,29 @@ class RegimeStateMachine:
     def __init__(self, metric_name: str = "metric"):
         self.metric_name = metric_name
         self._state: RegimeState = RegimeState.NORMAL
-        self._transitions: List[StateTransition] = []
         self._unstable_since: Optional[int] = None
         self._shifted_since: Optional[int] = None
         self._last_direction: DeviationDirection = DeviationDirection.NONE
+        
+        # Transition history, one column per field (states and directions
+        # as STATE_CODES positions / DIRECTION_CODES); StateTransition
+        # objects are only built when asked for. The timestamps (non-
+        # decreasing, as the stream is processed in order) double as the
+        # time index, and _dwell holds the cumulative time spent in each
+        # state up to each transition, three entries per transition.
+        self._clear_history()
+        # State before the first indexed transition (set by restore()).
+        self._initial_state: RegimeState = RegimeState.NORMAL
+        self._first_seen: Optional[int] = None
+        self._last_seen: Optional[int] = None
+    
+    def advance(self, timestamp: int) -> None:
+        # Marks the stream as observed up to timestamp; the first call also
+        # fixes where dwell time starts counting.
+        if self._first_seen is None:
+            self._first_seen = timestamp
+        if self._last_seen is None or timestamp > self._last_seen:
+            self._last_seen = timestamp
     
     def process(
         self, 
@@ -63,51 +156,35 @@ class RegimeStateMachine:
         timestamp: int,
         zscore: float = 0.0
     ) -> Optional[StateTransition]:
+        self.advance(timestamp)
         transition = None
+        count = persistence.consecutive_count
         
         if self._state == RegimeState.NORMAL:
             if persistence.status == PersistenceStatus.WATCHING:
                 transition = self._transition_to(
-                    RegimeState.UNSTABLE,
-                    timestamp,
-                    persistence.direction,
-                    zscore,
-                    f"Significant deviation detected ({persistence.direction.value}), "
-                    f"watching for persistence ({persistence.consecutive_count}/{persistence.required_count})"
+                    RegimeState.UNSTABLE, timestamp, persistence.direction, zscore,
+                    count, persistence.required_count
                 )
                 self._unstable_since = timestamp
                 
             elif persistence.status == PersistenceStatus.CONFIRMED:
                 transition = self._transition_to(
-                    RegimeState.SHIFTED,
-                    timestamp,
-                    persistence.direction,
-                    zscore,
-                    f"Immediate regime shift confirmed ({persistence.direction.value}), "
-                    f"deviation persisted for {persistence.consecutive_count} points"
+                    RegimeState.SHIFTED, timestamp, persistence.direction, zscore, count
                 )
                 self._shifted_since = timestamp
         
         elif self._state == RegimeState.UNSTABLE:
             if persistence.status == PersistenceStatus.NOT_DEVIATING:
                 transition = self._transition_to(
-                    RegimeState.NORMAL,
-                    timestamp,
-                    DeviationDirection.NONE,
-                    zscore,
-                    f"Deviation did not persist (noise filtered), "
-                    f"returning to normal after {timestamp - (self._unstable_since or 0)} time units"
+                    RegimeState.NORMAL, timestamp, DeviationDirection.NONE, zscore,
+                    timestamp - (self._unstable_since or 0)
                 )
                 self._unstable_since = None
                 
             elif persistence.status == PersistenceStatus.CONFIRMED:
                 transition = self._transition_to(
-                    RegimeState.SHIFTED,
-                    timestamp,
-                    persistence.direction,
-                    zscore,
-                    f"Regime shift confirmed ({persistence.direction.value}), "
-                    f"deviation persisted for {persistence.consecutive_count} points"
+                    RegimeState.SHIFTED, timestamp, persistence.direction, zscore, count
                 )
                 self._shifted_since = timestamp
                 self._unstable_since = None
@@ -115,24 +192,15 @@ class RegimeStateMachine:
         elif self._state == RegimeState.SHIFTED:
             if persistence.status == PersistenceStatus.NOT_DEVIATING:
                 transition = self._transition_to(
-                    RegimeState.NORMAL,
-                    timestamp,
-                    DeviationDirection.NONE,
-                    zscore,
-                    f"System returned to baseline, "
-                    f"regime lasted {timestamp - (self._shifted_since or 0)} time units"
+                    RegimeState.NORMAL, timestamp, DeviationDirection.NONE, zscore,
+                    timestamp - (self._shifted_since or 0)
                 )
                 self._shifted_since = None
                 
             elif persistence.status == PersistenceStatus.WATCHING:
                 if persistence.direction != self._last_direction:
                     transition = self._transition_to(
-                        RegimeState.UNSTABLE,
-                        timestamp,
-                        persistence.direction,
-                        zscore,
-                        f"New deviation in opposite direction ({persistence.direction.value}), "
-                        f"watching for new regime"
+                        RegimeState.UNSTABLE, timestamp, persistence.direction, zscore
                     )
                     self._unstable_since = timestamp
                     self._shifted_since = None
@@ -142,13 +210,24 @@ class RegimeStateMachine:
         
         return transition
     
+    def _clear_history(self) -> None:
+        self._times = array("q")
+        self._from_states = array("b")
+        self._to_states = array("b")
+        self._directions = array("b")
+        self._zscores = array("d")
+        self._counts = array("q")
+        self._required = array("q")
+        self._dwell = array("q")
+    
     def _transition_to(
         self, 
         new_state: RegimeState, 
         timestamp: int,
         direction: DeviationDirection,
         zscore: float,
-        reason: str
+        count: int = 0,
+        required: int = 0
     ) -> StateTransition:
         transition = StateTransition(
             from_state=self._state,
@@ -156,33 +235,111 @@ class RegimeStateMachine:
             timestamp=timestamp,
             direction=direction,
             zscore=zscore,
-            reason=reason
+            count=count,
+            required=required
         )
+        self._dwell.extend(self._cumulative(timestamp))
+        self._times.append(timestamp)
+        self._from_states.append(_STATE_INDEX[self._state])
+        self._to_states.append(_STATE_INDEX[new_state])
+        self._directions.append(DIRECTION_CODES[direction])
+        self._zscores.append(zscore)
+        self._counts.append(count)
+        self._required.append(required)
         self._state = new_state
-        self._transitions.append(transition)
         return transition
     
+    def _transition(self, index: int) -> StateTransition:
+        return StateTransition(
+            from_state=STATE_CODES[self._from_states[index]],
+            to_state=STATE_CODES[self._to_states[index]],
+            timestamp=self._times[index],
+            direction=DIRECTIONS_BY_CODE[self._directions[index]],
+            zscore=self._zscores[index],
+            count=self._counts[index],
+            required=self._required[index]
+        )
+    
+    def _cumulative(self, timestamp: int) -> Tuple[int, int, int]:
+        # Time spent in each state from the first observed point up to
+        # timestamp, in O(log n).
+        i = bisect_right(self._times, timestamp)
+        if i == 0:
+            totals = [0, 0, 0]
+            since = self._first_seen if self._first_seen is not None else timestamp
+            state = self._initial_state
+        else:
+            totals = list(self._dwell[3 * (i - 1):3 * i])
+            since = self._times[i - 1]
+            state = STATE_CODES[self._to_states[i - 1]]
+        totals[_STATE_INDEX[state]] += max(0, timestamp - since)
+        return totals[0], totals[1], totals[2]
+    
+    def state_at(self, timestamp: int) -> RegimeState:
+        # State in effect at timestamp (a transition at timestamp counts).
+        i = bisect_right(self._times, timestamp)
+        return STATE_CODES[self._to_states[i - 1]] if i else self._initial_state
+    
+    def transitions_between(self, start: int, end: int) -> List[StateTransition]:
+        # Transitions with start <= timestamp <= end.
+        lo = bisect_left(self._times, start)
+        hi = bisect_right(self._times, end)
+        return [self._transition(i) for i in range(lo, hi)]
+    
+    def dwell_times(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, int]:
+        # Time spent in each state over [start, end), clipped to the
+        # observed span of the stream.
+        if self._first_seen is None or self._last_seen is None:
+            return {state.value: 0 for state in STATE_CODES}
+        start = self._first_seen if start is None else max(start, self._first_seen)
+        end = self._last_seen if end is None else min(end, self._last_seen)
+        if end <= start:
+            return {state.value: 0 for state in STATE_CODES}
+        before = self._cumulative(start)
+        after = self._cumulative(end)
+        return {state.value: after[k] - before[k] for k, state in enumerate(STATE_CODES)}
+    
     @property
     def current_state(self) -> RegimeState:
         return self._state
     
     @property
     def transitions(self) -> List[StateTransition]:
-        return self._transitions.copy()
+        return [self._transition(i) for i in range(len(self._times))]
     
     @property
     def transition_count(self) -> int:
-        return len(self._transitions)
+        return len(self._times)
+    
+    def snapshot(self) -> dict:
+        # The live state only; the transition history is not carried over.
+        return {
+            "state": self._state.value,
+            "unstable_since": self._unstable_since,
+            "shifted_since": self._shifted_since,
+            "direction": self._last_direction.value
+        }
+    
+    def restore(self, state: dict) -> None:
+        self.reset()
+        self._state = RegimeState(state["state"])
+        self._initial_state = self._state
+        self._unstable_since = state["unstable_since"]
+        self._shifted_since = state["shifted_since"]
+        self._last_direction = DeviationDirection(state["direction"])
     
     def reset(self) -> None:
         self._state = RegimeState.NORMAL
-        self._transitions.clear()
         self._unstable_since = None
         self._shifted_since = None
         self._last_direction = DeviationDirection.NONE
+        self._clear_history()
+        self._first_seen = None
+        self._last_seen = None
+        self._initial_state = RegimeState.NORMAL
     
     def __repr__(self) -> str:
         return (
             f"RegimeStateMachine(metric={self.metric_name}, "
-            f"state={self._state.value}, transitions={len(self._transitions)})"
+            f"state={self._state.value}, transitions={len(self._times)})"
         )
@@ -0,0 +1,513 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from blackice.learning.labels import MachineLabels
+from blackice.learning.objective import AnomalyInterval
+
+# Episode kinds; only regime changes are ground truth, bursts and gaps are noise.
+LEVEL = "level"
+VARIANCE = "variance"
+BURST = "burst"
+GAP = "gap"
+REGIME_KINDS = (LEVEL, VARIANCE)
+
+# Rows rendered to CSV at a time.
+CSV_BLOCK_ROWS = 1_000_000
+# Alibaba machine_usage.csv has nine columns; the five after mem_util are left empty.
+_CSV_TAIL = b",,,,,\n"
+COLUMNAR_FIELDS = ["timestamp", "cpu_util", "mem_util"]
+
+
+@dataclass
+class SynthConfig:
+    n_machines: int = 10
+    n_points: int = 10_000
+    interval: int = 10
+    start_time: int = 0
+    seed: int = 0
+    # Per-point Gaussian noise (percentage points) and baseline ranges.
+    noise: float = 3.0
+    cpu_base: Tuple[float, float] = (20.0, 60.0)
+    mem_base: Tuple[float, float] = (30.0, 80.0)
+    # Episode rates are expected occurrences per 10,000 points of one machine.
+    burst_rate: float = 20.0
+    burst_length: float = 3.0
+    burst_sigma: Tuple[float, float] = (4.0, 10.0)
+    shift_rate: float = 1.0
+    shift_sigma: Tuple[float, float] = (4.0, 8.0)
+    shift_length: Tuple[int, int] = (200, 2000)
+    variance_rate: float = 0.5
+    variance_factor: float = 4.0
+    variance_length: Tuple[int, int] = (200, 2000)
+    gap_rate: float = 0.5
+    gap_length: Tuple[int, int] = (5, 100)
+    # Fraction of a cpu level shift mirrored on mem_util.
+    mem_coupling: float = 0.5
+
+
+@dataclass
+class Episode:
+    kind: str
+    start: int
+    length: int
+    magnitude: float = 0.0
+
+
+@dataclass
+class MachinePlan:
+    machine_id: str
+    index: int
+    n_points: int
+    cpu_base: float
+    mem_base: float
+    episodes: List[Episode] = field(default_factory=list)
+    
+    def gap_mask(self) -> np.ndarray:
+        """True for grid points that are dropped from the trace."""
+        mask = np.zeros(self.n_points, dtype=bool)
+        for episode in self.episodes:
+            if episode.kind == GAP:
+                mask[episode.start:episode.start + episode.length] = True
+        return mask
+    
+    def row_count(self) -> int:
+        return self.n_points - int(self.gap_mask().sum())
+
+
+@dataclass
+class MachineTrace:
+    machine_id: str
+    timestamps: np.ndarray
+    cpu_util: np.ndarray
+    mem_util: np.ndarray
+    intervals: List[AnomalyInterval]
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "machine_id": self.machine_id,
+            "timestamp": self.timestamps,
+            "cpu_util": self.cpu_util,
+            "mem_util": self.mem_util
+        })
+
+
+def machine_name(index: int) -> str:
+    return f"m_{index + 1}"
+
+
+def _episodes(
+    rng: np.random.Generator,
+    kind: str,
+    n_points: int,
+    lengths: np.ndarray,
+    magnitudes: Optional[np.ndarray] = None
+) -> List[Episode]:
+    count = len(lengths)
+    starts = rng.integers(0, n_points, count) if n_points else np.zeros(0, dtype=np.int64)
+    return [
+        Episode(kind, int(start), int(min(length, n_points - start)),
+                float(magnitudes[i]) if magnitudes is not None else 0.0)
+        for i, (start, length) in enumerate(zip(starts, lengths))
+    ]
+
+
+def plan_machine(index: int, config: SynthConfig) -> MachinePlan:
+    """
+    Draws one machine's baselines and episodes.
+    
+    Planning uses its own random stream and never touches the per-point
+    noise, so the row count (and ground truth) of a machine is known before
+    its trace is rendered.
+    """
+    rng = np.random.default_rng([config.seed, index, 0])
+    n = config.n_points
+    scale = n / 10_000.0
+    
+    def count(rate: float) -> int:
+        return int(rng.poisson(rate * scale)) if rate > 0 else 0
+    
+    plan = MachinePlan(
+        machine_id=machine_name(index),
+        index=index,
+        n_points=n,
+        cpu_base=float(rng.uniform(*config.cpu_base)),
+        mem_base=float(rng.uniform(*config.mem_base))
+    )
+    
+    k = count(config.shift_rate)
+    signs = rng.choice([-1.0, 1.0], k)
+    plan.episodes += _episodes(
+        rng, LEVEL, n,
+        rng.integers(config.shift_length[0], config.shift_length[1] + 1, k),
+        signs * rng.uniform(*config.shift_sigma, k) * config.noise
+    )
+    k = count(config.variance_rate)
+    plan.episodes += _episodes(
+        rng, VARIANCE, n,
+        rng.integers(config.variance_length[0], config.variance_length[1] + 1, k),
+        np.full(k, config.variance_factor)
+    )
+    k = count(config.burst_rate)
+    plan.episodes += _episodes(
+        rng, BURST, n,
+        rng.geometric(1.0 / max(config.burst_length, 1.0), k),
+        rng.uniform(*config.burst_sigma, k) * config.noise
+    )
+    k = count(config.gap_rate)
+    plan.episodes += _episodes(
+        rng, GAP, n,
+        rng.integers(config.gap_length[0], config.gap_length[1] + 1, k)
+    )
+    plan.episodes = [episode for episode in plan.episodes if episode.length > 0]
+    plan.episodes.sort(key=lambda episode: (episode.start, episode.kind))
+    return plan
+
+
+def _spans(plan: MachinePlan, kinds: Iterable[str]) -> np.ndarray:
+    # Sum of magnitudes of the active episodes at each point (difference array).
+    diff = np.zeros(plan.n_points + 1, dtype=np.float64)
+    for episode in plan.episodes:
+        if episode.kind in kinds:
+            diff[episode.start] += episode.magnitude
+            diff[episode.start + episode.length] -= episode.magnitude
+    return np.cumsum(diff[:-1])
+
+
+def plan_intervals(plan: MachinePlan, config: SynthConfig) -> List[AnomalyInterval]:
+    """Ground truth: level and variance episodes, overlapping ones merged."""
+    spans = sorted(
+        (episode.start, episode.start + episode.length - 1)
+        for episode in plan.episodes if episode.kind in REGIME_KINDS
+    )
+    merged: List[List[int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [
+        AnomalyInterval(config.start_time + start * config.interval, config.start_time + end * config.interval)
+        for start, end in merged
+    ]
+
+
+def render_machine(plan: MachinePlan, config: SynthConfig) -> MachineTrace:
+    """Renders a planned machine into Alibaba-style integer percentages."""
+    rng = np.random.default_rng([config.seed, plan.index, 1])
+    n = plan.n_points
+    
+    level = _spans(plan, (LEVEL,))
+    burst = _spans(plan, (BURST,))
+    active_variance = np.zeros(n + 1, dtype=np.int32)
+    for episode in plan.episodes:
+        if episode.kind == VARIANCE:
+            active_variance[episode.start] += 1
+            active_variance[episode.start + episode.length] -= 1
+    sigma = np.where(np.cumsum(active_variance[:-1]) > 0, config.noise * config.variance_factor, config.noise)
+    
+    cpu = plan.cpu_base + level + burst + rng.standard_normal(n) * sigma
+    mem = plan.mem_base + config.mem_coupling * level + rng.standard_normal(n) * config.noise
+    
+    keep = ~plan.gap_mask()
+    timestamps = config.start_time + np.arange(n, dtype=np.int64) * config.interval
+    return MachineTrace(
+        machine_id=plan.machine_id,
+        timestamps=timestamps[keep],
+        cpu_util=np.clip(np.rint(cpu[keep]), 0, 100).astype(np.int64),
+        mem_util=np.clip(np.rint(mem[keep]), 0, 100).astype(np.int64),
+        intervals=plan_intervals(plan, config)
+    )
+
+
+def generate(config: SynthConfig) -> Iterator[MachineTrace]:
+    """Yields one trace per machine; memory is bounded by a single machine."""
+    for index in range(config.n_machines):
+        yield render_machine(plan_machine(index, config), config)
+
+
+def ground_truth(config: SynthConfig) -> MachineLabels:
+    """The injected regime intervals per machine, without rendering any rows."""
+    labels: MachineLabels = {}
+    for index in range(config.n_machines):
+        plan = plan_machine(index, config)
+        labels[plan.machine_id] = plan_intervals(plan, config)
+    return labels
+
+
+def _pair_table() -> np.ndarray:
+    # "00" .. "99" as uint16, so two digits are looked up at once.
+    pairs = np.array([list(f"{i:02d}".encode()) for i in range(100)], dtype=np.uint8)
+    return pairs.view(np.uint16).ravel()
+
+
+def _percent_table() -> np.ndarray:
+    # 0 .. 100 right-aligned in four NUL-padded bytes, viewed as uint32.
+    table = np.zeros((101, 4), dtype=np.uint8)
+    for i in range(101):
+        text = str(i).encode()
+        table[i, 4 - len(text):] = list(text)
+    return table.view(np.uint32).ravel()
+
+
+_PAIRS = _pair_table()
+_PERCENTS = _percent_table()
+
+
+def _digits(values: np.ndarray, width: int) -> np.ndarray:
+    # (n, width) ASCII digits of non-negative integers, left-padded with NUL.
+    groups = (width + 1) // 2
+    pairs = np.empty((len(values), groups), dtype=np.uint16)
+    remaining = values.astype(np.int64)
+    for g in range(groups - 1, -1, -1):
+        remaining, low = np.divmod(remaining, 100)
+        pairs[:, g] = _PAIRS[low]
+    out = pairs.view(np.uint8)[:, 2 * groups - width:]
+    if width > 1:
+        powers = 10 ** np.arange(width - 1, 0, -1, dtype=np.int64)
+        out[:, :width - 1][values[:, None] < powers] = 0
+    return out
+
+
+def format_csv_rows(
+    machine_id: str,
+    timestamps: np.ndarray,
+    cpu_util: np.ndarray,
+    mem_util: np.ndarray
+) -> bytes:
+    """
+    Formats headerless machine_usage.csv rows without a per-row Python loop.
+    
+    Every row is laid out in a fixed-width byte matrix with NUL padding in
+    front of short numbers (two-digit and percentage lookup tables do the
+    integer-to-text work), then the NULs are deleted in a single pass.
+    Timestamps must be non-negative integers and utilisations in 0 .. 100.
+    """
+    n = len(timestamps)
+    if n == 0:
+        return b""
+    head = machine_id.encode() + b","
+    width = len(str(int(timestamps.max())))
+    rows = np.empty((n, len(head) + width + 1 + 4 + 1 + 4 + len(_CSV_TAIL)), dtype=np.uint8)
+    
+    rows[:, :len(head)] = np.frombuffer(head, dtype=np.uint8)
+    at = len(head)
+    rows[:, at:at + width] = _digits(timestamps, width)
+    at += width
+    for values in (cpu_util, mem_util):
+        rows[:, at] = ord(",")
+        rows[:, at + 1:at + 5] = _PERCENTS[values].view(np.uint8).reshape(n, 4)
+        at += 5
+    rows[:, at:] = np.frombuffer(_CSV_TAIL, dtype=np.uint8)
+    return rows.tobytes().translate(None, b"\x00")
+
+
+def trace_csv(trace: MachineTrace) -> Iterator[bytes]:
+    """A machine's rows as CSV, in blocks of CSV_BLOCK_ROWS."""
+    for lo in range(0, len(trace), CSV_BLOCK_ROWS):
+        hi = lo + CSV_BLOCK_ROWS
+        yield format_csv_rows(trace.machine_id, trace.timestamps[lo:hi], trace.cpu_util[lo:hi], trace.mem_util[lo:hi])
+
+
+def _render_csv(index: int, config: SynthConfig) -> Tuple[str, List[AnomalyInterval], List[bytes]]:
+    trace = render_machine(plan_machine(index, config), config)
+    return trace.machine_id, trace.intervals, list(trace_csv(trace))
+
+
+def write_csv(config: SynthConfig, path: str, n_jobs: int = 1) -> Tuple[int, MachineLabels]:
+    """
+    Writes the trace as headerless machine_usage.csv, one machine after another.
+    
+    Args:
+        config: What to generate.
+        path: Output file.
+        n_jobs: Worker processes rendering machines ahead of the writer
+            (-1 for all cores). Output is identical for any value.
+    
+    Returns:
+        (bytes written, ground truth per machine)
+    """
+    written = 0
+    labels: MachineLabels = {}
+    workers = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    
+    with open(path, "wb") as f:
+        def emit(rendered: Tuple[str, List[AnomalyInterval], List[bytes]]) -> None:
+            nonlocal written
+            machine_id, intervals, blocks = rendered
+            labels[machine_id] = intervals
+            for block in blocks:
+                f.write(block)
+                written += len(block)
+        
+        if workers == 1:
+            for index in range(config.n_machines):
+                emit(_render_csv(index, config))
+            return written, labels
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # A bounded window of machines in flight keeps memory flat.
+            pending: Deque[Future] = deque()
+            for index in range(config.n_machines):
+                pending.append(pool.submit(_render_csv, index, config))
+                if len(pending) >= 2 * workers:
+                    emit(pending.popleft().result())
+            while pending:
+                emit(pending.popleft().result())
+    return written, labels
+
+
+def write_columnar(config: SynthConfig, path: str) -> Tuple[int, MachineLabels]:
+    """
+    Writes the trace as a directory of .npy columns.
+    
+    Row counts come from the plans, so every column is preallocated as a
+    memory-mapped file and filled machine by machine. `offsets.npy` holds
+    each machine's row range, which lets read_columnar slice one machine
+    without touching the rest.
+    
+    Returns:
+        (bytes written, ground truth per machine)
+    """
+    out = Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+    plans = [plan_machine(index, config) for index in range(config.n_machines)]
+    offsets = np.zeros(len(plans) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([plan.row_count() for plan in plans])
+    total = int(offsets[-1])
+    
+    columns = {
+        name: np.lib.format.open_memmap(str(out / f"{name}.npy"), mode="w+", dtype=np.int64, shape=(total,))
+        for name in COLUMNAR_FIELDS
+    }
+    labels: MachineLabels = {}
+    for plan, lo, hi in zip(plans, offsets[:-1], offsets[1:]):
+        trace = render_machine(plan, config)
+        labels[trace.machine_id] = trace.intervals
+        columns["timestamp"][lo:hi] = trace.timestamps
+        columns["cpu_util"][lo:hi] = trace.cpu_util
+        columns["mem_util"][lo:hi] = trace.mem_util
+    for column in columns.values():
+        column.flush()
+    del columns
+    
+    np.save(out / "offsets.npy", offsets)
+    np.save(out / "machine_id.npy", np.asarray([plan.machine_id for plan in plans]))
+    return total * 8 * len(COLUMNAR_FIELDS), labels
+
+
+def read_columnar(path: str, machine_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Loads a columnar trace (all machines, or one machine's rows only).
+    """
+    src = Path(path)
+    machines = np.load(src / "machine_id.npy").tolist()
+    offsets = np.load(src / "offsets.npy")
+    columns = {name: np.load(src / f"{name}.npy", mmap_mode="r") for name in COLUMNAR_FIELDS}
+    
+    if machine_id is not None:
+        if machine_id not in machines:
+            return pd.DataFrame(columns=["machine_id"] + COLUMNAR_FIELDS)
+        i = machines.index(machine_id)
+        lo, hi = int(offsets[i]), int(offsets[i + 1])
+        frame = {name: np.array(column[lo:hi]) for name, column in columns.items()}
+        return pd.DataFrame({"machine_id": machine_id, **frame})
+    
+    ids = np.repeat(np.asarray(machines, dtype=object), np.diff(offsets))
+    return pd.DataFrame({"machine_id": ids, **{name: np.array(column) for name, column in columns.items()}})
+
+
+def write_labels(labels: MachineLabels, path: str) -> None:
+    """Writes ground truth in the format IntervalFileLabels reads."""
+    rows = [
+        (machine_id, interval.start_time, interval.end_time)
+        for machine_id, intervals in labels.items()
+        for interval in intervals
+    ]
+    pd.DataFrame(rows, columns=["machine_id", "start_time", "end_time"]).to_csv(path, index=False)
+
+
+def _parse_range(cast: Callable[[str], Any]) -> Callable[[str], Tuple[Any, Any]]:
+    def parse(text: str) -> Tuple[Any, Any]:
+        lo, _, hi = text.partition(",")
+        return cast(lo), cast(hi or lo)
+    return parse
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = SynthConfig()
+    parser = argparse.ArgumentParser(
+        prog="blackice synth",
+        description="Generate a synthetic machine_usage trace with known regime shifts"
+    )
+    parser.add_argument("output", help="Output .csv file, or a directory for --format columnar")
+    parser.add_argument("--format", choices=["csv", "columnar"], help="Default: csv for *.csv, else columnar")
+    parser.add_argument("--labels", help="Ground-truth CSV (default: <output>.labels.csv)")
+    parser.add_argument("--machines", type=int, default=defaults.n_machines, help="Number of machines")
+    parser.add_argument("--points", type=int, default=defaults.n_points, help="Points per machine")
+    parser.add_argument("--interval", type=int, default=defaults.interval, help="Seconds between points")
+    parser.add_argument("--start-time", type=int, default=defaults.start_time, help="First timestamp")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed")
+    parser.add_argument("--noise", type=float, default=defaults.noise, help="Noise std (percentage points)")
+    parser.add_argument("--burst-rate", type=float, default=defaults.burst_rate, help="Bursts per 10k points")
+    parser.add_argument("--shift-rate", type=float, default=defaults.shift_rate, help="Level shifts per 10k points")
+    parser.add_argument("--shift-sigma", type=_parse_range(float), default=defaults.shift_sigma,
+                        help="Level shift size range in noise sigmas, e.g. 4,8")
+    parser.add_argument("--shift-length", type=_parse_range(int), default=defaults.shift_length,
+                        help="Level shift length range in points, e.g. 200,2000")
+    parser.add_argument("--variance-rate", type=float, default=defaults.variance_rate,
+                        help="Variance shifts per 10k points")
+    parser.add_argument("--variance-factor", type=float, default=defaults.variance_factor,
+                        help="Noise multiplier during a variance shift")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Worker processes for CSV output (-1 = all cores)")
+    parser.add_argument("--gap-rate", type=float, default=defaults.gap_rate, help="Gaps per 10k points")
+    
+    args = parser.parse_args(argv)
+    config = SynthConfig(
+        n_machines=args.machines,
+        n_points=args.points,
+        interval=args.interval,
+        start_time=args.start_time,
+        seed=args.seed,
+        noise=args.noise,
+        burst_rate=args.burst_rate,
+        shift_rate=args.shift_rate,
+        shift_sigma=args.shift_sigma,
+        shift_length=args.shift_length,
+        variance_rate=args.variance_rate,
+        variance_factor=args.variance_factor,
+        gap_rate=args.gap_rate
+    )
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "columnar")
+    labels_path = args.labels or f"{args.output.rstrip('/')}.labels.csv"
+    
+    print("BLACKICE Synthetic Trace Generator")
+    print(f"Machines: {config.n_machines:,} x {config.n_points:,} points ({fmt})")
+    
+    start = time.perf_counter()
+    if fmt == "csv":
+        written, labels = write_csv(config, args.output, n_jobs=args.jobs)
+    else:
+        written, labels = write_columnar(config, args.output)
+    elapsed = time.perf_counter() - start
+    write_labels(labels, labels_path)
+    
+    n_intervals = sum(len(intervals) for intervals in labels.values())
+    print(f"  Wrote {written / 1e6:,.1f} MB in {elapsed:.2f}s ({written / 1e6 / max(elapsed, 1e-9):,.0f} MB/s) to {args.output}")
+    print(f"  Ground truth: {n_intervals:,} intervals -> {labels_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+import csv
+
+from .baseline import BaselineComputer
+
+if TYPE_CHECKING:
+    from .pipeline import BlackicePipeline
+
+
+@dataclass
+class BaselineSeed:
+    count: int
+    mean: float
+    m2: float
+    # Last window of raw values, oldest first; preferred when present.
+    window: List[float] = field(default_factory=list)
+    
+    def apply(self, baseline: BaselineComputer) -> None:
+        if self.window:
+            baseline.seed_values(self.window)
+        else:
+            baseline.seed_stats(self.count, self.mean, self.m2)
+    
+    @classmethod
+    def capture(cls, baseline: BaselineComputer, keep_window: bool = True) -> "BaselineSeed":
+        count, mean, m2 = baseline.summary()
+        return cls(count, mean, m2, baseline.window_values() if keep_window else [])
+
+
+class WarmStartTable:
+    # Baseline seeds keyed by (machine_id, metric), stored as one CSV so a
+    # whole fleet's baselines load in a single read at start-up (csv module
+    # only, no pandas). The window column is space-separated and may be
+    # empty, in which case the (count, mean, m2) summary is used.
+    
+    COLUMNS = ("machine_id", "metric", "count", "mean", "m2", "window")
+    
+    def __init__(self) -> None:
+        self._seeds: Dict[Tuple[str, str], BaselineSeed] = {}
+    
+    def __len__(self) -> int:
+        return len(self._seeds)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._seeds
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._seeds)
+    
+    def set(self, machine_id: str, metric: str, seed: BaselineSeed) -> None:
+        self._seeds[(machine_id, metric)] = seed
+    
+    def get(self, machine_id: str, metric: str) -> Optional[BaselineSeed]:
+        return self._seeds.get((machine_id, metric))
+    
+    def capture(self, pipeline: "BlackicePipeline", keep_window: bool = True) -> int:
+        # Records every warm baseline of a pipeline under its machine_id.
+        captured = 0
+        for metric in pipeline.columns:
+            tracker = pipeline.get_tracker(metric)
+            if tracker is not None and tracker.baseline.count > 0:
+                self.set(pipeline.machine_id, metric, BaselineSeed.capture(tracker.baseline, keep_window))
+                captured += 1
+        return captured
+    
+    def apply(self, pipeline: "BlackicePipeline", machine_id: str) -> int:
+        # Seeds the pipeline's baselines for machine_id; returns how many
+        # metrics were found in the table.
+        applied = 0
+        for metric in pipeline.columns:
+            seed = self.get(machine_id, metric)
+            tracker = pipeline.get_tracker(metric)
+            if seed is not None and tracker is not None:
+                seed.apply(tracker.baseline)
+                applied += 1
+        return applied
+    
+    def save(self, path: str) -> None:
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            for (machine_id, metric) in sorted(self._seeds):
+                seed = self._seeds[(machine_id, metric)]
+                writer.writerow([
+                    machine_id, metric, seed.count, repr(seed.mean), repr(seed.m2),
+                    " ".join(repr(value) for value in seed.window)
+                ])
+    
+    @classmethod
+    def load(cls, path: str) -> "WarmStartTable":
+        table = cls()
+        with open(path, newline="") as f:
+            for record in csv.DictReader(f):
+                window = [float(value) for value in (record.get("window") or "").split()]
+                table.set(record["machine_id"], record["metric"], BaselineSeed(
+                    count=int(record["count"]),
+                    mean=float(record["mean"]),
+                    m2=float(record["m2"]),
+                    window=window
+                ))
+        return table
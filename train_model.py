@@ -4,96 +4,221 @@ import argparse
 import pandas as pd
 import yaml
 from pathlib import Path
+from typing import Optional
 from dataclasses import asdict
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from blackice.learning.optimizer import GridSearchOptimizer
-from blackice.learning.objective import AnomalyInterval
+from blackice.learning.search import RandomSearchOptimizer, SuccessiveHalvingOptimizer
+from blackice.learning.labels import LabelSource, ThresholdLabels, IntervalFileLabels, build_labels
+from blackice.learning.cache import EvaluationCache
+from blackice.learning.validation import CrossValidatedOptimizer
+from blackice.learning.fleet import split_by_machine, cluster_groups, load_machine_meta, train_fleet
+from blackice.pipeline import MACHINE_USAGE_COLUMNS, stream_machine_data
 
 
-def generate_heuristic_ground_truth(df: pd.DataFrame, cpu_threshold: float = 95.0) -> list[AnomalyInterval]:
+def build_label_source(args) -> LabelSource:
     """
-    Generates 'Ground Truth' labels based on a simple heuristic for demonstration.
-    In a real scenario, this would load human-labeled data.
-    
-    Heuristic: Continuous regions where CPU > threshold are 'True Anomalies'.
+    Heuristic labels (CPU > threshold) by default; a labelled CSV of
+    intervals when --labels is given.
     """
-    labels = []
-    in_anomaly = False
-    start_time = None
+    if args.labels:
+        return IntervalFileLabels(args.labels)
+    return ThresholdLabels("cpu_util", args.label_threshold)
+
+
+def describe_labels(args) -> str:
+    if args.labels:
+        return f"labelled intervals from {args.labels}"
+    return f"heuristic ground truth (CPU > {args.label_threshold:g}%)"
+
+
+# We use a smaller grid for the demo to run fast
+PARAM_GRID = {
+    "window_size": [10, 20, 50, 100],
+    "zscore_threshold": [2.5, 3.0, 4.0, 5.0],
+    "min_consecutive_points": [3, 5, 8]
+}
+
+
+def build_optimizer(args, n_jobs: Optional[int] = None) -> GridSearchOptimizer:
+    jobs = args.jobs if n_jobs is None else n_jobs
+    cache = None
+    if not args.no_eval_cache:
+        cache = EvaluationCache(args.eval_cache or f"{args.data}.evals.sqlite")
+    if args.strategy == 'random':
+        return RandomSearchOptimizer(PARAM_GRID, n_iter=args.n_iter, cache=cache)
+    if args.strategy == 'halving':
+        return SuccessiveHalvingOptimizer(PARAM_GRID, n_jobs=jobs, cache=cache)
+    if args.cv_folds > 1:
+        return CrossValidatedOptimizer(PARAM_GRID, n_folds=args.cv_folds, n_jobs=jobs, cache=cache)
+    return GridSearchOptimizer(PARAM_GRID, n_jobs=jobs, cache=cache)
+
+
+def train_per_machine(df: pd.DataFrame, labels: dict, args) -> None:
+    """Tunes one config per machine (or cluster) and saves the parameter table."""
+    machines = split_by_machine(df)
+    print(f"Found {len(machines)} machines.")
+    
+    series = {
+        machine_id: (machine_df, labels.get(machine_id, []))
+        for machine_id, machine_df in machines.items()
+    }
     
-    # Sort by time just in case
-    df = df.sort_values('timestamp')
+    groups = None
+    if args.group_by == 'cluster':
+        meta_path = Path(args.meta)
+        if not meta_path.exists():
+            print(f"Error: Machine metadata {meta_path} not found.")
+            sys.exit(1)
+        groups = cluster_groups(list(machines), load_machine_meta(str(meta_path)))
+        print(f"Grouped into {len(groups)} clusters.")
     
-    for _, row in df.iterrows():
-        is_high = row['cpu_util'] > cpu_threshold
-        
-        if is_high and not in_anomaly:
-            in_anomaly = True
-            start_time = row['timestamp']
-        elif not is_high and in_anomaly:
-            in_anomaly = False
-            labels.append(AnomalyInterval(start_time, row['timestamp']))
-            
-    # Close pending
-    if in_anomaly:
-        labels.append(AnomalyInterval(start_time, df.iloc[-1]['timestamp']))
+    # Groups run in parallel; each group's search stays in-process.
+    optimizer = build_optimizer(args, n_jobs=1)
+    table = train_fleet(series, optimizer, groups=groups, n_jobs=args.jobs)
+    table.save(args.table)
+    
+    print("\n✅ Training Complete.")
+    print(f"Parameters for {len(table)} machines saved to {args.table}")
+    print("You can now run the detector with:")
+    print(f"  python src/blackice/cli.py --params {args.table} --machine <machine_id> ...")
+
+
+def train_streaming(data_path: Path, args) -> None:
+    """Out-of-core training: two passes over one machine's chunks (labels, then search)."""
+    if not args.machine:
+        print("Error: --stream needs --machine.")
+        sys.exit(1)
+    if args.per_machine or args.strategy == 'halving' or args.cv_folds > 1:
+        print("Error: --stream supports --strategy grid or random (without --cv-folds) on a single machine.")
+        sys.exit(1)
+    
+    def chunks():
+        return stream_machine_data(str(data_path), args.machine, chunksize=args.chunksize, prefetch=1)
+    
+    print(f"Streaming {args.machine} from {data_path} in chunks of {args.chunksize:,} rows...")
+    print(f"Generating {describe_labels(args)}...")
+    labels = build_labels(
+        build_label_source(args),
+        chunks(),
+        data_path=str(data_path),
+        use_cache=not args.no_label_cache,
+        scope=args.machine
+    )
+    ground_truth = labels.get(args.machine, [])
+    print(f"Found {len(ground_truth)} anomaly intervals.")
+    
+    best_config = build_optimizer(args).train(chunks(), ground_truth)
+    save_config(best_config, Path(args.output))
+
+
+def save_config(best_config, output_path: Path) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(output_path, 'w') as f:
+        config_dict = asdict(best_config)
+        yaml.dump(config_dict, f)
         
-    return labels
+    print("\n✅ Training Complete.")
+    print(f"Learned Configuration saved to {output_path}")
+    print("You can now run the detector with:")
+    print(f"  python src/blackice/cli.py --config {output_path} ...")
+
+
+def load_training_data(data_path: Path) -> pd.DataFrame:
+    """Reads a usage CSV with or without a header row."""
+    with open(data_path) as f:
+        first = f.readline()
+    if first.startswith("machine_id"):
+        return pd.read_csv(data_path)
+    return pd.read_csv(
+        data_path,
+        names=MACHINE_USAGE_COLUMNS,
+        header=None,
+        usecols=["machine_id", "timestamp", "cpu_util", "mem_util"]
+    )
+
 
 def main():
     parser = argparse.ArgumentParser(description="Train BlackIce Params (Offline Learning)")
     parser.add_argument('data', help="Path to training CSV (machine_usage.csv)")
     parser.add_argument('--output', default='configs/learned_config.yaml', help="Output config file")
+    parser.add_argument('--jobs', '-j', type=int, default=1, help="Worker processes for the grid search (-1 = all CPUs)")
+    parser.add_argument('--strategy', choices=['grid', 'random', 'halving'], default='grid',
+                        help="Search strategy: exhaustive grid, random sample, or successive halving")
+    parser.add_argument('--n-iter', type=int, default=20, help="Configurations sampled by --strategy random")
+    parser.add_argument('--per-machine', action='store_true',
+                        help="Tune each machine separately and write a parameter table")
+    parser.add_argument('--group-by', choices=['machine', 'cluster'], default='machine',
+                        help="With --per-machine: share one config per machine or per cluster")
+    parser.add_argument('--meta', default='data/machine_meta.csv', help="machine_meta.csv for --group-by cluster")
+    parser.add_argument('--table', default='configs/machine_params.csv', help="Output parameter table")
+    parser.add_argument('--labels', help="CSV of known anomaly intervals (start_time, end_time[, machine_id])")
+    parser.add_argument('--label-threshold', type=float, default=95.0,
+                        help="CPU threshold for heuristic labels when --labels is not given")
+    parser.add_argument('--no-label-cache', action='store_true',
+                        help="Do not read or write the label cache next to the data file")
+    parser.add_argument('--cv-folds', type=int, default=0,
+                        help="Rank grid configs by rolling-origin CV over this many folds (grid strategy)")
+    parser.add_argument('--eval-cache', help="SQLite file memoizing evaluations (default: <data>.evals.sqlite)")
+    parser.add_argument('--no-eval-cache', action='store_true', help="Re-score every configuration")
+    parser.add_argument('--stream', action='store_true',
+                        help="Train out-of-core on one machine's chunks instead of loading the whole CSV")
+    parser.add_argument('--machine', '-m', help="Machine to train on with --stream")
+    parser.add_argument('--chunksize', type=int, default=500000, help="Rows per chunk with --stream")
     args = parser.parse_args()
     
     data_path = Path(args.data)
     if not data_path.exists():
         print(f"Error: Data file {data_path} not found.")
         sys.exit(1)
+    if args.cv_folds > 1 and (args.per_machine or args.strategy != 'grid'):
+        print("Error: --cv-folds supports --strategy grid on the combined data (without --per-machine).")
+        sys.exit(1)
+        
+    if args.stream:
+        train_streaming(data_path, args)
+        return
         
     print(f"Loading training data from {data_path}...")
     # Load assuming standard schema, but handle only needed columns for speed
     try:
-        df = pd.read_csv(data_path)
+        df = load_training_data(data_path)
     except Exception as e:
         print(f"Error reading CSV: {e}")
         sys.exit(1)
         
-    # 1. Generate Ground Truth (Simulated Labels)
-    print("Generating heuristic ground truth (CPU > 95%)...")
-    ground_truth = generate_heuristic_ground_truth(df)
-    print(f"Found {len(ground_truth)} mock anomaly intervals.")
+    # 1. Generate Ground Truth (labelled per machine, cached next to the data)
+    print(f"Generating {describe_labels(args)}...")
+    labels = build_labels(
+        build_label_source(args),
+        df,
+        data_path=str(data_path),
+        use_cache=not args.no_label_cache
+    )
+    
+    if args.per_machine:
+        train_per_machine(df, labels, args)
+        return
+        
+    ground_truth = sorted(
+        (iv for intervals in labels.values() for iv in intervals),
+        key=lambda iv: iv.start_time
+    )
+    print(f"Found {len(ground_truth)} anomaly intervals.")
     
     if not ground_truth:
         print("Warning: No anomalies found in data. Training might be trivial.")
         
-    # 2. Configure Search Space
-    # We use a smaller grid for the demo to run fast
-    param_grid = {
-        "window_size": [10, 20, 50, 100],
-        "zscore_threshold": [2.5, 3.0, 4.0, 5.0],
-        "min_consecutive_points": [3, 5, 8]
-    }
-    
-    # 3. Run Optimization
-    optimizer = GridSearchOptimizer(param_grid)
+    # 2. Configure Search Space & 3. Run Optimization
+    optimizer = build_optimizer(args)
     best_config = optimizer.train(df, ground_truth)
     
     # 4. Save Result
-    output_path = Path(args.output)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(output_path, 'w') as f:
-        config_dict = asdict(best_config)
-        yaml.dump(config_dict, f)
-        
-    print("\n✅ Training Complete.")
-    print(f"Learned Configuration saved to {output_path}")
-    print("You can now run the detector with:")
-    print(f"  python src/blackice/cli.py --config {output_path} ...")
+    save_config(best_config, Path(args.output))
 
 if __name__ == "__main__":
     main()